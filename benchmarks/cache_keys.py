@@ -0,0 +1,95 @@
+"""
+Hit ratio of the response cache with the default and the canonical key builders
+on a replayed sample of the search traffic.
+
+    python benchmarks/cache_keys.py
+"""
+
+import random
+from typing import Any, Callable, Optional
+
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.key_builder import default_key_builder
+
+from book_review.controller.http.cache import key_builder
+from book_review.controller.http.models import Sort
+
+REQUESTS = 100_000
+QUERIES = 2_000
+
+# typed by people, so the same query comes in different shapes
+_VARIANTS: list[Callable[[str], str]] = [
+    lambda q: q,
+    str.lower,
+    str.title,
+    lambda q: f" {q} ",
+    lambda q: q.replace(" ", "  "),
+    str.upper,
+]
+
+
+async def search_books_json(
+    query: str,
+    sort: Optional[Sort],
+    language: Optional[str],
+    page: Optional[int],
+    limit: Optional[int],
+) -> None:
+    """
+    Stand-in with the signature of the cached "/books" route.
+    """
+
+
+def _sample(rng: random.Random) -> list[dict[str, Any]]:
+    queries = [f"title of the book {i}" for i in range(QUERIES)]
+
+    # popularity of the queries follows Zipf's law
+    weights = [1 / rank for rank in range(1, QUERIES + 1)]
+
+    sample: list[dict[str, Any]] = []
+
+    for query in rng.choices(queries, weights, k=REQUESTS):
+        sample.append(
+            {
+                "query": rng.choice(_VARIANTS)(query),
+                "sort": rng.choice([None, None, None, Sort.NEW]),
+                "language": None,
+                "page": None,
+                "limit": None,
+            }
+        )
+
+    return sample
+
+
+def _hit_ratio(builder: Callable[..., str], sample: list[dict[str, Any]]) -> float:
+    seen: set[str] = set()
+    hits = 0
+
+    for kwargs in sample:
+        key = builder(search_books_json, "", args=(), kwargs=kwargs)
+
+        if key in seen:
+            hits += 1
+        else:
+            seen.add(key)
+
+    return hits / len(sample)
+
+
+def main() -> None:
+    FastAPICache.init(InMemoryBackend())
+
+    sample = _sample(random.Random(42))
+
+    default = _hit_ratio(default_key_builder, sample)
+    canonical = _hit_ratio(key_builder, sample)
+
+    print(f"{REQUESTS:,} requests of {QUERIES:,} distinct queries")
+    print(f"default key builder:   {default:.1%} hits")
+    print(f"canonical key builder: {canonical:.1%} hits")
+
+
+if __name__ == "__main__":
+    main()
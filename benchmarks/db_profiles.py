@@ -0,0 +1,128 @@
+"""
+Throughput and latency of the concurrent review reads and writes
+with the SQLite defaults and with the storage profiles.
+
+    python benchmarks/db_profiles.py
+"""
+
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from book_review.dao.reviews import ORMRepository
+from book_review.db import create_all
+from book_review.db.storage import StorageProfile, apply_profile
+from book_review.models.reviews import Review
+
+USERS = 1000
+BOOKS = 1000
+REVIEWS = 50_000
+READERS = 8
+WRITERS = 2
+SECONDS = 5
+
+PROFILES: dict[str, Optional[StorageProfile]] = {
+    "defaults": None,
+    "wal": StorageProfile(),
+    "wal+full": StorageProfile(synchronous="FULL"),
+}
+
+
+def _percentile(timings: list[float], percentile: float) -> float:
+    return sorted(timings)[int(len(timings) * percentile) - 1] if timings else 0
+
+
+async def _measure(name: str, profile: Optional[StorageProfile], path: str) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    if profile is not None:
+        apply_profile(engine, profile)
+
+    await create_all(engine)
+
+    repository = ORMRepository(async_sessionmaker(engine))
+    rng = random.Random(42)
+
+    await repository.import_reviews(
+        [
+            Review(
+                user_id=rng.randrange(USERS),
+                book_id=f"OL{rng.randrange(BOOKS)}W",
+                rating=rng.randint(1, 10),
+                commentary="Laboriosam reprehenderit dolores porro vitae.",
+                created_at=datetime(2024, 1, 1, rng.randrange(24), rng.randrange(60)),
+                updated_at=None,
+            )
+            for _ in range(REVIEWS)
+        ]
+    )
+
+    reads: list[float] = []
+    writes: list[float] = []
+    failures = 0
+
+    deadline = time.perf_counter() + SECONDS
+
+    async def read(rng: random.Random) -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await repository.find_reviews(
+                book_id=f"OL{rng.randrange(BOOKS)}W", limit=20
+            )
+            reads.append((time.perf_counter() - start) * 1000)
+
+    async def write(rng: random.Random) -> None:
+        nonlocal failures
+
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+
+            try:
+                await repository.create_or_update_review(
+                    user_id=rng.randrange(USERS),
+                    book_id=f"OL{rng.randrange(BOOKS)}W",
+                    rating=rng.randint(1, 10),
+                )
+            except Exception:
+                # "database is locked" once the busy timeout is over
+                failures += 1
+                continue
+
+            writes.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(
+        *(read(random.Random(i)) for i in range(READERS)),
+        *(write(random.Random(-i)) for i in range(1, WRITERS + 1)),
+    )
+
+    await engine.dispose()
+
+    print(
+        f"{name:>10}: "
+        f"reads {len(reads) / SECONDS:,.0f}/s "
+        f"p50 {_percentile(reads, 0.5):.2f} ms p99 {_percentile(reads, 0.99):.2f} ms, "
+        f"writes {len(writes) / SECONDS:,.0f}/s "
+        f"p50 {_percentile(writes, 0.5):.2f} ms p99 {_percentile(writes, 0.99):.2f} ms, "
+        f"failed writes {failures}"
+    )
+
+
+async def main() -> None:
+    print(
+        f"{READERS} readers and {WRITERS} writers for {SECONDS}s "
+        f"on {REVIEWS:,} reviews of {BOOKS:,} books"
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, profile in PROFILES.items():
+            await _measure(name, profile, os.path.join(directory, f"{name}.sqlite3"))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
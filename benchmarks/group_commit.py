@@ -0,0 +1,108 @@
+"""
+Throughput and latency of the review writes committed one by one
+and by the group-commit writer at different concurrency.
+
+    python benchmarks/group_commit.py
+"""
+
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from book_review.dao.reviews import GroupCommitRepository, ORMRepository
+from book_review.db import create_all
+from book_review.db.storage import StorageProfile, apply_profile
+
+USERS = 1000
+BOOKS = 1000
+WRITES = 5000
+CONCURRENCY = [1, 50, 500]
+
+
+def _percentile(timings: list[float], percentile: float) -> float:
+    return sorted(timings)[int(len(timings) * percentile) - 1]
+
+
+async def _measure(name: str, repository: ORMRepository, concurrency: int) -> None:
+    timings: list[float] = []
+    failures = 0
+
+    async def write(rng: random.Random, writes: int) -> None:
+        nonlocal failures
+
+        for _ in range(writes):
+            start = time.perf_counter()
+
+            try:
+                if rng.random() < 0.1:
+                    await repository.delete_review(
+                        user_id=rng.randrange(USERS),
+                        book_id=f"OL{rng.randrange(BOOKS)}W",
+                    )
+                else:
+                    await repository.create_or_update_review(
+                        user_id=rng.randrange(USERS),
+                        book_id=f"OL{rng.randrange(BOOKS)}W",
+                        rating=rng.randint(1, 10),
+                        commentary="Laboriosam reprehenderit dolores porro vitae.",
+                    )
+            except Exception:
+                # "database is locked" once the busy timeout is over
+                failures += 1
+                continue
+
+            timings.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+
+    await asyncio.gather(
+        *(write(random.Random(i), WRITES // concurrency) for i in range(concurrency))
+    )
+
+    seconds = time.perf_counter() - start
+
+    print(
+        f"{name:>22} x{concurrency:<3}: {len(timings) / seconds:,.0f} writes/s, "
+        f"p50 {_percentile(timings, 0.5):.2f} ms, "
+        f"p99 {_percentile(timings, 0.99):.2f} ms, "
+        f"failed {failures}"
+    )
+
+
+async def main() -> None:
+    print(f"{WRITES:,} review upserts and deletes")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for concurrency in CONCURRENCY:
+            for name in ["one by one", "group commit", "group commit, 2ms wait"]:
+                path = os.path.join(directory, f"{name}-{concurrency}.sqlite3")
+
+                # large pool, so that the concurrent commits compete for the lock
+                engine = create_async_engine(
+                    f"sqlite+aiosqlite:///{path}", pool_size=50, max_overflow=0
+                )
+                apply_profile(engine, StorageProfile(synchronous="FULL"))
+
+                await create_all(engine)
+
+                session_maker = async_sessionmaker(engine)
+
+                if name == "one by one":
+                    await _measure(name, ORMRepository(session_maker), concurrency)
+                else:
+                    repository = GroupCommitRepository(
+                        session_maker, max_wait=0.002 if "wait" in name else 0
+                    )
+
+                    await _measure(name, repository, concurrency)
+                    await repository.close()
+
+                await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+"""
+Latency of the "/books" response cache hits with 100 book previews
+cached decoded and cached serialized.
+
+    python benchmarks/response_cache.py
+"""
+
+import asyncio
+import time
+from datetime import date
+from typing import Any, MutableMapping, Optional, Sequence
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import ORJSONResponse
+from fastapi_cache import FastAPICache
+
+from book_review.controller.http.backends import LRUBackend
+from book_review.controller.http.cache import key_builder
+from book_review.controller.http.coder import ORJSONCoder
+from book_review.controller.http.decorator import ResponseCache
+from book_review.controller.http.models import AuthorPreview, BookPreview
+
+BOOKS = 100
+REQUESTS = 5_000
+
+# popular books have dozens of subjects and several authors and translations
+_PREVIEWS = [
+    BookPreview(
+        id=f"OL{i}W",
+        title=f"The title of the book number {i}",
+        authors=[
+            AuthorPreview(id=f"OL{i}{j}A", name=f"Author Name {j}") for j in range(3)
+        ],
+        first_publishment_date=date(1900 + i % 100, 1, 1),
+        subjects=[f"Subject of the book {j}" for j in range(30)],
+        languages=["eng", "fre", "ger", "spa", "ita"],
+    )
+    for i in range(BOOKS)
+]
+
+
+def _add_route(app: FastAPI, cache: ResponseCache, path: str, serialized: bool) -> None:
+    @cache.cached(expire=60 * 60, namespace=path, serialized=serialized)
+    async def search_books_json(
+        request: Request, response: Response, query: str
+    ) -> Sequence[BookPreview]:
+        return _PREVIEWS
+
+    # same as the "/books" route
+    @app.get(path, response_model=Sequence[BookPreview])
+    async def search_books(
+        request: Request, response: Response, query: str
+    ) -> Response | Sequence[BookPreview]:
+        return await search_books_json(query=query, request=request, response=response)
+
+
+def _create_app() -> FastAPI:
+    cache = ResponseCache()
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    _add_route(app, cache, "/decoded", serialized=False)
+    _add_route(app, cache, "/serialized", serialized=True)
+
+    return app
+
+
+async def _get(app: FastAPI, path: str) -> bytes:
+    """
+    Call the app without the HTTP server and client in the way.
+    """
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"query=lord+of+the+rings",
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("localhost", 80),
+    }
+
+    body = b""
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: MutableMapping[str, Any]) -> None:
+        nonlocal body
+
+        if message["type"] == "http.response.body":
+            body += message.get("body", b"")
+
+    await app(scope, receive, send)
+
+    return body
+
+
+def _percentile(timings: list[float], percentile: float) -> float:
+    return sorted(timings)[int(len(timings) * percentile) - 1]
+
+
+async def _measure(app: FastAPI, path: str) -> Optional[bytes]:
+    # the first request fills the cache
+    body = await _get(app, path)
+
+    timings: list[float] = []
+
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        await _get(app, path)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(
+        f"{path[1:]:>10} hits: p50 {_percentile(timings, 0.5):.3f} ms, "
+        f"p99 {_percentile(timings, 0.99):.3f} ms"
+    )
+
+    return body
+
+
+async def main() -> None:
+    FastAPICache.init(
+        LRUBackend(64 * 1024 * 1024),
+        coder=ORJSONCoder,
+        key_builder=key_builder,
+    )
+
+    app = _create_app()
+
+    print(f"{REQUESTS:,} hits of {BOOKS} book previews")
+
+    decoded = await _measure(app, "/decoded")
+    serialized = await _measure(app, "/serialized")
+
+    assert decoded == serialized, "serialized responses differ"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+"""
+Throughput and allocations of reading all the reviews of a large database
+into the HTTP reviews through the ORM entities and through the column rows.
+
+    python benchmarks/review_reads.py
+"""
+
+import asyncio
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, Sequence
+
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+import book_review.controller.http.models as http_models
+import book_review.models.reviews as models
+from book_review.dao.reviews import ORMRepository
+from book_review.db import TableReviews, create_all
+
+USERS = 1000
+REVIEWS = 100_000
+REPEAT = 3
+
+
+class _LegacyReview(BaseModel):
+    """
+    Copy of the dao.Review the reviews were loaded into before the column rows.
+    """
+
+    user_id: int
+    book_id: str
+    rating: int
+    commentary: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    def map(self) -> models.Review:
+        return models.Review(
+            user_id=self.user_id,
+            book_id=self.book_id,
+            rating=self.rating,
+            commentary=self.commentary,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+        )
+
+
+async def legacy(
+    session_maker: async_sessionmaker[AsyncSession],
+) -> list[http_models.Review]:
+    statement = select(TableReviews).order_by(
+        TableReviews.created_at.desc(),
+        TableReviews.user_id.desc(),
+        TableReviews.book_id.desc(),
+    )
+
+    async with session_maker() as session:
+        scalars = await session.scalars(statement)
+
+        reviews = [
+            _LegacyReview(
+                user_id=scalar.user_id,
+                book_id=scalar.book_id,
+                rating=scalar.rating,
+                commentary=scalar.commentary,
+                created_at=scalar.created_at,
+                updated_at=scalar.updated_at,
+            )
+            for scalar in scalars
+        ]
+
+    return [http_models.Review.parse(review.map()) for review in reviews]
+
+
+async def current(repository: ORMRepository) -> list[http_models.Review]:
+    reviews = await repository.find_reviews()
+
+    return [http_models.Review.parse(review) for review in reviews]
+
+
+async def _measure(
+    name: str, read: Callable[[], Awaitable[Sequence[http_models.Review]]]
+) -> None:
+    seconds = min([await _time(read) for _ in range(REPEAT)])
+
+    tracemalloc.start()
+
+    await read()
+
+    _, peak = tracemalloc.get_traced_memory()
+
+    tracemalloc.stop()
+
+    print(
+        f"{name:>8}: {REVIEWS / seconds:,.0f} rows/s, "
+        f"peak allocated {peak / 1024 / 1024:,.0f} MiB"
+    )
+
+
+async def _time(read: Callable[[], Awaitable[Sequence[http_models.Review]]]) -> float:
+    start = time.perf_counter()
+
+    await read()
+
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    print(f"all {REVIEWS:,} reviews into the HTTP reviews, best of {REPEAT}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(directory, 'reviews.sqlite3')}"
+        )
+
+        await create_all(engine)
+
+        session_maker = async_sessionmaker(engine)
+        repository = ORMRepository(session_maker)
+        rng = random.Random(42)
+
+        await repository.import_reviews(
+            [
+                models.Review(
+                    user_id=i % USERS,
+                    book_id=f"OL{i // USERS}W",
+                    rating=rng.randint(1, 10),
+                    commentary=(
+                        "Laboriosam reprehenderit dolores porro vitae."
+                        if rng.random() < 0.5
+                        else None
+                    ),
+                    created_at=datetime(2024, 1, 1, rng.randrange(24), i % 60),
+                    updated_at=(
+                        datetime(2024, 2, 1, rng.randrange(24))
+                        if rng.random() < 0.2
+                        else None
+                    ),
+                )
+                for i in range(REVIEWS)
+            ]
+        )
+
+        # both paths must produce the same reviews in the same order
+        assert await legacy(session_maker) == await current(repository)
+
+        await _measure("legacy", lambda: legacy(session_maker))
+        await _measure("current", lambda: current(repository))
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,160 @@
+"""
+Micro-benchmark of decoding openlibrary search responses
+into the HTTP book previews.
+
+    python benchmarks/search_decoding.py
+"""
+
+import json
+import random
+import timeit
+from datetime import date
+from typing import Any, Callable, Optional, Sequence
+
+import orjson
+from pydantic import BaseModel
+
+import book_review.controller.http.models as http_models
+import book_review.models.book as models
+import book_review.openlibrary.client as openlibrary
+
+DOCS = 100
+NUMBER = 200
+REPEAT = 5
+
+
+def _generate_body(docs: int) -> bytes:
+    random.seed(42)
+
+    return orjson.dumps(
+        {
+            "numFound": docs,
+            "start": 0,
+            "docs": [
+                {
+                    "key": f"/works/OL{i}W",
+                    "title": f"Title of the book {i}",
+                    "cover_i": i,
+                    "author_key": [f"OL{i}A", f"OL{i + 1}A"],
+                    "author_name": ["Miguel de Cervantes", "Tobias Smollett"],
+                    "language": ["eng", "spa", "fre"],
+                    "publish_year": [random.randint(1600, 2020) for _ in range(20)],
+                    "subject": [f"Subject {j}" for j in range(15)],
+                }
+                for i in range(docs)
+            ],
+        }
+    )
+
+
+class _LegacyBookPreview(BaseModel):
+    """
+    Copy of the openlibrary.BookPreview before the fast decoding path.
+    """
+
+    key: str
+    title: str
+    cover_i: Optional[int] = None
+    author_key: Sequence[str] = []
+    author_name: Sequence[str] = []
+    language: Sequence[str] = []
+    publish_year: Sequence[int] = []
+    subject: Sequence[str] = []
+
+    def map(self) -> models.BookPreview:
+        authors = [
+            models.AuthorPreview(id=key, name=name)
+            for key, name in zip(self.author_key, self.author_name)
+        ]
+
+        first_year: Optional[int] = None
+
+        for year in self.publish_year:
+            if year <= 0:
+                continue
+
+            if first_year is not None:
+                first_year = min(first_year or 1, year)
+            else:
+                first_year = year
+
+        first_publishment_date: Optional[date] = None
+
+        if first_year is not None:
+            first_publishment_date = date(year=first_year, month=1, day=1)
+
+        return models.BookPreview(
+            id=self.key,
+            title=self.title,
+            cover_id=self.cover_i,
+            authors=authors,
+            first_publishment_date=first_publishment_date,
+            subjects=self.subject,
+            languages=self.language,
+        )
+
+
+def _legacy_parse(book: models.BookPreview) -> http_models.BookPreview:
+    authors = [
+        http_models.AuthorPreview(id=author.id, name=author.name)
+        for author in book.authors
+    ]
+
+    return http_models.BookPreview(
+        id=book.id,
+        title=book.title,
+        authors=authors,
+        first_publishment_date=book.first_publishment_date,
+        subjects=book.subjects,
+        languages=book.languages,
+    )
+
+
+def legacy(body: bytes) -> list[http_models.BookPreview]:
+    # aiohttp decodes response.json() with the standard json module
+    class Response(BaseModel):
+        docs: Sequence[_LegacyBookPreview]
+
+    books = Response(**json.loads(body)).docs
+
+    for book in books:
+        book.key = openlibrary.adjust_key(book.key)
+
+    return [_legacy_parse(book.map()) for book in books]
+
+
+def current(body: bytes) -> list[http_models.BookPreview]:
+    books = openlibrary.decode_search_books_response(body)
+
+    return [http_models.BookPreview.parse(book.map()) for book in books]
+
+
+def _measure(function: Callable[[bytes], Any], body: bytes) -> float:
+    """
+    Best time of a single call in milliseconds.
+    """
+
+    timings = timeit.repeat(lambda: function(body), number=NUMBER, repeat=REPEAT)
+
+    return min(timings) / NUMBER * 1000
+
+
+def main() -> None:
+    body = _generate_body(DOCS)
+
+    # both paths must produce the same previews
+    assert [b.model_dump() for b in legacy(body)] == [
+        b.model_dump() for b in current(body)
+    ]
+
+    legacy_ms = _measure(legacy, body)
+    current_ms = _measure(current, body)
+
+    print(f"search response with {DOCS} docs, {len(body):,} bytes")
+    print(f"legacy:  {legacy_ms:.3f} ms")
+    print(f"current: {current_ms:.3f} ms")
+    print(f"speedup: {legacy_ms / current_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
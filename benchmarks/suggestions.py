@@ -0,0 +1,73 @@
+"""
+Benchmark of the in-memory suggestions index with a million entries.
+
+    python benchmarks/suggestions.py
+"""
+
+import asyncio
+import random
+import string
+import time
+
+from book_review.dao.suggestions import MemoryRepository
+from book_review.models.book import Suggestion, SuggestionKind
+
+ENTRIES = 1_000_000
+BATCH = 200
+QUERIES = 100_000
+LIMIT = 10
+
+_WORDS = [
+    "".join(
+        random.Random(i).choices(
+            string.ascii_lowercase, k=random.Random(i).randint(2, 9)
+        )
+    )
+    for i in range(5000)
+]
+
+
+def _generate(rng: random.Random, i: int) -> tuple[str, Suggestion]:
+    title = " ".join(rng.choices(_WORDS, k=rng.randint(1, 6)))
+
+    return title, Suggestion(kind=SuggestionKind.BOOK, id=f"OL{i}W", text=title.title())
+
+
+def _percentile(timings: list[float], percentile: float) -> float:
+    return sorted(timings)[int(len(timings) * percentile) - 1]
+
+
+async def main() -> None:
+    rng = random.Random(42)
+
+    repository = MemoryRepository(max_memory=2**31)
+
+    start = time.perf_counter()
+
+    for i in range(0, ENTRIES, BATCH):
+        await repository.add_suggestions([_generate(rng, i + j) for j in range(BATCH)])
+
+    seconds = time.perf_counter() - start
+
+    stats = repository.stats
+
+    print(f"{stats.entries:,} entries, {stats.memory / 2**20:,.0f} MiB")
+    print(f"inserts: {stats.entries / seconds:,.0f} entries/s in batches of {BATCH}")
+
+    prefixes = [rng.choice(_WORDS)[: rng.randint(1, 5)] for _ in range(QUERIES)]
+
+    timings: list[float] = []
+
+    for prefix in prefixes:
+        start = time.perf_counter()
+        await repository.find_suggestions(prefix, LIMIT)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(f"lookups of {LIMIT} suggestions:")
+    print(f"p50: {_percentile(timings, 0.5):.4f} ms")
+    print(f"p99: {_percentile(timings, 0.99):.4f} ms")
+    print(f"max: {max(timings):.4f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
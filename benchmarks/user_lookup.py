@@ -0,0 +1,180 @@
+"""
+Per-call overhead of looking up the user of an authenticated request,
+broken down by the layers from the SQLite driver up to App._get_user.
+
+    python benchmarks/user_lookup.py
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Optional, cast
+
+import aiosqlite
+from jose import jwt
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+import book_review.dao.users as dao
+from book_review.config import settings
+from book_review.controller.http.app import App
+from book_review.db import TableUsers, create_all
+from book_review.db.storage import PoolSettings, StorageProfile, apply_profile
+from book_review.usecase.openlibrary import UseCase as OpenlibraryUseCase
+from book_review.usecase.reviews import UseCase as ReviewsUseCase
+from book_review.usecase.users import UseCase as UsersUseCase
+
+USERS = 10_000
+CALLS = 1000
+REPEAT = 10
+
+LOGIN = f"login-{USERS // 2}"
+
+_SQL = (
+    "SELECT users.id, users.login, users.password_hash, users.created_at "
+    "FROM users WHERE users.login = ?"
+)
+
+
+async def _legacy(session_maker: async_sessionmaker[AsyncSession]) -> dao.User:
+    # the statement was built and the row loaded into the ORM entity on every call
+    statement = select(TableUsers).where(TableUsers.login == LOGIN)
+
+    async with session_maker() as session:
+        user = await session.scalar(statement)
+
+        assert user is not None
+
+        return dao.User(
+            id=user.id,
+            login=user.login,
+            password_hash=user.password_hash,
+            created_at=user.created_at,
+        )
+
+
+async def _measure(calls: dict[str, Callable[[], Awaitable[Any]]]) -> dict[str, float]:
+    """
+    Best time of a single call in microseconds.
+    The calls take turns, so that the noise of the machine spreads evenly.
+    """
+
+    best = {name: float("inf") for name in calls}
+
+    for _ in range(REPEAT):
+        for name, call in calls.items():
+            start = time.perf_counter()
+
+            for _ in range(CALLS):
+                await call()
+
+            best[name] = min(best[name], time.perf_counter() - start)
+
+    return {name: seconds / CALLS * 1_000_000 for name, seconds in best.items()}
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "users.sqlite3")
+
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{path}", **PoolSettings().engine_options()
+        )
+        apply_profile(engine, StorageProfile())
+
+        await create_all(engine)
+
+        async with engine.begin() as connection:
+            await connection.execute(
+                insert(TableUsers),
+                [
+                    {"login": f"login-{i}", "password_hash": "hash"}
+                    for i in range(USERS)
+                ],
+            )
+
+        session_maker = async_sessionmaker(engine)
+        repository = dao.ORMRepository(session_maker)
+        users = UsersUseCase(repository)
+
+        app = App(
+            users=users,
+            reviews=cast(ReviewsUseCase, None),
+            # neither is used by the authentication
+            openlibrary=cast(OpenlibraryUseCase, None),
+        )
+
+        token = jwt.encode(
+            {"sub": LOGIN}, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        )
+
+        driver = await aiosqlite.connect(path)
+        connection = await engine.connect()
+
+        async def on_driver() -> Optional[Any]:
+            async with driver.execute(_SQL, (LOGIN,)) as cursor:
+                return await cursor.fetchone()
+
+        async def on_connection() -> Any:
+            result = await connection.execute(dao._FIND_USER_BY_LOGIN, {"login": LOGIN})
+
+            return result.first()
+
+        async def on_pool() -> Any:
+            async with engine.connect() as pooled:
+                result = await pooled.execute(dao._FIND_USER_BY_LOGIN, {"login": LOGIN})
+
+                return result.first()
+
+        async def on_session() -> Any:
+            async with session_maker() as session:
+                result = await session.execute(
+                    dao._FIND_USER_BY_LOGIN, {"login": LOGIN}
+                )
+
+                return result.first()
+
+        layers: dict[str, Callable[[], Awaitable[Any]]] = {
+            "aiosqlite": on_driver,
+            "+ sqlalchemy core": on_connection,
+            "+ pool checkout": on_pool,
+            "+ session": on_session,
+            "+ dao": lambda: repository.find_user_by_login(LOGIN),
+            "+ usecase": lambda: users.find_user_by_login(LOGIN),
+            "+ App._get_user": lambda: app._get_user(token),
+        }
+
+        print(
+            f"find_user_by_login among {USERS:,} users, "
+            f"best of {REPEAT} x {CALLS:,} calls"
+        )
+
+        previous = 0.0
+
+        for name, us in (await _measure(layers)).items():
+            print(f"{name:>18}: {us:7.1f} us/call, {us - previous:+7.1f} us")
+
+            previous = us
+
+        daos = await _measure(
+            {
+                "legacy dao": lambda: _legacy(session_maker),
+                "dao": lambda: repository.find_user_by_login(LOGIN),
+            }
+        )
+
+        for name, us in daos.items():
+            print(f"{name:>18}: {us:7.1f} us/call")
+
+        await connection.close()
+        await driver.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,32 +1,234 @@
-from typing import Any
+from contextlib import AsyncExitStack
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Callable, Optional
 
+import aiomcache
 import orjson
 import sqlalchemy.ext.asyncio as sqlalchemy
-from aiohttp import ClientSession
+from fastapi_cache.backends import Backend as CacheBackend
 from yarl import URL
 
 import book_review.db as db
 from book_review.config import settings
 from book_review.controller.http.app import App as HTTPApp
-from book_review.dao.reviews import ORMRepository as ReviewsRepository
+from book_review.controller.http.backends import (
+    LRUBackend,
+    MemcachedBackend,
+    TieredBackend,
+)
+from book_review.controller.http.cache import TagVersions
+from book_review.dao.catalog import ORMRepository as CatalogRepository
+from book_review.dao.covers import FileSystemRepository as CoversRepository
+from book_review.dao.leaderboard import ORMRepository as LeaderboardRepository
+from book_review.dao.previews import ORMRepository as PreviewsRepository
+from book_review.dao.reviews import GroupCommitRepository as ReviewsRepository
+from book_review.dao.suggestions import MemoryRepository as SuggestionsRepository
 from book_review.dao.users import ORMRepository as UsersRepository
-from book_review.openlibrary.client import HTTPAPIClient as OpenlibraryClient
+from book_review.db.storage import (
+    Maintenance,
+    StorageProfile,
+    apply_profile,
+    pool_stats,
+)
+from book_review.db.storage import PoolSettings as DBPoolSettings
+from book_review.openlibrary.catalog import CatalogClient
+from book_review.openlibrary.client import Client as OpenlibraryClient
+from book_review.openlibrary.client import HTTPAPIClient as OpenlibraryHTTPAPIClient
+from book_review.openlibrary.client import Timeouts as OpenlibraryTimeouts
+from book_review.openlibrary.coalescing import CoalescingClient
+from book_review.openlibrary.local import LocalCatalogClient
+from book_review.openlibrary.pool import ManagedSession, PoolSettings
+from book_review.openlibrary.previews import PreviewsIndexClient
+from book_review.openlibrary.resilience import CircuitBreaker, RetryPolicy
+from book_review.usecase.leaderboard import Leaderboard
+from book_review.usecase.openlibrary import Prefetcher
 from book_review.usecase.openlibrary import UseCase as OpenlibraryUseCase
 from book_review.usecase.reviews import UseCase as ReviewsUseCase
 from book_review.usecase.users import UseCase as UsersUseCase
 
 
-def _create_http_client_session(base_url: URL) -> ClientSession:
+def _create_http_client_session(base_url: URL) -> ManagedSession:
     def encoder(value: Any) -> str:
         return orjson.dumps(value).decode()
 
-    return ClientSession(base_url, json_serialize=encoder)
+    pool = PoolSettings(
+        limit=settings.OPENLIBRARY_POOL_LIMIT,
+        limit_per_host=settings.OPENLIBRARY_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=settings.OPENLIBRARY_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl=settings.OPENLIBRARY_DNS_CACHE_TTL,
+    )
+
+    return ManagedSession(base_url, pool, json_serialize=encoder)
 
 
 def _create_db_engine() -> sqlalchemy.AsyncEngine:
+    pool = DBPoolSettings(
+        size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_POOL_MAX_OVERFLOW,
+        timeout=settings.DB_POOL_TIMEOUT,
+        pre_ping=settings.DB_POOL_PRE_PING,
+        recycle=settings.DB_POOL_RECYCLE,
+    )
+
+    engine = sqlalchemy.create_async_engine(
+        f"sqlite+aiosqlite:///{settings.DB}",
+        echo=settings.DEBUG,
+        **pool.engine_options(),
+    )
+
+    profile = StorageProfile(
+        journal_mode=settings.DB_JOURNAL_MODE,
+        synchronous=settings.DB_SYNCHRONOUS,
+        cache_size=settings.DB_CACHE_SIZE,
+        mmap_size=settings.DB_MMAP_SIZE,
+        temp_store=settings.DB_TEMP_STORE,
+        busy_timeout=settings.DB_BUSY_TIMEOUT,
+    )
+
+    apply_profile(engine, profile)
+
+    return engine
+
+
+def _create_dump_db_engine(path: str) -> sqlalchemy.AsyncEngine:
     return sqlalchemy.create_async_engine(
-        f"sqlite+aiosqlite:///{settings.DB}", echo=settings.DEBUG
+        f"sqlite+aiosqlite:///file:{path}?mode=ro&uri=true", echo=settings.DEBUG
+    )
+
+
+def _create_circuit_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_threshold=settings.OPENLIBRARY_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=settings.OPENLIBRARY_BREAKER_RESET_TIMEOUT,
+    )
+
+
+def _create_openlibrary_client(
+    stack: AsyncExitStack,
+    session_maker: sqlalchemy.async_sessionmaker[sqlalchemy.AsyncSession],
+    api_session: ManagedSession,
+    covers_session: ManagedSession,
+    stats: dict[str, Callable[[], Any]],
+) -> OpenlibraryClient:
+    """
+    Create openlibrary client and register its statistics providers.
+    Background work of the client is stopped by the stack.
+    """
+
+    stats["openlibrary_api_pool"] = lambda: api_session.stats
+    stats["openlibrary_covers_pool"] = lambda: covers_session.stats
+
+    http_client = OpenlibraryHTTPAPIClient(
+        api_session=api_session,
+        covers_session=covers_session,
+        api_breaker=_create_circuit_breaker(),
+        covers_breaker=_create_circuit_breaker(),
+        timeouts=OpenlibraryTimeouts(
+            search=settings.OPENLIBRARY_SEARCH_TIMEOUT,
+            works=settings.OPENLIBRARY_WORKS_TIMEOUT,
+            authors=settings.OPENLIBRARY_AUTHORS_TIMEOUT,
+            covers=settings.OPENLIBRARY_COVERS_TIMEOUT,
+        ),
+        retry=RetryPolicy(
+            attempts=settings.OPENLIBRARY_RETRY_ATTEMPTS,
+            base_delay=settings.OPENLIBRARY_RETRY_BASE_DELAY,
+            max_delay=settings.OPENLIBRARY_RETRY_MAX_DELAY,
+        ),
+    )
+    stats["openlibrary_breakers"] = lambda: http_client.breakers
+
+    # index every found book to answer searches locally
+    previews_client = PreviewsIndexClient(
+        http_client,
+        PreviewsRepository(session_maker),
+        min_hits=settings.PREVIEWS_INDEX_MIN_HITS,
+        answer_locally=settings.PREVIEWS_INDEX_SEARCH,
+    )
+    stats["openlibrary_previews_index"] = lambda: previews_client.stats
+
+    # persist works and authors to survive restarts and upstream failures
+    catalog_client = CatalogClient(
+        previews_client,
+        CatalogRepository(session_maker),
+        fresh_for=timedelta(minutes=settings.CATALOG_FRESH_MINUTES),
+        stale_for=timedelta(minutes=settings.CATALOG_STALE_MINUTES),
+    )
+    stats["openlibrary_catalog"] = lambda: catalog_client.stats
+
+    # stop the refreshes before the sessions and the catalog they use are closed
+    stack.push_async_callback(catalog_client.close)
+
+    client: OpenlibraryClient = catalog_client
+
+    if settings.OPENLIBRARY_DUMP_DB is not None:
+        # serve most of the traffic from the imported dumps
+        client = LocalCatalogClient(
+            _create_dump_db_engine(settings.OPENLIBRARY_DUMP_DB), fallback=client
+        )
+
+    # share in-flight calls between concurrent identical requests
+    coalescing_client = CoalescingClient(client)
+    stats["openlibrary_coalescing"] = lambda: coalescing_client.stats
+
+    return coalescing_client
+
+
+def _create_prefetcher(
+    client: OpenlibraryClient, stats: dict[str, Callable[[], Any]]
+) -> Optional[Prefetcher]:
+    if settings.PREFETCH_TOP <= 0:
+        return None
+
+    prefetcher = Prefetcher(
+        client,
+        top=settings.PREFETCH_TOP,
+        concurrency=settings.PREFETCH_CONCURRENCY,
+        queue_size=settings.PREFETCH_QUEUE_SIZE,
     )
+    stats["openlibrary_prefetch"] = lambda: prefetcher.stats
+
+    return prefetcher
+
+
+def _create_cache_backend(
+    stack: AsyncExitStack, stats: dict[str, Callable[[], Any]]
+) -> tuple[CacheBackend, TagVersions]:
+    """
+    Create response cache backend with the configured tiers
+    and the versions of the cache tags kept in the shared tier.
+    """
+
+    memcached: Optional[MemcachedBackend] = None
+
+    if "memcached" in settings.CACHE_TIERS:
+        client = aiomcache.Client(
+            settings.CACHE_MEMCACHED_HOST,
+            settings.CACHE_MEMCACHED_PORT,
+            pool_size=settings.CACHE_MEMCACHED_POOL_SIZE,
+        )
+        stack.push_async_callback(client.close)
+
+        memcached = MemcachedBackend(client)
+
+    if "memory" not in settings.CACHE_TIERS:
+        if memcached is None:
+            raise ValueError("at least one response cache tier is required")
+
+        return memcached, TagVersions(memcached)
+
+    memory = LRUBackend(settings.CACHE_MEMORY_MAX_SIZE)
+
+    if memcached is None:
+        stats["response_cache"] = lambda: memory.stats
+
+        return memory, TagVersions(memory)
+
+    tiered = TieredBackend(memory, memcached)
+    stats["response_cache"] = lambda: tiered.stats
+
+    # replicas must see each other's invalidations, so L1 is bypassed
+    return tiered, TagVersions(memcached)
 
 
 def _create_db_session_maker(
@@ -47,19 +249,86 @@ async def run() -> None:
 
     session_maker = _create_db_session_maker(db_engine)
 
-    http_app = HTTPApp(
-        users=UsersUseCase(UsersRepository(session_maker)),
-        reviews=ReviewsUseCase(ReviewsRepository(session_maker)),
-        openlibrary=OpenlibraryUseCase(
-            OpenlibraryClient(
-                api_session=_create_http_client_session(
-                    URL(settings.OPENLIBRARY_BASE_URL)
-                ),
-                covers_session=_create_http_client_session(
-                    URL(settings.OPENLIBRARY_COVERS_BASE_URL)
-                ),
+    stats: dict[str, Callable[[], Any]] = {}
+    stats["db_pool"] = lambda: pool_stats(db_engine)
+
+    suggestions = SuggestionsRepository(settings.SUGGESTIONS_MAX_MEMORY)
+    stats["suggestions"] = lambda: suggestions.stats
+
+    async with AsyncExitStack() as stack:
+        # keep pooled connections open for the whole app lifetime,
+        # entered first so that they are closed whatever fails next
+        api_session = await stack.enter_async_context(
+            _create_http_client_session(URL(settings.OPENLIBRARY_BASE_URL))
+        )
+        covers_session = await stack.enter_async_context(
+            _create_http_client_session(URL(settings.OPENLIBRARY_COVERS_BASE_URL))
+        )
+
+        openlibrary_client = _create_openlibrary_client(
+            stack, session_maker, api_session, covers_session, stats
+        )
+
+        prefetcher = _create_prefetcher(openlibrary_client, stats)
+
+        if prefetcher is not None:
+            # stop the workers before the sessions they prefetch with are closed
+            stack.push_async_callback(prefetcher.close)
+
+        openlibrary = OpenlibraryUseCase(
+            openlibrary_client,
+            covers=CoversRepository(
+                Path(settings.COVERS_CACHE_DIR), settings.COVERS_CACHE_MAX_SIZE
+            ),
+            prefetcher=prefetcher,
+            suggestions=suggestions,
+        )
+
+        await openlibrary.load_suggestions(PreviewsRepository(session_maker))
+
+        cache, tags = _create_cache_backend(stack, stats)
+        stats["cache_tags"] = lambda: tags.stats
+
+        if settings.DB_MAINTENANCE_INTERVAL > 0:
+            maintenance = Maintenance(
+                db_engine,
+                interval=settings.DB_MAINTENANCE_INTERVAL,
+                vacuum_pages=settings.DB_VACUUM_PAGES,
             )
-        ),
-    )
+            stats["db_maintenance"] = lambda: maintenance.stats
+
+            await stack.enter_async_context(maintenance)
+
+        leaderboard = Leaderboard(
+            LeaderboardRepository(session_maker),
+            PreviewsRepository(session_maker),
+            size=settings.LEADERBOARD_SIZE,
+            days=settings.LEADERBOARD_TRENDING_DAYS,
+            prior_count=settings.LEADERBOARD_PRIOR_REVIEWS,
+            interval=settings.LEADERBOARD_REFRESH_INTERVAL,
+        )
+        stats["leaderboard"] = lambda: leaderboard.stats
+
+        await stack.enter_async_context(leaderboard)
+
+        reviews = ReviewsRepository(
+            session_maker,
+            max_batch=settings.REVIEWS_WRITE_MAX_BATCH,
+            max_wait=settings.REVIEWS_WRITE_MAX_WAIT,
+        )
+        stats["reviews_writer"] = lambda: reviews.stats
+
+        # commit the queued writes before the app exits
+        stack.push_async_callback(reviews.close)
+
+        http_app = HTTPApp(
+            users=UsersUseCase(UsersRepository(session_maker), invalidator=tags),
+            reviews=ReviewsUseCase(reviews, invalidator=tags, leaderboard=leaderboard),
+            openlibrary=openlibrary,
+            leaderboard=leaderboard,
+            stats=stats,
+            cache=cache,
+            tags=tags,
+        )
 
-    await http_app.serve()
+        await http_app.serve()
@@ -1,4 +1,5 @@
 import secrets
+from typing import Literal, Optional
 
 from dynaconf import Dynaconf
 from pydantic import BaseModel, ConfigDict
@@ -14,6 +15,47 @@ class Schema(BaseModel):
     # Path to the sqlite DB
     DB: str = "db.sqlite3"
 
+    # SQLite journal mode, WAL lets the readers go on while a writer commits
+    DB_JOURNAL_MODE: Literal[
+        "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"
+    ] = "WAL"
+
+    # SQLite synchronous level, NORMAL is enough for WAL
+    DB_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+
+    # SQLite page cache size in bytes per connection
+    DB_CACHE_SIZE: int = 64 * 1024 * 1024
+
+    # Size in bytes of the DB mapped into memory, 0 disables it
+    DB_MMAP_SIZE: int = 256 * 1024 * 1024
+
+    # Where SQLite keeps temporary tables and indexes
+    DB_TEMP_STORE: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
+
+    # Time in seconds a DB connection waits for a lock before failing
+    DB_BUSY_TIMEOUT: float = 5
+
+    # Time in seconds between DB maintenance runs, 0 disables them
+    DB_MAINTENANCE_INTERVAL: int = 60 * 60
+
+    # Maximum number of free DB pages released per maintenance run
+    DB_VACUUM_PAGES: int = 1000
+
+    # Number of DB connections kept open, each with its own page cache
+    DB_POOL_SIZE: int = 8
+
+    # Number of DB connections opened beyond the pool size under load
+    DB_POOL_MAX_OVERFLOW: int = 0
+
+    # Time in seconds to wait for a free DB connection before failing
+    DB_POOL_TIMEOUT: float = 30
+
+    # Whether to test a DB connection before it is handed out
+    DB_POOL_PRE_PING: bool = False
+
+    # Time in seconds after which a DB connection is replaced, -1 keeps it open
+    DB_POOL_RECYCLE: int = -1
+
     # Port to run HTTP server on
     PORT: int = 5000
 
@@ -42,6 +84,120 @@ class Schema(BaseModel):
     # Openlibrary covers base url
     OPENLIBRARY_COVERS_BASE_URL: str = "https://covers.openlibrary.org/"
 
+    # Timeouts for the openlibrary endpoints in seconds
+    OPENLIBRARY_SEARCH_TIMEOUT: float = 10
+    OPENLIBRARY_WORKS_TIMEOUT: float = 5
+    OPENLIBRARY_AUTHORS_TIMEOUT: float = 5
+    OPENLIBRARY_COVERS_TIMEOUT: float = 10
+
+    # Attempts for the openlibrary requests failed with 5xx, 429 or network error
+    OPENLIBRARY_RETRY_ATTEMPTS: int = 3
+
+    # Bounds of the randomized exponential delay between attempts in seconds
+    OPENLIBRARY_RETRY_BASE_DELAY: float = 0.2
+    OPENLIBRARY_RETRY_MAX_DELAY: float = 2
+
+    # Consecutive openlibrary failures that open the circuit breaker
+    OPENLIBRARY_BREAKER_FAILURE_THRESHOLD: int = 5
+
+    # Time in seconds the circuit breaker stays open before probing openlibrary again
+    OPENLIBRARY_BREAKER_RESET_TIMEOUT: float = 30
+
+    # Maximum connections to openlibrary in total per session, 0 means no limit
+    OPENLIBRARY_POOL_LIMIT: int = 100
+
+    # Maximum connections to the same openlibrary host, 0 means no limit
+    OPENLIBRARY_POOL_LIMIT_PER_HOST: int = 32
+
+    # Time in seconds an idle openlibrary connection is kept open for reuse
+    OPENLIBRARY_KEEPALIVE_TIMEOUT: float = 30
+
+    # Time in seconds resolved openlibrary addresses are cached
+    OPENLIBRARY_DNS_CACHE_TTL: int = 300
+
+    # Path to the local catalog imported from the openlibrary data dumps.
+    # Openlibrary is used only for what is missing there. Disabled if not set.
+    OPENLIBRARY_DUMP_DB: Optional[str] = None
+
+    # Time in minutes a persisted openlibrary work or author is served as is
+    CATALOG_FRESH_MINUTES: int = 60 * 24
+
+    # Time in minutes a stale work or author is served while being refreshed in background
+    CATALOG_STALE_MINUTES: int = 60 * 24 * 30
+
+    # Whether to answer searches from the index of the previously found books
+    PREVIEWS_INDEX_SEARCH: bool = True
+
+    # Minimum number of books matching the title or authors to answer search from the index
+    PREVIEWS_INDEX_MIN_HITS: int = 10
+
+    # Maximum memory in bytes used by the suggestions of the books found before
+    SUGGESTIONS_MAX_MEMORY: int = 64 * 1024 * 1024
+
+    # Number of top search results whose details are prefetched, 0 disables prefetching
+    PREFETCH_TOP: int = 3
+
+    # Maximum number of details being prefetched at once
+    PREFETCH_CONCURRENCY: int = 2
+
+    # Maximum number of books waiting to be prefetched
+    PREFETCH_QUEUE_SIZE: int = 100
+
+    # Response cache tiers from the fastest: "memory" (in-process) and/or "memcached"
+    CACHE_TIERS: list[Literal["memory", "memcached"]] = ["memory"]
+
+    # Maximum size in bytes of the in-process response cache
+    CACHE_MEMORY_MAX_SIZE: int = 64 * 1024 * 1024
+
+    # Address of memcached shared between the app replicas
+    CACHE_MEMCACHED_HOST: str = "localhost"
+    CACHE_MEMCACHED_PORT: int = 11211
+
+    # Number of connections to memcached
+    CACHE_MEMCACHED_POOL_SIZE: int = 4
+
+    # Time in seconds expired responses are served while one request refreshes them
+    CACHE_STALE_FOR: int = 60
+
+    # Eagerness of refreshing hot responses before they expire, 0 disables it
+    CACHE_EARLY_REFRESH_BETA: float = 1.0
+
+    # Time in seconds the reviews are cached, writes invalidate the affected ones
+    CACHE_REVIEWS_EXPIRE: int = 5 * 60
+
+    # Time in seconds the users are cached, new users invalidate them
+    CACHE_USERS_EXPIRE: int = 5 * 60
+
+    # Maximum number of the review writes committed in a single transaction
+    REVIEWS_WRITE_MAX_BATCH: int = 1000
+
+    # Time in seconds a review write waits for others to be committed with, 0 disables it
+    REVIEWS_WRITE_MAX_WAIT: float = 0
+
+    # Logins of the users allowed to import and export reviews in bulk
+    ADMIN_LOGINS: list[str] = []
+
+    # Number of the reviews imported in a single transaction
+    REVIEWS_IMPORT_BATCH_SIZE: int = 10_000
+
+    # Number of the books kept on the trending and top rated leaderboards
+    LEADERBOARD_SIZE: int = 100
+
+    # Number of the last days the trending books are reviewed in, today included
+    LEADERBOARD_TRENDING_DAYS: int = 7
+
+    # Number of the mean ratings added to the ratings of the top rated books
+    LEADERBOARD_PRIOR_REVIEWS: float = 10
+
+    # Time in seconds between full refreshes of the leaderboards
+    LEADERBOARD_REFRESH_INTERVAL: float = 5 * 60
+
+    # Directory to store cached cover images in
+    COVERS_CACHE_DIR: str = "covers"
+
+    # Maximum total size of the cached cover images in bytes
+    COVERS_CACHE_MAX_SIZE: int = 512 * 1024 * 1024
+
 
 settings = Schema(
     **Dynaconf(
@@ -0,0 +1,164 @@
+"""
+Import and export reviews in bulk as newline delimited JSON,
+one review per line in the format of the "/admin/reviews" routes.
+
+    python -m book_review.controller.cli import reviews.ndjson
+    python -m book_review.controller.cli export reviews.ndjson
+
+"-" stands for stdin and stdout. Responses cached by the running app
+are not invalidated, so they pick up the imported reviews once they expire.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from contextlib import contextmanager
+from typing import IO, AsyncIterator, Iterable, Iterator
+
+import sqlalchemy.ext.asyncio as sqlalchemy
+
+import book_review.db as db
+import book_review.models.reviews as models
+from book_review.config import settings
+from book_review.controller.http.models import ReviewRecord
+from book_review.dao.reviews import ORMRepository as ReviewsRepository
+from book_review.db.storage import StorageProfile, apply_profile
+from book_review.usecase.reviews import UseCase as ReviewsUseCase
+
+
+class InvalidReviewError(Exception):
+    pass
+
+
+async def read_reviews(lines: Iterable[bytes]) -> AsyncIterator[models.Review]:
+    """
+    Reviews of the newline delimited JSON lines, blank lines are skipped.
+    """
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            yield ReviewRecord.model_validate_json(line).map()
+        except ValueError as e:
+            raise InvalidReviewError(f"invalid review on line {number}: {e}")
+
+
+async def write_reviews(reviews: AsyncIterator[models.Review], file: IO[bytes]) -> int:
+    """
+    Write the reviews as newline delimited JSON.
+    Returns the number of written reviews.
+    """
+
+    written = 0
+
+    async for review in reviews:
+        file.write(ReviewRecord.parse(review).model_dump_json().encode() + b"\n")
+        written += 1
+
+    return written
+
+
+@contextmanager
+def _open(path: str, mode: str, std: IO[bytes]) -> Iterator[IO[bytes]]:
+    """
+    Open the file, or use the standard stream for "-" without closing it.
+    """
+
+    if path == "-":
+        yield std
+        return
+
+    with open(path, mode) as file:
+        yield file
+
+
+def _report(verb: str, report: models.TransferReport) -> None:
+    # stdout may be taken by the exported reviews
+    print(
+        f"{verb} {report.rows:,} reviews in {report.seconds:.1f}s, "
+        f"{report.rows_per_second:,.0f} rows/s",
+        file=sys.stderr,
+    )
+
+
+async def _run(args: argparse.Namespace) -> None:
+    engine = sqlalchemy.create_async_engine(f"sqlite+aiosqlite:///{args.db}")
+
+    # same as the app, so that its readers are not blocked by the import
+    apply_profile(
+        engine,
+        StorageProfile(
+            journal_mode=settings.DB_JOURNAL_MODE,
+            synchronous=settings.DB_SYNCHRONOUS,
+            cache_size=settings.DB_CACHE_SIZE,
+            mmap_size=settings.DB_MMAP_SIZE,
+            temp_store=settings.DB_TEMP_STORE,
+            busy_timeout=settings.DB_BUSY_TIMEOUT,
+        ),
+    )
+
+    try:
+        # migrations
+        await db.create_all(engine)
+
+        reviews = ReviewsUseCase(
+            ReviewsRepository(sqlalchemy.async_sessionmaker(engine))
+        )
+
+        if args.command == "import":
+            with _open(args.path, "rb", sys.stdin.buffer) as file:
+                report = await reviews.import_reviews(
+                    read_reviews(file), batch_size=args.batch_size
+                )
+
+            _report("imported", report)
+        else:
+            started_at = time.perf_counter()
+
+            with _open(args.path, "wb", sys.stdout.buffer) as file:
+                written = await write_reviews(
+                    reviews.export_reviews(batch_size=args.batch_size), file
+                )
+
+            _report(
+                "exported",
+                models.TransferReport(
+                    rows=written, seconds=time.perf_counter() - started_at
+                ),
+            )
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Import and export reviews as newline delimited JSON"
+    )
+
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path", help='reviews file, "-" for stdin or stdout')
+    parser.add_argument("--db", default=settings.DB, help="reviews database")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=settings.REVIEWS_IMPORT_BATCH_SIZE,
+        help="reviews per transaction on import and per fetch on export",
+    )
+
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(_run(args))
+    except InvalidReviewError as e:
+        print(f"import failed: {e}", file=sys.stderr)
+        print(
+            "reviews before it are imported, the import can be rerun", file=sys.stderr
+        )
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,51 @@
+import asyncio
+import base64
+import binascii
+import logging
+import os
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Annotated, Any, AsyncGenerator, Optional, Sequence
+from typing import (
+    Annotated,
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Mapping,
+    Optional,
+    Sequence,
+)
 
+import orjson
 import uvicorn
-from fastapi import Depends, FastAPI, HTTPException, Response, status
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import ORJSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi_cache import FastAPICache
+from fastapi_cache.backends import Backend
 from fastapi_cache.backends.inmemory import InMemoryBackend
-from fastapi_cache.decorator import cache
 from jose import JWTError, jwt
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
+import book_review.models.reviews as reviews_models
+import book_review.usecase.tags as cache_tags
 from book_review.config import settings
 from book_review.models.book import CoverID
+from book_review.models.reviews import ReviewCursor
+from book_review.usecase.leaderboard import Leaderboard
+from book_review.usecase.openlibrary import UpstreamError
 from book_review.usecase.openlibrary import UseCase as OpenlibraryUseCase
 from book_review.usecase.reviews import UseCase as ReviewsUseCase
 from book_review.usecase.users import UseCase as UsersUseCase
 
+from .cache import TagVersions, key_builder
 from .coder import ORJSONCoder
+from .decorator import ResponseCache
 from .models import (
     Author,
     AuthorID,
@@ -28,14 +53,41 @@ from .models import (
     BookID,
     BookPreview,
     CoverSize,
+    RankedBook,
+    RatedBookPreview,
+    Rating,
     Review,
+    ReviewRecord,
     ReviewRequest,
+    Sort,
+    Suggestion,
+    TransferReport,
     User,
     UserID,
 )
 
+_logger = logging.getLogger(__name__)
+
 _OAUTH2_SCHEME = OAuth2PasswordBearer(tokenUrl="token")
 
+_NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Number of the listed reviews per page by default and at most
+_PAGE_SIZE = 100
+_MAX_PAGE_SIZE = 1000
+
+# Number of the exported reviews sent in a single chunk
+_EXPORT_CHUNK_SIZE = 1000
+
+# Size of the chunks the stored covers are sent in
+_FILE_CHUNK_SIZE = 64 * 1024
+
+# Number of the streamed previews rated by a single query
+_RATING_CHUNK_SIZE = 20
+
+# Named providers of the runtime statistics exposed for monitoring
+StatsProviders = Mapping[str, Callable[[], Any]]
+
 
 class _Tags(str, Enum):
     """
@@ -46,6 +98,7 @@ class _Tags(str, Enum):
     BOOKS = "books"
     AUTHORS = "authors"
     USERS = "users"
+    ADMIN = "admin"
     HEALTHCHECK = "healthcheck"
 
 
@@ -81,12 +134,127 @@ def _create_access_token(
     return encoded_jwt
 
 
+def _encode_cursor(cursor: ReviewCursor) -> str:
+    """
+    Opaque URL-safe representation of the cursor.
+    """
+
+    return base64.urlsafe_b64encode(cursor.model_dump_json().encode()).decode()
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[ReviewCursor]:
+    if cursor is None:
+        return None
+
+    try:
+        return ReviewCursor.model_validate_json(base64.urlsafe_b64decode(cursor))
+    except (ValueError, binascii.Error):
+        # TODO: add this exception into schema
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"invalid cursor {repr(cursor)}",
+        )
+
+
+def _link_next_page(
+    request: Request,
+    response: Response,
+    reviews: Sequence[reviews_models.Review],
+    limit: int,
+) -> None:
+    """
+    Link the page after the reviews, unless they are the last ones.
+    """
+
+    if len(reviews) < limit:
+        return
+
+    url = request.url.include_query_params(
+        after=_encode_cursor(ReviewCursor.of(reviews[-1]))
+    )
+
+    # relative, so that the cached link fits the requests to any host
+    response.headers["Link"] = f'<{url.path}?{url.query}>; rel="next"'
+
+
+async def _read_file(file: BinaryIO) -> AsyncIterator[bytes]:
+    """
+    Chunks of the opened file, which is closed once it is read or abandoned.
+    """
+
+    try:
+        while chunk := await asyncio.to_thread(file.read, _FILE_CHUNK_SIZE):
+            yield chunk
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+async def _read_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """
+    Split the streamed body into lines.
+    """
+
+    rest = b""
+
+    async for chunk in chunks:
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+
+        for line in lines:
+            yield line
+
+    if rest:
+        yield rest
+
+
+async def _read_reviews(
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[reviews_models.Review]:
+    """
+    Reviews of the streamed newline delimited JSON body, blank lines are skipped.
+    """
+
+    number = 0
+
+    async for line in _read_lines(chunks):
+        number += 1
+
+        if not line.strip():
+            continue
+
+        try:
+            yield ReviewRecord.model_validate_json(line).map()
+        except ValidationError as e:
+            # TODO: add this exception into schema
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"invalid review on line {number}: {e}",
+            )
+
+
+def _previews_data(cached: Response | Sequence[BookPreview]) -> list[dict[str, Any]]:
+    """
+    JSON objects of the previews returned by the cached search.
+    """
+
+    if isinstance(cached, Response):
+        data: list[dict[str, Any]] = orjson.loads(cached.body)
+
+        return data
+
+    return [preview.model_dump(mode="json") for preview in cached]
+
+
 class App:
     _app: FastAPI
 
     _users: UsersUseCase
     _reviews: ReviewsUseCase
     _openlibrary: OpenlibraryUseCase
+    _leaderboard: Optional[Leaderboard]
+    _stats: StatsProviders
+    _tags: TagVersions
+    _cache: ResponseCache
 
     def __init__(
         self,
@@ -94,6 +262,10 @@ class App:
         users: UsersUseCase,
         reviews: ReviewsUseCase,
         openlibrary: OpenlibraryUseCase,
+        leaderboard: Optional[Leaderboard] = None,
+        stats: StatsProviders = {},
+        cache: Optional[Backend] = None,
+        tags: Optional[TagVersions] = None,
         title: str = "Book Review Platform",
         summary: str = """
         BRP is a dynamic online platform designed to foster a vibrant community of book
@@ -106,7 +278,9 @@ class App:
     ) -> None:
         @asynccontextmanager
         async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
-            FastAPICache.init(InMemoryBackend(), coder=ORJSONCoder)
+            FastAPICache.init(
+                cache or InMemoryBackend(), coder=ORJSONCoder, key_builder=key_builder
+            )
 
             yield
 
@@ -130,6 +304,12 @@ class App:
         self._users = users
         self._reviews = reviews
         self._openlibrary = openlibrary
+        self._leaderboard = leaderboard
+        self._tags = tags or TagVersions()
+        self._cache = ResponseCache(
+            stale_for=settings.CACHE_STALE_FOR, beta=settings.CACHE_EARLY_REFRESH_BETA
+        )
+        self._stats = {**stats, "response_cache_refresh": lambda: self._cache.stats}
 
     async def serve(self) -> None:
         """
@@ -155,10 +335,21 @@ class App:
 
         app = self._app
 
+        @app.exception_handler(UpstreamError)
+        async def upstream_error(_: Request, e: UpstreamError) -> ORJSONResponse:
+            return ORJSONResponse(
+                {"detail": f"openlibrary is unavailable: {e}"},
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
         @app.get("/health", tags=[_Tags.HEALTHCHECK.value])
         async def health() -> str:
             return "ok"
 
+        @app.get("/metrics", tags=[_Tags.HEALTHCHECK.value])
+        async def metrics() -> dict[str, Any]:
+            return {name: provider() for name, provider in self._stats.items()}
+
         @app.post("/token", tags=[_Tags.USERS.value])
         async def token(
             form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
@@ -185,15 +376,130 @@ class App:
 
             return Token(access_token=access_token, token_type="bearer")
 
-        @app.get("/books", tags=[_Tags.BOOKS.value])
-        @cache(expire=60 * 60 * 24)
-        async def search_books(query: str) -> Sequence[BookPreview]:
-            books = await self._openlibrary.search_books_previews(query)
+        # request and response are used by the cache decorator for the HTTP caching headers
+        @self._cache.cached(expire=60 * 60 * 24, serialized=True)
+        async def search_books_json(
+            request: Optional[Request],
+            response: Optional[Response],
+            query: str,
+            sort: Optional[Sort],
+            language: Optional[str],
+            page: Optional[int],
+            limit: Optional[int],
+        ) -> Sequence[BookPreview]:
+            books = await self._openlibrary.search_books_previews(
+                query, sort=sort, language=language, page=page, limit=limit
+            )
 
             return list(map(BookPreview.parse, books))
 
+        @app.get(
+            "/books",
+            response_model=Sequence[RatedBookPreview],
+            responses={200: {"content": {_NDJSON_MEDIA_TYPE: {}}}},
+            tags=[_Tags.BOOKS.value],
+        )
+        async def search_books(
+            request: Request,
+            response: Response,
+            query: str,
+            sort: Optional[Sort] = None,
+            language: Optional[str] = None,
+            page: Annotated[Optional[int], Query(gt=0)] = None,
+            limit: Annotated[Optional[int], Query(gt=0)] = None,
+            rating: bool = False,
+        ) -> Response | Sequence[BookPreview]:
+            """
+            Search books previews.
+            Previews are streamed as newline delimited JSON if requested
+            with the "Accept: application/x-ndjson" header.
+            Aggregated ratings of the books are included if `rating` is set.
+            """
+
+            if _NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+                # same cached previews as the JSON search, without its HTTP caching
+                cached = await search_books_json(
+                    query=query,
+                    sort=sort,
+                    language=language,
+                    page=page,
+                    limit=limit,
+                    request=None,
+                    response=None,
+                )
+
+                return StreamingResponse(
+                    self._write_previews(_previews_data(cached), rating=rating),
+                    media_type=_NDJSON_MEDIA_TYPE,
+                )
+
+            cached = await search_books_json(
+                query=query,
+                sort=sort,
+                language=language,
+                page=page,
+                limit=limit,
+                request=request,
+                response=response,
+            )
+
+            if not rating:
+                return cached
+
+            # ratings change with every review, so they are not cached with the previews
+            books_data = _previews_data(cached)
+
+            ratings = await self._reviews.find_ratings(
+                [book["id"] for book in books_data]
+            )
+
+            for book in books_data:
+                book["rating"] = Rating.parse(ratings[book["id"]]).model_dump()
+
+            return ORJSONResponse(books_data)
+
+        # registered before "/books/{id}" so that they are not taken for an id
+        @app.get("/books/suggest", tags=[_Tags.BOOKS.value])
+        async def suggest_books(
+            prefix: Annotated[str, Query(min_length=1)],
+            limit: Annotated[int, Query(gt=0, le=50)] = 10,
+        ) -> Sequence[Suggestion]:
+            """
+            Suggest books and authors whose titles and names start with the prefix.
+            Suggestions are answered in process from the books found before.
+            """
+
+            suggestions = await self._openlibrary.suggest(prefix, limit=limit)
+
+            return list(map(Suggestion.parse, suggestions))
+
+        @app.get("/books/trending", tags=[_Tags.BOOKS.value, _Tags.REVIEWS.value])
+        async def get_trending_books(
+            limit: Annotated[int, Query(gt=0, le=settings.LEADERBOARD_SIZE)] = 10,
+        ) -> Sequence[RankedBook]:
+            """
+            Books reviewed the most in the last days, scored by the number of reviews.
+            """
+
+            leaderboard = self._get_leaderboard()
+
+            return list(map(RankedBook.parse, leaderboard.trending(limit)))
+
+        @app.get("/books/top", tags=[_Tags.BOOKS.value, _Tags.REVIEWS.value])
+        async def get_top_rated_books(
+            limit: Annotated[int, Query(gt=0, le=settings.LEADERBOARD_SIZE)] = 10,
+        ) -> Sequence[RankedBook]:
+            """
+            Books with the highest Bayesian average rating,
+            so that a few high ratings do not outrank many good ones.
+            """
+
+            leaderboard = self._get_leaderboard()
+
+            return list(map(RankedBook.parse, leaderboard.top_rated(limit)))
+
         @app.get("/books/{id}", tags=[_Tags.BOOKS.value])
-        @cache(expire=60 * 60 * 24)
+        @self._cache.cached(expire=60 * 60 * 24, serialized=True)
         async def get_book(id: BookID) -> Book:
             book = await self._openlibrary.get_book(id)
 
@@ -206,8 +512,21 @@ class App:
 
             return Book.parse(book)
 
+        @app.get("/books/{id}/rating", tags=[_Tags.BOOKS.value, _Tags.REVIEWS.value])
+        @self._cache.cached(
+            expire=settings.CACHE_REVIEWS_EXPIRE,
+            serialized=True,
+            key_builder=self._tags.key_builder(lambda kw: [cache_tags.book(kw["id"])]),
+        )
+        async def get_book_rating(id: BookID) -> Rating:
+            """
+            Aggregated ratings of the book, empty if it has no reviews.
+            """
+
+            return Rating.parse(await self._reviews.get_rating(id))
+
         @app.get("/authors/{id}", tags=[_Tags.AUTHORS.value])
-        @cache(expire=60 * 60 * 24)
+        @self._cache.cached(expire=60 * 60 * 24, serialized=True)
         async def get_author(id: AuthorID) -> Author:
             author = await self._openlibrary.get_author(id)
 
@@ -230,11 +549,7 @@ class App:
             tags=[_Tags.BOOKS.value],
         )
         async def get_cover(id: CoverID, size: CoverSize = CoverSize.SMALL) -> Response:
-            # TODO: stream the response instead
-            cover = await self._openlibrary.get_cover(
-                id,
-                size,
-            )
+            cover = await self._openlibrary.get_cover(id, size)
 
             if cover is None:
                 # TODO: add this exception into schema
@@ -243,7 +558,17 @@ class App:
                     detail=f"image with id {repr(id)} not found",
                 )
 
-            return Response(cover, media_type="image/jpeg")
+            if isinstance(cover, AsyncIterator):
+                return StreamingResponse(cover, media_type="image/jpeg")
+
+            # the stored cover is opened already, so its eviction does not affect it
+            length = os.fstat(cover.fileno()).st_size
+
+            return StreamingResponse(
+                _read_file(cover),
+                media_type="image/jpeg",
+                headers={"Content-Length": str(length)},
+            )
 
         @app.post(
             "/reviews", tags=[_Tags.REVIEWS.value, _Tags.BOOKS.value, _Tags.USERS.value]
@@ -269,15 +594,75 @@ class App:
         @app.get(
             "/reviews", tags=[_Tags.BOOKS.value, _Tags.REVIEWS.value, _Tags.USERS.value]
         )
-        @cache(5)
+        @self._cache.cached(
+            expire=settings.CACHE_REVIEWS_EXPIRE,
+            serialized=True,
+            key_builder=self._tags.key_builder(
+                lambda kw: cache_tags.reviews(kw.get("book_id"), kw.get("user_id"))
+            ),
+        )
         async def find_reviews(
+            request: Request,
+            response: Response,
             book_id: Optional[BookID] = None,
             user_id: Optional[UserID] = None,
+            limit: Annotated[int, Query(gt=0, le=_MAX_PAGE_SIZE)] = _PAGE_SIZE,
+            after: Optional[str] = None,
         ) -> Sequence[Review]:
-            reviews = await self._reviews.find_reviews(book_id, user_id)
+            """
+            Find reviews from the newest.
+            Link to the next page is in the "Link" header if there might be one.
+            """
+
+            reviews = await self._reviews.find_reviews(
+                book_id, user_id, limit=limit, after=_decode_cursor(after)
+            )
+
+            _link_next_page(request, response, reviews, limit)
 
             return list(map(Review.parse, reviews))
 
+        @app.post(
+            "/admin/reviews/import",
+            openapi_extra={
+                "requestBody": {"content": {_NDJSON_MEDIA_TYPE: {}}, "required": True}
+            },
+            tags=[_Tags.ADMIN.value, _Tags.REVIEWS.value],
+        )
+        async def import_reviews(
+            request: Request, _: Annotated[User, Depends(self._get_admin)]
+        ) -> TransferReport:
+            """
+            Create or overwrite the reviews of the newline delimited JSON body
+            in large transactions, e.g. to migrate them from another system.
+            Reviews before an invalid line are imported, the import can be rerun.
+            """
+
+            report = await self._reviews.import_reviews(
+                _read_reviews(request.stream()),
+                batch_size=settings.REVIEWS_IMPORT_BATCH_SIZE,
+            )
+
+            return TransferReport.parse(report)
+
+        @app.get(
+            "/admin/reviews/export",
+            response_class=StreamingResponse,
+            responses={200: {"content": {_NDJSON_MEDIA_TYPE: {}}}},
+            tags=[_Tags.ADMIN.value, _Tags.REVIEWS.value],
+        )
+        async def export_reviews(
+            _: Annotated[User, Depends(self._get_admin)],
+        ) -> StreamingResponse:
+            """
+            Stream all the reviews as newline delimited JSON
+            in the format accepted by the import.
+            """
+
+            return StreamingResponse(
+                self._write_reviews(), media_type=_NDJSON_MEDIA_TYPE
+            )
+
         @app.post("/users", tags=[_Tags.USERS.value])
         async def create_user(login: str, password: str) -> User:
             user = await self._users.find_user_by_login(login)
@@ -297,14 +682,22 @@ class App:
             return User(id=user.id, login=user.login, created_at=user.created_at)
 
         @app.get("/users", tags=[_Tags.USERS.value])
-        @cache(5)
+        @self._cache.cached(
+            expire=settings.CACHE_USERS_EXPIRE,
+            serialized=True,
+            key_builder=self._tags.key_builder(lambda _: [cache_tags.USERS]),
+        )
         async def get_users(login: Optional[str] = None) -> Sequence[User]:
             users = await self._users.find_users(login=login)
 
             return list(map(User.parse, users))
 
         @app.get("/users/single", tags=[_Tags.USERS.value])
-        @cache(5)
+        @self._cache.cached(
+            expire=settings.CACHE_USERS_EXPIRE,
+            serialized=True,
+            key_builder=self._tags.key_builder(lambda _: [cache_tags.USERS]),
+        )
         async def get_single_user(
             id: Optional[UserID] = None, login: Optional[str] = None
         ) -> User:
@@ -339,21 +732,94 @@ class App:
             )
 
         @app.get("/users/me", tags=[_Tags.USERS.value])
-        @cache(5)
+        @self._cache.cached(5, serialized=True)
         async def get_current_user(
             user: Annotated[User, Depends(self._get_user)],
         ) -> User:
             return user
 
         @app.get("/users/me/reviews", tags=[_Tags.USERS.value, _Tags.REVIEWS.value])
-        @cache(5)
+        @self._cache.cached(
+            expire=settings.CACHE_REVIEWS_EXPIRE,
+            serialized=True,
+            key_builder=self._tags.key_builder(
+                lambda kw: [cache_tags.user(kw["user"].id)]
+            ),
+        )
         async def get_current_user_reviews(
+            request: Request,
+            response: Response,
             user: Annotated[User, Depends(self._get_user)],
+            limit: Annotated[int, Query(gt=0, le=_MAX_PAGE_SIZE)] = _PAGE_SIZE,
+            after: Optional[str] = None,
         ) -> Sequence[Review]:
-            reviews = await self._reviews.find_reviews(user_id=user.id)
+            """
+            Find reviews of the current user from the newest.
+            Link to the next page is in the "Link" header if there might be one.
+            """
+
+            reviews = await self._reviews.find_reviews(
+                user_id=user.id, limit=limit, after=_decode_cursor(after)
+            )
+
+            _link_next_page(request, response, reviews, limit)
 
             return list(map(Review.parse, reviews))
 
+    async def _write_reviews(self) -> AsyncIterator[bytes]:
+        """
+        All the reviews as newline delimited JSON sent in chunks.
+        """
+
+        started_at = time.perf_counter()
+        exported = 0
+
+        lines: list[bytes] = []
+
+        async for review in self._reviews.export_reviews():
+            lines.append(ReviewRecord.parse(review).model_dump_json().encode())
+
+            if len(lines) >= _EXPORT_CHUNK_SIZE:
+                exported += len(lines)
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+
+        if lines:
+            exported += len(lines)
+            yield b"\n".join(lines) + b"\n"
+
+        report = reviews_models.TransferReport(
+            rows=exported, seconds=time.perf_counter() - started_at
+        )
+
+        _logger.info(
+            "exported %d reviews in %.1fs, %.0f rows/s",
+            report.rows,
+            report.seconds,
+            report.rows_per_second,
+        )
+
+    async def _write_previews(
+        self, books_data: Sequence[dict[str, Any]], *, rating: bool
+    ) -> AsyncIterator[bytes]:
+        """
+        Previews as newline delimited JSON, rated a chunk at a time if requested,
+        so that the first ones are sent before the rest are rated.
+        """
+
+        for start in range(0, len(books_data), _RATING_CHUNK_SIZE):
+            chunk = books_data[start : start + _RATING_CHUNK_SIZE]
+
+            if rating:
+                ratings = await self._reviews.find_ratings(
+                    [book["id"] for book in chunk]
+                )
+
+                for book in chunk:
+                    book["rating"] = Rating.parse(ratings[book["id"]]).model_dump()
+
+            yield b"".join(orjson.dumps(book) + b"\n" for book in chunk)
+
     async def _get_user(self, token: Annotated[str, Depends(_OAUTH2_SCHEME)]) -> User:
         # TODO: add this exception into schema
         credentials_exception = HTTPException(
@@ -382,3 +848,25 @@ class App:
             raise credentials_exception
 
         return User.parse(user)
+
+    async def _get_admin(self, token: Annotated[str, Depends(_OAUTH2_SCHEME)]) -> User:
+        user = await self._get_user(token)
+
+        if user.login not in settings.ADMIN_LOGINS:
+            # TODO: add this exception into schema
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="admin privileges are required",
+            )
+
+        return user
+
+    def _get_leaderboard(self) -> Leaderboard:
+        if self._leaderboard is None:
+            # TODO: add this exception into schema
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="leaderboards are disabled",
+            )
+
+        return self._leaderboard
@@ -0,0 +1,300 @@
+import logging
+import math
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+
+import aiomcache
+from fastapi_cache.backends import Backend
+from pydantic import BaseModel
+
+_logger = logging.getLogger(__name__)
+
+# memcached treats expiration times longer than 30 days as unix timestamps
+_MEMCACHED_MAX_RELATIVE_EXPIRE = 60 * 60 * 24 * 30
+
+
+class LRUStats(BaseModel):
+    entries: int = 0
+
+    # Approximate size of the stored keys and values in bytes
+    size: int = 0
+    max_size: int = 0
+
+    hits: int = 0
+    misses: int = 0
+
+    # Entries removed to fit the size budget
+    evictions: int = 0
+
+    # Entries removed because they expired
+    expirations: int = 0
+
+
+class TieredStats(BaseModel):
+    l1: LRUStats
+
+    # Lookups that missed L1 and were found in L2
+    l2_hits: int = 0
+
+    # Lookups that missed both tiers
+    l2_misses: int = 0
+
+    # L2 operations that failed, L1 keeps serving meanwhile
+    l2_errors: int = 0
+
+
+class _Entry(NamedTuple):
+    data: str
+    size: int
+
+    # time the entry expires at, None if it never does
+    expires_at: Optional[float]
+
+
+class LRUBackend(Backend):
+    """
+    In-process cache backend bounded by the total size of the stored entries.
+    Least recently used entries are evicted once the budget is exceeded.
+    """
+
+    _max_size: int
+    _clock: Callable[[], float]
+    _entries: OrderedDict[str, _Entry]
+    _stats: LRUStats
+
+    def __init__(
+        self, max_size: int, *, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        Stored keys and values take at most `max_size` bytes.
+        """
+
+        self._max_size = max_size
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._stats = LRUStats(max_size=max_size)
+
+    @property
+    def stats(self) -> LRUStats:
+        """
+        Snapshot of the cache counters.
+        """
+
+        return self._stats.model_copy(update={"entries": len(self._entries)})
+
+    async def get_with_ttl(self, key: str) -> tuple[int, Optional[str]]:
+        entry = self._get(key)
+
+        if entry is None:
+            return 0, None
+
+        if entry.expires_at is None:
+            return -1, entry.data
+
+        return math.ceil(entry.expires_at - self._clock()), entry.data
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._get(key)
+
+        return None if entry is None else entry.data
+
+    async def set(self, key: str, value: str, expire: Optional[int] = None) -> None:
+        self._remove(key)
+
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+
+        if size > self._max_size:
+            return
+
+        expires_at = None if not expire else self._clock() + expire
+
+        self._entries[key] = _Entry(value, size, expires_at)
+        self._stats.size += size
+
+        while self._stats.size > self._max_size:
+            oldest = next(iter(self._entries))
+
+            self._remove(oldest)
+            self._stats.evictions += 1
+
+    async def clear(
+        self, namespace: Optional[str] = None, key: Optional[str] = None
+    ) -> int:
+        if namespace:
+            keys = [k for k in self._entries if k.startswith(namespace)]
+        elif key:
+            keys = [key] if key in self._entries else []
+        else:
+            keys = list(self._entries)
+
+        for k in keys:
+            self._remove(k)
+
+        return len(keys)
+
+    def _get(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self._stats.misses += 1
+            return None
+
+        if entry.expires_at is not None and entry.expires_at <= self._clock():
+            self._remove(key)
+            self._stats.expirations += 1
+            self._stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._stats.hits += 1
+
+        return entry
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self._stats.size -= entry.size
+
+
+class MemcachedBackend(Backend):
+    """
+    Cache backend shared between the app replicas.
+
+    Values are stored along with the time they expire at,
+    so that the remaining TTL is known like in the other backends.
+    Memcached can not delete keys by prefix, so only single keys are cleared,
+    and the entries of a namespace are left to expire by their TTL.
+    """
+
+    _client: aiomcache.Client
+    _clock: Callable[[], float]
+
+    def __init__(
+        self, client: aiomcache.Client, *, clock: Callable[[], float] = time.time
+    ) -> None:
+        self._client = client
+        self._clock = clock
+
+    async def get_with_ttl(self, key: str) -> tuple[int, Optional[str]]:
+        value = await self._client.get(key.encode())
+
+        if value is None:
+            return 0, None
+
+        expires_at, _, data = value.partition(b":")
+
+        if not int(expires_at):
+            return -1, data.decode()
+
+        return max(int(expires_at) - int(self._clock()), 0), data.decode()
+
+    async def get(self, key: str) -> Optional[str]:
+        _, data = await self.get_with_ttl(key)
+
+        return data
+
+    async def set(self, key: str, value: str, expire: Optional[int] = None) -> None:
+        now = int(self._clock())
+
+        expires_at = now + expire if expire else 0
+
+        exptime = expire or 0
+
+        if exptime > _MEMCACHED_MAX_RELATIVE_EXPIRE:
+            exptime = expires_at
+
+        await self._client.set(
+            key.encode(), f"{expires_at}:{value}".encode(), exptime=exptime
+        )
+
+    async def clear(
+        self, namespace: Optional[str] = None, key: Optional[str] = None
+    ) -> int:
+        if namespace or not key:
+            # entries expire by their TTL, nothing is cleared right away
+            return 0
+
+        return int(await self._client.delete(key.encode()))
+
+
+class TieredBackend(Backend):
+    """
+    Two-tier cache backend: fast in-process L1 in front of shared L2.
+
+    L2 hits are copied to L1 for the rest of their TTL.
+    L2 failures are logged and treated as misses, so L1 keeps serving.
+    """
+
+    _l1: LRUBackend
+    _l2: Backend
+    _stats: TieredStats
+
+    def __init__(self, l1: LRUBackend, l2: Backend) -> None:
+        self._l1 = l1
+        self._l2 = l2
+        self._stats = TieredStats(l1=l1.stats)
+
+    @property
+    def stats(self) -> TieredStats:
+        """
+        Snapshot of the cache counters.
+        """
+
+        return self._stats.model_copy(update={"l1": self._l1.stats})
+
+    async def get_with_ttl(self, key: str) -> tuple[int, Optional[str]]:
+        ttl, data = await self._l1.get_with_ttl(key)
+
+        if data is not None:
+            return ttl, data
+
+        try:
+            ttl, data = await self._l2.get_with_ttl(key)
+        except Exception:
+            self._stats.l2_errors += 1
+            _logger.warning("failed to get %s from L2 cache", key, exc_info=True)
+
+            return 0, None
+
+        if data is None:
+            self._stats.l2_misses += 1
+
+            return 0, None
+
+        self._stats.l2_hits += 1
+
+        if ttl != 0:
+            await self._l1.set(key, data, ttl if ttl > 0 else None)
+
+        return ttl, data
+
+    async def get(self, key: str) -> Optional[str]:
+        _, data = await self.get_with_ttl(key)
+
+        return data
+
+    async def set(self, key: str, value: str, expire: Optional[int] = None) -> None:
+        await self._l1.set(key, value, expire)
+
+        try:
+            await self._l2.set(key, value, expire)
+        except Exception:
+            self._stats.l2_errors += 1
+            _logger.warning("failed to set %s in L2 cache", key, exc_info=True)
+
+    async def clear(
+        self, namespace: Optional[str] = None, key: Optional[str] = None
+    ) -> int:
+        cleared = await self._l1.clear(namespace, key)
+
+        try:
+            cleared = max(cleared, await self._l2.clear(namespace, key))
+        except Exception:
+            # entries left in L2 expire by their TTL
+            self._stats.l2_errors += 1
+            _logger.warning("failed to clear L2 cache", exc_info=True)
+
+        return cleared
@@ -0,0 +1,208 @@
+import hashlib
+import logging
+import secrets
+from enum import Enum
+from typing import Any, Awaitable, Callable, Mapping, Optional, Sequence
+
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends import Backend
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+from book_review.usecase.openlibrary import normalize_query
+from book_review.usecase.tags import Invalidator
+
+from .models import User
+
+_logger = logging.getLogger(__name__)
+
+# Free text parameters normalized the same way they are before calling openlibrary
+_NORMALIZERS: Mapping[str, Callable[[str], str]] = {
+    "query": normalize_query,
+}
+
+
+def _canonical(name: str, value: Any) -> str:
+    if isinstance(value, User):
+        # private routes are cached per user and not per token
+        return str(value.id)
+
+    if isinstance(value, Enum):
+        return str(value.value)
+
+    if isinstance(value, str) and name in _NORMALIZERS:
+        return _NORMALIZERS[name](value)
+
+    return str(value)
+
+
+def canonical_key(
+    func: Callable[..., Any], args: Sequence[Any], kwargs: Mapping[str, Any]
+) -> str:
+    """
+    Canonical representation of the route call.
+    Parameters are sorted by name, the ones that are not set are omitted
+    and the text ones are normalized, so that equivalent requests share it.
+    """
+
+    params = "&".join(
+        [
+            *(_canonical("", value) for value in args),
+            *(
+                f"{name}={_canonical(name, value)}"
+                for name, value in sorted(kwargs.items())
+                if value is not None
+            ),
+        ]
+    )
+
+    return f"{func.__module__}:{func.__name__}?{params}"
+
+
+# Tags of the cached route call by its keyword arguments
+TagsFunc = Callable[[Mapping[str, Any]], Sequence[str]]
+
+# Cache key builder called by the cache decorator
+KeyBuilder = Callable[..., Awaitable[str]]
+
+
+def _digest(key: str) -> str:
+    return hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def key_builder(
+    func: Callable[..., Any],
+    namespace: Optional[str] = "",
+    request: Optional[Request] = None,
+    response: Optional[Response] = None,
+    args: Optional[tuple[Any, ...]] = None,
+    kwargs: Optional[dict[str, Any]] = None,
+) -> str:
+    """
+    Cache key builder that maps equivalent requests to the same key.
+    Only the route parameters are used, never the request headers.
+    """
+
+    key = canonical_key(func, args or (), kwargs or {})
+
+    return f"{FastAPICache.get_prefix()}:{namespace}:{_digest(key)}"
+
+
+class TagVersionsStats(BaseModel):
+    # Reads of the tag versions that failed, the calls were not cached
+    read_failures: int = 0
+
+    # Invalidations of the tags that failed, their entries expire by TTL instead
+    invalidation_failures: int = 0
+
+
+class TagVersions(Invalidator):
+    """
+    Current versions of the cache tags kept in the cache backend.
+
+    Keys of the tagged entries include the versions of their tags,
+    so bumping the version of a tag makes all its entries unreachable
+    and they expire by their TTL. A missing version gets a new random one,
+    so that an evicted version never brings back the entries cached before it.
+
+    Failures of the backend never fail the calls: the tagged calls are not cached
+    while the versions can not be read, and the entries of the tags that failed
+    to be invalidated are served until they expire.
+    """
+
+    _backend: Optional[Backend]
+    _stats: TagVersionsStats
+
+    def __init__(self, backend: Optional[Backend] = None) -> None:
+        """
+        Versions are kept in the `backend`, it must be shared by all the app replicas.
+        The response cache backend is used by default.
+        """
+
+        self._backend = backend
+        self._stats = TagVersionsStats()
+
+    @property
+    def stats(self) -> TagVersionsStats:
+        """
+        Snapshot of the failure counters.
+        """
+
+        return self._stats.model_copy()
+
+    async def invalidate(self, tags: Sequence[str]) -> None:
+        backend = self._get_backend()
+
+        for tag in tags:
+            try:
+                await backend.set(self._key(tag), secrets.token_hex(8))
+            except Exception:
+                # the write is committed already, so it must not fail because of this
+                self._stats.invalidation_failures += 1
+                _logger.warning("failed to invalidate cache tag %r", tag, exc_info=True)
+
+    async def versions(self, tags: Sequence[str]) -> Sequence[str]:
+        """
+        Current versions of the tags in the same order.
+        Errors of the backend are raised, so that the caller skips the cache.
+        """
+
+        backend = self._get_backend()
+
+        versions: list[str] = []
+
+        try:
+            for tag in tags:
+                key = self._key(tag)
+
+                version = await backend.get(key)
+
+                if version is None:
+                    version = secrets.token_hex(8)
+                    await backend.set(key, version)
+
+                versions.append(version)
+        except Exception:
+            self._stats.read_failures += 1
+            raise
+
+        return versions
+
+    def key_builder(self, tags: TagsFunc) -> KeyBuilder:
+        """
+        Cache key builder for the route whose entries carry the tags
+        built from the keyword arguments of the call.
+        """
+
+        async def build(
+            func: Callable[..., Any],
+            namespace: Optional[str] = "",
+            request: Optional[Request] = None,
+            response: Optional[Response] = None,
+            args: Optional[tuple[Any, ...]] = None,
+            kwargs: Optional[dict[str, Any]] = None,
+        ) -> str:
+            kwargs = kwargs or {}
+
+            entry_tags = tags(kwargs)
+            versions = await self.versions(entry_tags)
+
+            key = "&".join(
+                [
+                    canonical_key(func, args or (), kwargs),
+                    *(f"{t}@{v}" for t, v in zip(entry_tags, versions)),
+                ]
+            )
+
+            return f"{FastAPICache.get_prefix()}:{namespace}:{_digest(key)}"
+
+        return build
+
+    def _get_backend(self) -> Backend:
+        return self._backend or FastAPICache.get_backend()
+
+    @staticmethod
+    def _key(tag: str) -> str:
+        # tags carry the ids from the requests, which are not valid memcached keys
+        return f"{FastAPICache.get_prefix()}:tags:{_digest(tag)}"
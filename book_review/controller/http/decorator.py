@@ -0,0 +1,503 @@
+import asyncio
+import hashlib
+import inspect
+import logging
+import math
+import random
+import time
+from abc import ABC, abstractmethod
+from functools import wraps
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Mapping,
+    NamedTuple,
+    Optional,
+    ParamSpec,
+    TypeVar,
+    cast,
+)
+
+import orjson
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends import Backend
+from pydantic import BaseModel, TypeAdapter
+from starlette.requests import Request
+from starlette.responses import Response
+
+_logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+class ResponseCacheStats(BaseModel):
+    # Calls answered with fresh cached responses
+    hits: int = 0
+
+    # Calls answered with expired responses while another call refreshes them
+    stale: int = 0
+
+    # Calls that waited for another call to compute the missing response
+    coalesced: int = 0
+
+    # Responses computed because they were missing or expired
+    recomputes: int = 0
+
+    # Responses refreshed before they expired
+    early_refreshes: int = 0
+
+
+class _Entry(NamedTuple):
+    data: str
+
+    # wall clock time the entry expires at, shared by the app replicas
+    expires_at: float
+
+    # time in seconds it took to compute the entry
+    delta: float
+
+
+def _encode(entry: _Entry) -> str:
+    return f"{entry.expires_at!r}:{entry.delta!r}:{entry.data}"
+
+
+def _decode(value: str) -> Optional[_Entry]:
+    expires_at, _, rest = value.partition(":")
+    delta, _, data = rest.partition(":")
+
+    try:
+        return _Entry(data, float(expires_at), float(delta))
+    except ValueError:
+        # written in another format, treated as missing
+        return None
+
+
+def _etag(body: bytes) -> str:
+    """
+    Weak ETag of the content, the same in every process and replica.
+    """
+
+    return f'W/"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"'
+
+
+class _Format(ABC):
+    """
+    Representation the responses are cached in.
+    """
+
+    @abstractmethod
+    def encode(self, ret: Any, headers: Mapping[str, str]) -> str:
+        """
+        Encode the route result along with the headers the route has set.
+        """
+        pass
+
+    @abstractmethod
+    def respond(
+        self,
+        data: str,
+        max_age: int,
+        request: Optional[Request],
+        response: Optional[Response],
+    ) -> Any:
+        """
+        Route result for the cached data.
+        """
+        pass
+
+    def respond_computed(
+        self,
+        ret: Any,
+        data: str,
+        max_age: int,
+        response: Optional[Response],
+    ) -> Any:
+        """
+        Route result for the just computed data.
+        """
+
+        return self.respond(data, max_age, None, response)
+
+
+class _DecodedFormat(_Format):
+    """
+    Route results encoded by the FastAPICache coder. Cached ones are decoded back,
+    so FastAPI validates and serializes them like the computed ones.
+    """
+
+    def encode(self, ret: Any, headers: Mapping[str, str]) -> str:
+        return FastAPICache.get_coder().encode(ret)
+
+    def respond(
+        self,
+        data: str,
+        max_age: int,
+        request: Optional[Request],
+        response: Optional[Response],
+    ) -> Any:
+        if response is not None and request is not None:
+            response.headers["Cache-Control"] = f"max-age={max_age}"
+
+            etag = _etag(data.encode())
+
+            if request.headers.get("if-none-match") == etag:
+                response.status_code = 304
+                return response
+
+            response.headers["ETag"] = etag
+
+        return FastAPICache.get_coder().decode(data)
+
+    def respond_computed(
+        self,
+        ret: Any,
+        data: str,
+        max_age: int,
+        response: Optional[Response],
+    ) -> Any:
+        if response is not None:
+            response.headers["Cache-Control"] = f"max-age={max_age}"
+            response.headers["ETag"] = _etag(data.encode())
+
+        return ret
+
+
+class _SerializedFormat(_Format):
+    """
+    Final JSON bodies of the responses along with their headers.
+    Cached ones are returned as is, skipping decoding, validation and encoding.
+
+    Stored as the JSON object of the headers and the body on the next line.
+    """
+
+    _adapter: TypeAdapter[Any]
+
+    def __init__(self, annotation: Any) -> None:
+        # FastAPI takes the response model from the return annotation the same way
+        self._adapter = TypeAdapter(annotation)
+
+    def encode(self, ret: Any, headers: Mapping[str, str]) -> str:
+        body = self._adapter.dump_json(ret, by_alias=True)
+
+        headers = {
+            **headers,
+            "content-type": "application/json",
+            "etag": _etag(body),
+        }
+
+        return f"{orjson.dumps(headers).decode()}\n{body.decode()}"
+
+    def respond(
+        self,
+        data: str,
+        max_age: int,
+        request: Optional[Request],
+        response: Optional[Response],
+    ) -> Any:
+        head, _, body = data.partition("\n")
+
+        headers: dict[str, str] = orjson.loads(head)
+        headers["cache-control"] = f"max-age={max_age}"
+
+        if (
+            request is not None
+            and request.headers.get("if-none-match") == headers["etag"]
+        ):
+            return Response(status_code=304, headers=headers)
+
+        return Response(body.encode(), headers=headers)
+
+
+class ResponseCache:
+    """
+    Response cache decorator protected from the cache stampedes.
+
+    Works like the one from fastapi_cache with the same backend, coder and key builder,
+    but at most one call per key computes the response at a time.
+    Calls for a missing response wait for it, and calls for an expired one
+    get the stale response kept for `stale_for` seconds after it expires.
+
+    Hot responses are refreshed before they expire with the probability growing
+    as they approach the expiration and with the time they take to compute (XFetch).
+    """
+
+    _stale_for: int
+    _beta: float
+    _clock: Callable[[], float]
+    _random: Callable[[], float]
+    _computing: dict[str, "asyncio.Task[tuple[Any, _Entry]]"]
+    _stats: ResponseCacheStats
+
+    def __init__(
+        self,
+        *,
+        stale_for: int = 60,
+        beta: float = 1.0,
+        clock: Callable[[], float] = time.time,
+        rand: Callable[[], float] = random.random,
+    ) -> None:
+        """
+        Larger `beta` refreshes responses earlier, 0 disables early refresh.
+        """
+
+        self._stale_for = stale_for
+        self._beta = beta
+        self._clock = clock
+        self._random = rand
+        self._computing = {}
+        self._stats = ResponseCacheStats()
+
+    @property
+    def stats(self) -> ResponseCacheStats:
+        """
+        Snapshot of the cache counters.
+        """
+
+        return self._stats.model_copy()
+
+    def cached(
+        self,
+        expire: Optional[int] = None,
+        *,
+        key_builder: Optional[Callable[..., Any]] = None,
+        namespace: str = "",
+        serialized: bool = False,
+    ) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+        """
+        Cache the responses of the route for `expire` seconds.
+        Defaults are taken from FastAPICache.
+
+        With `serialized` the JSON responses are cached as the final bodies
+        serialized by the return annotation and returned as is on hits.
+        """
+
+        def wrapper(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+            signature = inspect.signature(func)
+
+            format: _Format = (
+                _SerializedFormat(signature.return_annotation)
+                if serialized
+                else _DecodedFormat()
+            )
+
+            accepts = {"request", "response"} & signature.parameters.keys()
+
+            @wraps(func)
+            async def inner(*args: P.args, **kwargs: P.kwargs) -> R:
+                params: dict[str, Any] = dict(kwargs)
+
+                request: Optional[Request] = params.pop("request", None)
+                response: Optional[Response] = params.pop("response", None)
+
+                # the route gets only the injected parameters it accepts
+                passed: Any = {
+                    name: value
+                    for name, value in kwargs.items()
+                    if name in params or name in accepts
+                }
+
+                async def call() -> R:
+                    return await func(*args, **passed)
+
+                if (
+                    request is not None
+                    and (
+                        request.method != "GET"
+                        or request.headers.get("Cache-Control")
+                        in ("no-store", "no-cache")
+                    )
+                ) or not FastAPICache.get_enable():
+                    return await call()
+
+                build = key_builder or FastAPICache.get_key_builder()
+
+                try:
+                    key = build(
+                        func,
+                        namespace,
+                        request=request,
+                        response=response,
+                        args=args,
+                        kwargs=params,
+                    )
+
+                    if inspect.isawaitable(key):
+                        key = await key
+                except Exception:
+                    # e.g. the versions of the cache tags are unavailable
+                    _logger.warning(
+                        "failed to build cache key for %s, not cached",
+                        func.__name__,
+                        exc_info=True,
+                    )
+
+                    return await call()
+
+                return cast(
+                    R,
+                    await self._get_or_compute(
+                        key,
+                        expire or FastAPICache.get_expire() or 0,
+                        format,
+                        call,
+                        request,
+                        response,
+                    ),
+                )
+
+            inner.__signature__ = _with_request_response(signature)  # type: ignore[attr-defined]
+
+            return inner
+
+        return wrapper
+
+    async def _get_or_compute(
+        self,
+        key: str,
+        expire: int,
+        format: _Format,
+        call: Callable[[], Awaitable[R]],
+        request: Optional[Request],
+        response: Optional[Response],
+    ) -> Any:
+        """
+        Route result for the cached response or the one computed by `call`.
+        """
+
+        backend = FastAPICache.get_backend()
+
+        entry = await self._get(backend, key)
+        now = self._clock()
+
+        computing = self._computing.get(key)
+
+        if entry is not None:
+            if now < entry.expires_at and not self._refresh_early(entry, now):
+                self._stats.hits += 1
+
+                return self._respond(format, entry, now, request, response)
+
+            if computing is not None:
+                self._stats.stale += 1
+
+                return self._respond(format, entry, now, request, response)
+
+        if computing is not None:
+            self._stats.coalesced += 1
+
+            # a cancelled caller must not cancel the computation for the others
+            _, computed = await asyncio.shield(computing)
+
+            return self._respond(format, computed, self._clock(), request, response)
+
+        if entry is not None and now < entry.expires_at:
+            self._stats.early_refreshes += 1
+        else:
+            self._stats.recomputes += 1
+
+        task = asyncio.create_task(
+            self._compute(backend, key, expire, format, call, response)
+        )
+        task.add_done_callback(lambda t: self._done(key, t))
+
+        self._computing[key] = task
+
+        ret, computed = await asyncio.shield(task)
+
+        return format.respond_computed(ret, computed.data, expire, response)
+
+    async def _compute(
+        self,
+        backend: Backend,
+        key: str,
+        expire: int,
+        format: _Format,
+        call: Callable[[], Awaitable[R]],
+        response: Optional[Response],
+    ) -> tuple[R, _Entry]:
+        start = self._clock()
+
+        ret = await call()
+        data = format.encode(ret, {} if response is None else response.headers)
+
+        now = self._clock()
+        entry = _Entry(data, now + expire, now - start)
+
+        try:
+            # expired entries are kept to be served while they are refreshed
+            await backend.set(key, _encode(entry), expire + self._stale_for)
+        except Exception:
+            _logger.warning("failed to set %s in response cache", key, exc_info=True)
+
+        return ret, entry
+
+    def _done(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._computing.get(key) is task:
+            del self._computing[key]
+
+        # mark the exception as retrieved in case all callers were cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def _get(self, backend: Backend, key: str) -> Optional[_Entry]:
+        try:
+            value = await backend.get(key)
+        except Exception:
+            _logger.warning("failed to get %s from response cache", key, exc_info=True)
+            return None
+
+        return None if value is None else _decode(value)
+
+    def _refresh_early(self, entry: _Entry, now: float) -> bool:
+        """
+        Whether the fresh entry is refreshed now, see "Optimal Probabilistic
+        Cache Stampede Prevention" by Vattani, Chierichetti and Lowenstein.
+        """
+
+        # 1 - random() is in (0, 1], so the logarithm is defined
+        gap = -entry.delta * self._beta * math.log(1 - self._random())
+
+        return now + gap >= entry.expires_at
+
+    @staticmethod
+    def _respond(
+        format: _Format,
+        entry: _Entry,
+        now: float,
+        request: Optional[Request],
+        response: Optional[Response],
+    ) -> Any:
+        max_age = max(math.ceil(entry.expires_at - now), 0)
+
+        return format.respond(entry.data, max_age, request, response)
+
+
+def _with_request_response(signature: inspect.Signature) -> inspect.Signature:
+    """
+    Signature of the route with request and response added,
+    so that FastAPI passes them to the decorator.
+    """
+
+    parameters = [
+        p
+        for p in signature.parameters.values()
+        if p.kind <= inspect.Parameter.KEYWORD_ONLY
+    ]
+
+    for name, annotation in (("request", Request), ("response", Response)):
+        if name not in signature.parameters:
+            parameters.append(
+                inspect.Parameter(
+                    name, inspect.Parameter.KEYWORD_ONLY, annotation=annotation
+                )
+            )
+
+    parameters.extend(
+        p
+        for p in signature.parameters.values()
+        if p.kind > inspect.Parameter.KEYWORD_ONLY
+    )
+
+    return signature.replace(parameters=parameters)
@@ -1,7 +1,7 @@
-from datetime import date, datetime
-from typing import Optional, Sequence
+from datetime import date, datetime, timezone
+from typing import Annotated, Optional, Sequence
 
-from pydantic import AnyHttpUrl, BaseModel
+from pydantic import AnyHttpUrl, BaseModel, Field, field_validator
 
 import book_review.models.book as book_models
 import book_review.models.reviews as reviews_models
@@ -12,8 +12,10 @@ UserID = user_models.UserID
 BookID = book_models.BookID
 AuthorID = book_models.AuthorID
 CoverID = book_models.CoverID
+SuggestionKind = book_models.SuggestionKind
 
 CoverSize = openlibrary_usecase.CoverSize
+Sort = openlibrary_usecase.Sort
 
 
 class User(BaseModel):
@@ -52,6 +54,77 @@ class Review(BaseModel):
         )
 
 
+class ReviewRecord(BaseModel):
+    """
+    Review imported or exported in bulk as a line of newline delimited JSON.
+    """
+
+    user_id: UserID
+    book_id: BookID
+    rating: Annotated[int, Field(ge=1, le=10)]
+    commentary: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    @field_validator("created_at", "updated_at")
+    @classmethod
+    def _to_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # stored without the time zone in UTC like CURRENT_TIMESTAMP
+        if value is None or value.tzinfo is None:
+            return value
+
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    @staticmethod
+    def parse(review: reviews_models.Review) -> "ReviewRecord":
+        return ReviewRecord(
+            user_id=review.user_id,
+            book_id=review.book_id,
+            rating=review.rating,
+            commentary=review.commentary,
+            created_at=review.created_at,
+            updated_at=review.updated_at,
+        )
+
+    def map(self) -> reviews_models.Review:
+        return reviews_models.Review(
+            user_id=self.user_id,
+            book_id=self.book_id,
+            rating=self.rating,
+            commentary=self.commentary,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+        )
+
+
+class TransferReport(BaseModel):
+    rows: int
+    seconds: float
+    rows_per_second: float
+
+    @staticmethod
+    def parse(report: reviews_models.TransferReport) -> "TransferReport":
+        return TransferReport(
+            rows=report.rows,
+            seconds=report.seconds,
+            rows_per_second=report.rows_per_second,
+        )
+
+
+class Rating(BaseModel):
+    count: int
+    average: Optional[float]
+
+    # numbers of the ratings from 1 to 10
+    histogram: Sequence[int]
+
+    @staticmethod
+    def parse(stats: reviews_models.RatingStats) -> "Rating":
+        return Rating(
+            count=stats.count, average=stats.average, histogram=stats.histogram
+        )
+
+
 class Author(BaseModel):
     name: str
     key: str
@@ -87,9 +160,10 @@ class BookPreview(BaseModel):
 
     @staticmethod
     def parse(book: book_models.BookPreview) -> "BookPreview":
-        authors = list(map(lambda a: AuthorPreview.parse(a), book.authors))
+        authors = list(map(AuthorPreview.parse, book.authors))
 
-        return BookPreview(
+        # domain model is valid already
+        return BookPreview.model_construct(
             id=book.id,
             title=book.title,
             authors=authors,
@@ -99,6 +173,35 @@ class BookPreview(BaseModel):
         )
 
 
+class RatedBookPreview(BookPreview):
+    # aggregated ratings of the book, only if requested
+    rating: Optional[Rating] = None
+
+
+class RankedBook(BaseModel):
+    id: BookID
+    score: float
+
+    # reviews the score is computed from
+    count: int
+    average: Optional[float]
+
+    # only for the books found by a search before
+    preview: Optional[BookPreview]
+
+    @staticmethod
+    def parse(book: reviews_models.RankedBook) -> "RankedBook":
+        preview = BookPreview.parse(book.preview) if book.preview is not None else None
+
+        return RankedBook(
+            id=book.book_id,
+            score=book.score,
+            count=book.count,
+            average=book.average,
+            preview=preview,
+        )
+
+
 class Book(BaseModel):
     id: BookID
     title: str
@@ -117,3 +220,15 @@ class Book(BaseModel):
             subjects=book.subjects,
             author_id=book.author_id,
         )
+
+
+class Suggestion(BaseModel):
+    kind: SuggestionKind
+    id: BookID | AuthorID
+    text: str
+
+    @staticmethod
+    def parse(suggestion: book_models.Suggestion) -> "Suggestion":
+        return Suggestion.model_construct(
+            kind=suggestion.kind, id=suggestion.id, text=suggestion.text
+        )
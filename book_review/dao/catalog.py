@@ -0,0 +1,140 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from enum import Enum
+from typing import NamedTuple, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import Delete, Select, bindparam, delete, select
+from sqlalchemy.dialects.sqlite import Insert, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from book_review.db import TableCatalogAuthors, TableCatalogEntry, TableCatalogWorks
+
+
+class Kind(str, Enum):
+    """
+    Kind of the catalog entry.
+    """
+
+    WORK = "work"
+    AUTHOR = "author"
+
+
+_TABLES: dict[Kind, type[TableCatalogEntry]] = {
+    Kind.WORK: TableCatalogWorks,
+    Kind.AUTHOR: TableCatalogAuthors,
+}
+
+
+class _Statements(NamedTuple):
+    get: Select[tuple[str, str, datetime]]
+    put: Insert
+    delete: Delete
+
+
+def _statements(table: type[TableCatalogEntry]) -> _Statements:
+    """
+    Statements of the kind built once with bound parameters.
+    """
+
+    put = insert(table)
+
+    return _Statements(
+        get=select(table.key, table.data, table.fetched_at).where(
+            table.key == bindparam("key")
+        ),
+        put=put.on_conflict_do_update(
+            index_elements=[table.key],
+            set_={
+                table.data: put.excluded.data,
+                table.fetched_at: put.excluded.fetched_at,
+            },
+        ),
+        delete=delete(table).where(table.key == bindparam("key")),
+    )
+
+
+_STATEMENTS = {kind: _statements(table) for kind, table in _TABLES.items()}
+
+
+class Entry(BaseModel):
+    """
+    An entry in the catalog.
+    """
+
+    key: str
+    data: str
+    fetched_at: datetime
+
+
+class Repository(ABC):
+    """
+    Persistent catalog of the openlibrary works and authors.
+    Entries are stored as opaque JSON documents along with the time they were fetched.
+    """
+
+    @abstractmethod
+    async def get_entry(self, kind: Kind, key: str) -> Optional[Entry]:
+        """
+        Get entry by its key.
+        If the entry with such key was not found None is returned.
+        """
+        pass
+
+    @abstractmethod
+    async def put_entry(
+        self, kind: Kind, key: str, data: str, fetched_at: datetime
+    ) -> None:
+        """
+        Create or overwrite the entry.
+        """
+        pass
+
+    @abstractmethod
+    async def delete_entry(self, kind: Kind, key: str) -> None:
+        """
+        Delete the entry.
+        This method is idempotent - calling this method multiple times would not raise an error.
+        """
+        pass
+
+
+class ORMRepository(Repository):
+    """
+    Catalog repository implementation that uses sqlalchemy ORM
+    """
+
+    _session: async_sessionmaker[AsyncSession]
+
+    def __init__(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        super().__init__()
+
+        self._session = session_maker
+
+    async def get_entry(self, kind: Kind, key: str) -> Optional[Entry]:
+        async with self._session() as session:
+            result = await session.execute(_STATEMENTS[kind].get, {"key": key})
+
+            entry = result.first()
+
+            if entry is None:
+                return None
+
+            key, data, fetched_at = entry
+
+            return Entry(key=key, data=data, fetched_at=fetched_at)
+
+    async def put_entry(
+        self, kind: Kind, key: str, data: str, fetched_at: datetime
+    ) -> None:
+        async with self._session() as session:
+            async with session.begin():
+                await session.execute(
+                    _STATEMENTS[kind].put,
+                    {"key": key, "data": data, "fetched_at": fetched_at},
+                )
+
+    async def delete_entry(self, kind: Kind, key: str) -> None:
+        async with self._session() as session:
+            async with session.begin():
+                await session.execute(_STATEMENTS[kind].delete, {"key": key})
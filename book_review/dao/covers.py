@@ -0,0 +1,162 @@
+import asyncio
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import IO, AsyncIterator, Optional
+from uuid import uuid4
+
+from book_review.models.book import CoverID
+
+
+class Repository(ABC):
+    """
+    Cover images repository.
+    """
+
+    @abstractmethod
+    async def get_cover(self, id: CoverID, size: str) -> Optional[Path]:
+        """
+        Get path to the stored cover image file.
+        If the cover with such id and size is not stored None is returned.
+        """
+        pass
+
+    @abstractmethod
+    def store_cover(
+        self, id: CoverID, size: str, chunks: AsyncIterator[bytes]
+    ) -> AsyncIterator[bytes]:
+        """
+        Store the cover image while it is being streamed.
+        Returned iterator yields the given chunks unchanged.
+        The cover is stored only if the stream was consumed completely.
+        """
+        pass
+
+
+class FileSystemRepository(Repository):
+    """
+    Covers repository that keeps images as files in the given directory.
+    Once the total size of the files exceeds the limit,
+    the least recently used covers are evicted.
+    """
+
+    _directory: Path
+    _max_size: int
+    _size: int
+
+    # file name -> file size, least recently used first
+    _entries: OrderedDict[str, int]
+
+    def __init__(self, directory: Path, max_size: int) -> None:
+        super().__init__()
+
+        self._directory = directory
+        self._max_size = max_size
+        self._size = 0
+        self._entries = OrderedDict()
+
+        directory.mkdir(parents=True, exist_ok=True)
+
+        # leftovers of the interrupted downloads
+        for path in directory.glob("*.part"):
+            path.unlink(missing_ok=True)
+
+        # access order is not persisted, so the modification time
+        # is the best approximation after restart
+        files = sorted(
+            ((path, path.stat()) for path in directory.glob("*.jpg")),
+            key=lambda p: p[1].st_mtime,
+        )
+
+        for path, stat in files:
+            for evicted in self._add(path.name, stat.st_size):
+                evicted.unlink(missing_ok=True)
+
+    @property
+    def size(self) -> int:
+        """
+        Total size of the stored covers in bytes.
+        """
+
+        return self._size
+
+    async def get_cover(self, id: CoverID, size: str) -> Optional[Path]:
+        name = self._name(id, size)
+
+        if name not in self._entries:
+            return None
+
+        self._entries.move_to_end(name)
+
+        return self._directory / name
+
+    async def store_cover(
+        self, id: CoverID, size: str, chunks: AsyncIterator[bytes]
+    ) -> AsyncIterator[bytes]:
+        name = self._name(id, size)
+        temp = self._directory / f"{name}.{uuid4().hex}.part"
+
+        file: Optional[IO[bytes]] = None
+        stored = 0
+        completed = False
+
+        try:
+            file = await asyncio.to_thread(temp.open, "wb")
+        except OSError:
+            # caching is best effort, the cover is still streamed
+            pass
+
+        try:
+            async for chunk in chunks:
+                if file is not None:
+                    stored += len(chunk)
+
+                    try:
+                        if stored > self._max_size:
+                            raise OSError("cover exceeds the cache size")
+
+                        await asyncio.to_thread(file.write, chunk)
+                    except OSError:
+                        await asyncio.to_thread(file.close)
+                        await asyncio.to_thread(temp.unlink, missing_ok=True)
+
+                        file = None
+
+                yield chunk
+
+            completed = True
+        finally:
+            if file is not None:
+                await asyncio.to_thread(file.close)
+
+                if completed:
+                    await asyncio.to_thread(temp.replace, self._directory / name)
+
+                    for evicted in self._add(name, stored):
+                        await asyncio.to_thread(evicted.unlink, missing_ok=True)
+                else:
+                    await asyncio.to_thread(temp.unlink, missing_ok=True)
+
+    def _add(self, name: str, size: int) -> list[Path]:
+        """
+        Register a stored file and evict old ones if the limit was exceeded.
+        Returns the files of the evicted covers for the caller to remove.
+        """
+
+        self._size += size - self._entries.pop(name, 0)
+        self._entries[name] = size
+
+        evicted: list[Path] = []
+
+        while self._size > self._max_size and self._entries:
+            evicted_name, evicted_size = self._entries.popitem(last=False)
+
+            evicted.append(self._directory / evicted_name)
+
+            self._size -= evicted_size
+
+        return evicted
+
+    @staticmethod
+    def _name(id: CoverID, size: str) -> str:
+        return f"{id}-{size}.jpg"
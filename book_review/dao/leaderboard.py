@@ -0,0 +1,195 @@
+from abc import ABC, abstractmethod
+from typing import Mapping, Optional, Sequence
+
+from pydantic import BaseModel
+from sqlalchemy import ColumnElement, Float, Integer, bindparam, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from book_review.db import TableBookRatingStats, TableBookReviewDays
+
+
+class Tally(BaseModel):
+    """
+    Reviews of a book counted over a period in the repository.
+    """
+
+    book_id: str
+    count: int
+    sum: int
+
+
+class Repository(ABC):
+    """
+    Review aggregates of the books the leaderboards are ranked by.
+    """
+
+    @abstractmethod
+    async def find_mean_rating(self) -> Optional[float]:
+        """
+        Average rating of all the reviews, None if there are none.
+        """
+        pass
+
+    @abstractmethod
+    async def find_top_rated(
+        self, *, prior_mean: float, prior_count: float, limit: int
+    ) -> Sequence[Tally]:
+        """
+        Reviews of all time of the books with the highest Bayesian average,
+        that is the average of their ratings along with `prior_count` ratings
+        of `prior_mean`, at most `limit` of them.
+        """
+        pass
+
+    @abstractmethod
+    async def find_trending(self, *, days: int, limit: int) -> Sequence[Tally]:
+        """
+        Reviews of the last `days` days, today included, of the books reviewed
+        the most in them, at most `limit` of them.
+        """
+        pass
+
+    @abstractmethod
+    async def find_totals(self, book_ids: Sequence[str]) -> Mapping[str, Tally]:
+        """
+        Reviews of all time of the books. Books without reviews are omitted.
+        """
+        pass
+
+    @abstractmethod
+    async def find_recent(
+        self, book_ids: Sequence[str], *, days: int
+    ) -> Mapping[str, Tally]:
+        """
+        Reviews of the last `days` days of the books, today included.
+        Books without reviews in them are omitted.
+        """
+        pass
+
+
+# Aggregates are maintained by triggers on the reviews, so no review is read here
+_FIND_MEAN_RATING = select(
+    func.sum(TableBookRatingStats.sum, type_=Float)
+    / func.sum(TableBookRatingStats.count)
+)
+
+
+def _bayesian_average() -> ColumnElement[float]:
+    prior_mean = bindparam("prior_mean", type_=Float)
+    prior_count = bindparam("prior_count", type_=Float)
+
+    return (prior_mean * prior_count + TableBookRatingStats.sum) / (
+        prior_count + TableBookRatingStats.count
+    )
+
+
+_FIND_TOP_RATED = (
+    select(
+        TableBookRatingStats.book_id,
+        TableBookRatingStats.count,
+        TableBookRatingStats.sum,
+    )
+    .where(TableBookRatingStats.count > 0)
+    .order_by(_bayesian_average().desc(), TableBookRatingStats.book_id)
+    .limit(bindparam("limit", type_=Integer))
+)
+
+_FIND_TOTALS = select(
+    TableBookRatingStats.book_id,
+    TableBookRatingStats.count,
+    TableBookRatingStats.sum,
+).where(
+    TableBookRatingStats.book_id.in_(bindparam("book_ids", expanding=True)),
+    TableBookRatingStats.count > 0,
+)
+
+# UTC day like the one of the reviews, "-6 days" is the start of the last 7 days
+_SINCE = func.date("now", bindparam("since"))
+
+_RECENT_COUNT = func.sum(TableBookReviewDays.count)
+
+_RECENT = (
+    select(
+        TableBookReviewDays.book_id,
+        _RECENT_COUNT,
+        func.sum(TableBookReviewDays.sum),
+    )
+    .where(TableBookReviewDays.day >= _SINCE)
+    .group_by(TableBookReviewDays.book_id)
+    .having(_RECENT_COUNT > 0)
+)
+
+_FIND_TRENDING = _RECENT.order_by(
+    _RECENT_COUNT.desc(), TableBookReviewDays.book_id
+).limit(bindparam("limit", type_=Integer))
+
+_FIND_RECENT = _RECENT.where(
+    TableBookReviewDays.book_id.in_(bindparam("book_ids", expanding=True))
+)
+
+
+def _since(days: int) -> str:
+    return f"-{days - 1} days"
+
+
+class ORMRepository(Repository):
+    """
+    Leaderboard repository implementation that uses sqlalchemy ORM
+    """
+
+    _session: async_sessionmaker[AsyncSession]
+
+    def __init__(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        super().__init__()
+
+        self._session = session_maker
+
+    async def find_mean_rating(self) -> Optional[float]:
+        async with self._session() as session:
+            mean: Optional[float] = await session.scalar(_FIND_MEAN_RATING)
+
+            return mean
+
+    async def find_top_rated(
+        self, *, prior_mean: float, prior_count: float, limit: int
+    ) -> Sequence[Tally]:
+        params = {"prior_mean": prior_mean, "prior_count": prior_count, "limit": limit}
+
+        async with self._session() as session:
+            rows = await session.execute(_FIND_TOP_RATED, params)
+
+            return [Tally(book_id=id, count=count, sum=sum) for id, count, sum in rows]
+
+    async def find_trending(self, *, days: int, limit: int) -> Sequence[Tally]:
+        params = {"since": _since(days), "limit": limit}
+
+        async with self._session() as session:
+            rows = await session.execute(_FIND_TRENDING, params)
+
+            return [Tally(book_id=id, count=count, sum=sum) for id, count, sum in rows]
+
+    async def find_totals(self, book_ids: Sequence[str]) -> Mapping[str, Tally]:
+        if not book_ids:
+            return {}
+
+        async with self._session() as session:
+            rows = await session.execute(_FIND_TOTALS, {"book_ids": list(book_ids)})
+
+            return {
+                id: Tally(book_id=id, count=count, sum=sum) for id, count, sum in rows
+            }
+
+    async def find_recent(
+        self, book_ids: Sequence[str], *, days: int
+    ) -> Mapping[str, Tally]:
+        if not book_ids:
+            return {}
+
+        params = {"book_ids": list(book_ids), "since": _since(days)}
+
+        async with self._session() as session:
+            rows = await session.execute(_FIND_RECENT, params)
+
+            return {
+                id: Tally(book_id=id, count=count, sum=sum) for id, count, sum in rows
+            }
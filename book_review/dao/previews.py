@@ -0,0 +1,214 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, AsyncIterator, Mapping, Optional, Sequence, cast
+
+import orjson
+from pydantic import BaseModel
+from sqlalchemy import Table, bindparam, select, text
+from sqlalchemy.dialects.sqlite import Insert, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from book_review.db import TableBookPreviews
+
+# Columns of the index weighted by their relevance for bm25
+_WEIGHTS = "10.0, 5.0, 1.0"
+
+_SEARCH_PREVIEWS = f"""
+SELECT
+    p.data,
+    f.rowid IN (
+        SELECT rowid FROM book_previews_fts WHERE book_previews_fts MATCH :strong
+    ) AS strong
+FROM book_previews_fts AS f
+JOIN book_previews AS p ON p.rowid = f.rowid
+WHERE book_previews_fts MATCH :match {{language}}
+ORDER BY bm25(book_previews_fts, {_WEIGHTS})
+LIMIT :limit
+"""
+
+# reviewed books first as they are the most likely to be looked for again
+_STREAM_PREVIEWS = text("""
+SELECT p.data
+FROM book_previews AS p
+ORDER BY EXISTS (SELECT 1 FROM reviews AS r WHERE r.book_id = p.key) DESC,
+    p.indexed_at DESC
+""")
+
+_SEARCH_PREVIEWS_LANGUAGE = """
+AND EXISTS (SELECT 1 FROM json_each(p.languages) AS l WHERE l.value = :language)
+"""
+
+# statements are built once, so that their compiled forms are found in the cache
+_SEARCH_ANY_LANGUAGE = text(_SEARCH_PREVIEWS.format(language=""))
+
+_SEARCH_LANGUAGE = text(_SEARCH_PREVIEWS.format(language=_SEARCH_PREVIEWS_LANGUAGE))
+
+# Previews are written on the table rather than the mapped class,
+# so that a list of parameters is executed as is with executemany
+_PREVIEWS = cast(Table, TableBookPreviews.__table__)
+
+
+def _index_previews() -> Insert:
+    statement = insert(_PREVIEWS)
+
+    return statement.on_conflict_do_update(
+        index_elements=[_PREVIEWS.c.key],
+        set_={
+            _PREVIEWS.c.title: statement.excluded.title,
+            _PREVIEWS.c.authors: statement.excluded.authors,
+            _PREVIEWS.c.subjects: statement.excluded.subjects,
+            _PREVIEWS.c.languages: statement.excluded.languages,
+            _PREVIEWS.c.data: statement.excluded.data,
+            _PREVIEWS.c.indexed_at: statement.excluded.indexed_at,
+        },
+    )
+
+
+_INDEX_PREVIEWS = _index_previews()
+
+_FIND_PREVIEWS = select(_PREVIEWS.c.key, _PREVIEWS.c.data).where(
+    _PREVIEWS.c.key.in_(bindparam("keys", expanding=True))
+)
+
+
+class Preview(BaseModel):
+    """
+    Book preview to index.
+    """
+
+    key: str
+    title: str
+    authors: Sequence[str]
+    subjects: Sequence[str]
+    languages: Sequence[str]
+
+    # opaque JSON document returned by the search
+    data: str
+
+
+class Hit(BaseModel):
+    """
+    Book preview found in the index.
+    """
+
+    data: str
+
+    # whether the query matched the title or the authors and not just the subjects
+    strong: bool
+
+
+class Repository(ABC):
+    """
+    Full-text index of the book previews seen in the search results.
+    """
+
+    @abstractmethod
+    async def index_previews(
+        self, previews: Sequence[Preview], indexed_at: datetime
+    ) -> None:
+        """
+        Add the previews to the index, overwriting the ones with the same keys.
+        """
+        pass
+
+    @abstractmethod
+    async def search_previews(
+        self, match: str, *, language: Optional[str] = None, limit: int
+    ) -> Sequence[Hit]:
+        """
+        Search previews by FTS5 match expression, the most relevant first.
+        """
+        pass
+
+    @abstractmethod
+    async def find_previews(self, keys: Sequence[str]) -> Mapping[str, str]:
+        """
+        JSON documents of the previews by their keys.
+        Keys that were never indexed are omitted.
+        """
+        pass
+
+    @abstractmethod
+    def stream_previews(self) -> AsyncIterator[str]:
+        """
+        Stream JSON documents of all the previews,
+        the reviewed books first and then the recently indexed ones.
+        """
+        pass
+
+
+class ORMRepository(Repository):
+    """
+    Previews repository implementation that uses sqlalchemy ORM
+    and SQLite FTS5 index maintained by triggers.
+    """
+
+    _session: async_sessionmaker[AsyncSession]
+
+    def __init__(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        super().__init__()
+
+        self._session = session_maker
+
+    async def index_previews(
+        self, previews: Sequence[Preview], indexed_at: datetime
+    ) -> None:
+        if not previews:
+            return
+
+        # the same key may be found several times in a single search
+        unique = {preview.key: preview for preview in previews}
+
+        rows = [
+            {
+                "key": preview.key,
+                "title": preview.title,
+                "authors": " ".join(preview.authors),
+                "subjects": " ".join(preview.subjects),
+                "languages": orjson.dumps(preview.languages).decode(),
+                "data": preview.data,
+                "indexed_at": indexed_at,
+            }
+            for preview in unique.values()
+        ]
+
+        # a list of parameters is executed with a single executemany
+        async with self._session() as session:
+            async with session.begin():
+                await session.execute(_INDEX_PREVIEWS, rows)
+
+    async def search_previews(
+        self, match: str, *, language: Optional[str] = None, limit: int
+    ) -> Sequence[Hit]:
+        params: dict[str, Any] = {
+            "match": match,
+            "strong": f"{{title authors}} : ({match})",
+            "limit": limit,
+        }
+
+        statement = _SEARCH_ANY_LANGUAGE
+
+        if language is not None:
+            statement = _SEARCH_LANGUAGE
+            params["language"] = language
+
+        async with self._session() as session:
+            rows = (await session.execute(statement, params)).all()
+
+        return [Hit(data=data, strong=bool(strong)) for data, strong in rows]
+
+    async def find_previews(self, keys: Sequence[str]) -> Mapping[str, str]:
+        if not keys:
+            return {}
+
+        async with self._session() as session:
+            rows = await session.execute(_FIND_PREVIEWS, {"keys": list(keys)})
+
+            return {key: data for key, data in rows}
+
+    async def stream_previews(self) -> AsyncIterator[str]:
+        async with self._session() as session:
+            rows = await session.stream_scalars(_STREAM_PREVIEWS)
+
+            async for data in rows:
+                yield data
@@ -1,47 +1,91 @@
+import asyncio
+import functools
+import itertools
+import logging
 from abc import abstractmethod
 from datetime import datetime
-from typing import Optional, Sequence
+from typing import (
+    Any,
+    AsyncIterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    cast,
+)
 
 from pydantic import BaseModel
-from sqlalchemy import delete, select
-from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy import (
+    Integer,
+    Row,
+    Select,
+    Table,
+    bindparam,
+    delete,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.sqlite import Insert, insert
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.sql import Executable
 
 import book_review.models.reviews as models
-from book_review.db import TableReviews
+from book_review.db import RATINGS, TableBookRatingStats, TableReviews
 
+_logger = logging.getLogger(__name__)
 
-class Review(BaseModel):
+# Columns of the domain review selected as tuples, so that the rows are not loaded
+# into ORM entities and copied into intermediate models on the read paths
+_REVIEW_COLUMNS = (
+    TableReviews.user_id,
+    TableReviews.book_id,
+    TableReviews.rating,
+    TableReviews.commentary,
+    TableReviews.created_at,
+    TableReviews.updated_at,
+)
+
+
+def _review(row: Row[Any]) -> models.Review:
+    user_id, book_id, rating, commentary, created_at, updated_at = row
+
+    return models.Review(
+        user_id=user_id,
+        book_id=book_id,
+        rating=rating,
+        commentary=commentary,
+        created_at=created_at,
+        updated_at=updated_at,
+    )
+
+
+class RatingStats(BaseModel):
     """
-    A review in the repository
+    Aggregated ratings of a book in the repository
     """
 
-    user_id: int
     book_id: str
-    rating: int
-    commentary: Optional[str] = None
-    created_at: datetime
-    updated_at: Optional[datetime] = None
+    count: int
+    sum: int
+
+    # numbers of the ratings from 1 to 10
+    histogram: Sequence[int]
 
     @classmethod
-    def parse_scalar(cls, scalar: TableReviews) -> "Review":
-        return Review(
-            user_id=scalar.user_id,
+    def parse_scalar(cls, scalar: TableBookRatingStats) -> "RatingStats":
+        return RatingStats(
             book_id=scalar.book_id,
-            rating=scalar.rating,
-            commentary=scalar.commentary,
-            created_at=scalar.created_at,
-            updated_at=scalar.updated_at,
+            count=scalar.count,
+            sum=scalar.sum,
+            histogram=[getattr(scalar, f"rated_{rating}") for rating in RATINGS],
         )
 
-    def map(self) -> models.Review:
-        return models.Review(
-            user_id=self.user_id,
+    def map(self) -> models.RatingStats:
+        return models.RatingStats(
             book_id=self.book_id,
-            rating=self.rating,
-            commentary=self.commentary,
-            created_at=self.created_at,
-            updated_at=self.updated_at,
+            count=self.count,
+            sum=self.sum,
+            histogram=self.histogram,
         )
 
 
@@ -72,17 +116,145 @@ class Repository:
 
     @abstractmethod
     async def find_reviews(
-        self, *, book_id: Optional[str] = None, user_id: Optional[int] = None
-    ) -> Sequence[Review]:
+        self,
+        *,
+        book_id: Optional[str] = None,
+        user_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[models.ReviewCursor] = None,
+    ) -> Sequence[models.Review]:
         """
         Find reviews by optionally limiting the results by specific book and/or user.
+        Reviews are ordered from the newest, at most `limit` of them
+        are returned starting right after the `after` cursor.
         """
         pass
 
+    @abstractmethod
+    async def find_rating_stats(
+        self, book_ids: Sequence[str]
+    ) -> Mapping[str, RatingStats]:
+        """
+        Find rating aggregates of the books by their ids.
+        Books without reviews are omitted.
+        """
+        pass
+
+    @abstractmethod
+    async def import_reviews(self, reviews: Sequence[models.Review]) -> None:
+        """
+        Create or overwrite the reviews in a single transaction.
+        """
+        pass
+
+    @abstractmethod
+    def stream_reviews(self, *, batch_size: int = 1000) -> AsyncIterator[models.Review]:
+        """
+        Stream all the reviews in no particular order,
+        fetching `batch_size` of them at a time.
+        """
+        pass
+
+
+# Review writes are built on the table rather than the mapped class,
+# so that a list of parameters is executed as is with executemany
+_REVIEWS = cast(Table, TableReviews.__table__)
+
+
+def _upsert_review() -> Insert:
+    statement = insert(_REVIEWS)
+
+    return statement.on_conflict_do_update(
+        index_elements=[_REVIEWS.c.user_id, _REVIEWS.c.book_id],
+        set_={
+            _REVIEWS.c.rating: statement.excluded.rating,
+            _REVIEWS.c.commentary: statement.excluded.commentary,
+            _REVIEWS.c.updated_at: bindparam("now"),
+        },
+    )
+
+
+_UPSERT_REVIEW = _upsert_review()
+
+_DELETE_REVIEW = (
+    delete(_REVIEWS)
+    .where(_REVIEWS.c.user_id == bindparam("user_id"))
+    .where(_REVIEWS.c.book_id == bindparam("book_id"))
+)
+
+
+def _upsert_params(
+    user_id: int, book_id: str, rating: int, commentary: Optional[str]
+) -> dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "book_id": book_id,
+        "rating": rating,
+        "commentary": commentary,
+        "now": datetime.now(),
+    }
+
+
+def _import_reviews() -> Insert:
+    statement = insert(_REVIEWS)
+
+    # imported reviews are taken as they are, including their timestamps
+    return statement.on_conflict_do_update(
+        index_elements=[_REVIEWS.c.user_id, _REVIEWS.c.book_id],
+        set_={
+            _REVIEWS.c.rating: statement.excluded.rating,
+            _REVIEWS.c.commentary: statement.excluded.commentary,
+            _REVIEWS.c.created_at: statement.excluded.created_at,
+            _REVIEWS.c.updated_at: statement.excluded.updated_at,
+        },
+    )
+
+
+_IMPORT_REVIEWS = _import_reviews()
+
+_STREAM_REVIEWS = select(*_REVIEW_COLUMNS)
+
+# maintained by triggers on the reviews, so no review is read here
+_FIND_RATING_STATS = select(TableBookRatingStats).where(
+    TableBookRatingStats.book_id.in_(bindparam("book_ids", expanding=True))
+)
+
+
+@functools.cache
+def _find_reviews(
+    *, by_book: bool, by_user: bool, after: bool, limited: bool
+) -> Select[Any]:
+    """
+    Statement of the reviews page, built once per combination of the filters.
+    """
+
+    # the order matches the indexes, so no query sorts or scans the table
+    key = (TableReviews.created_at, TableReviews.user_id, TableReviews.book_id)
+
+    statement = select(*_REVIEW_COLUMNS).order_by(*(c.desc() for c in key))
+
+    if by_book:
+        statement = statement.where(TableReviews.book_id == bindparam("book_id"))
+
+    if by_user:
+        statement = statement.where(TableReviews.user_id == bindparam("user_id"))
+
+    if after:
+        statement = statement.where(
+            tuple_(*key)
+            < tuple_(*(bindparam(f"after_{c.key}", type_=c.type) for c in key))
+        )
+
+    if limited:
+        statement = statement.limit(bindparam("limit", type_=Integer))
+
+    return statement
+
 
 class ORMRepository(Repository):
     """
-    Reviews respository implementation that uses sqlalchemy ORM
+    Reviews respository implementation that uses sqlalchemy ORM.
+    Rating aggregates are updated by triggers in the transactions of the review writes.
     """
 
     _session: async_sessionmaker[AsyncSession]
@@ -93,15 +265,11 @@ class ORMRepository(Repository):
         self._session = session_maker
 
     async def delete_review(self, *, user_id: int, book_id: str) -> None:
-        statement = (
-            delete(TableReviews)
-            .where(TableReviews.user_id == user_id)
-            .where(TableReviews.book_id == book_id)
-        )
-
         async with self._session() as session:
             async with session.begin():
-                await session.execute(statement)
+                await session.execute(
+                    _DELETE_REVIEW, {"user_id": user_id, "book_id": book_id}
+                )
 
     async def create_or_update_review(
         self,
@@ -117,35 +285,275 @@ class ORMRepository(Repository):
         Otherwise, rating and commentary will be overwritten.
         """
 
-        statement = insert(TableReviews).values(
-            user_id=user_id, book_id=book_id, rating=rating, commentary=commentary
-        )
+        async with self._session() as session:
+            async with session.begin():
+                await session.execute(
+                    _UPSERT_REVIEW,
+                    _upsert_params(user_id, book_id, rating, commentary),
+                )
 
-        statement = statement.on_conflict_do_update(
-            index_elements=[TableReviews.user_id, TableReviews.book_id],
-            set_={
-                TableReviews.rating: statement.excluded.rating,
-                TableReviews.commentary: statement.excluded.commentary,
-                TableReviews.updated_at: datetime.now(),
-            },
+    async def find_reviews(
+        self,
+        *,
+        book_id: Optional[str] = None,
+        user_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[models.ReviewCursor] = None,
+    ) -> Sequence[models.Review]:
+        statement = _find_reviews(
+            by_book=book_id is not None,
+            by_user=user_id is not None,
+            after=after is not None,
+            limited=limit is not None,
         )
 
+        params: dict[str, Any] = {"book_id": book_id, "user_id": user_id}
+
+        if after is not None:
+            params["after_created_at"] = after.created_at
+            params["after_user_id"] = after.user_id
+            params["after_book_id"] = after.book_id
+
+        if limit is not None:
+            params["limit"] = limit
+
         async with self._session() as session:
-            async with session.begin():
-                await session.execute(statement)
+            rows = await session.execute(statement, params)
 
-    async def find_reviews(
-        self, *, book_id: Optional[str] = None, user_id: Optional[int] = None
-    ) -> Sequence[Review]:
-        statement = select(TableReviews)
+            return list(map(_review, rows))
 
-        if book_id is not None:
-            statement = statement.where(TableReviews.book_id == book_id)
+    async def find_rating_stats(
+        self, book_ids: Sequence[str]
+    ) -> Mapping[str, RatingStats]:
+        if not book_ids:
+            return {}
 
-        if user_id is not None:
-            statement = statement.where(TableReviews.user_id == user_id)
+        async with self._session() as session:
+            stats = await session.scalars(
+                _FIND_RATING_STATS, {"book_ids": list(book_ids)}
+            )
+
+            return {s.book_id: RatingStats.parse_scalar(s) for s in stats}
+
+    async def import_reviews(self, reviews: Sequence[models.Review]) -> None:
+        if not reviews:
+            return
 
+        rows = [review.model_dump() for review in reviews]
+
+        # a list of parameters is executed with a single executemany
         async with self._session() as session:
-            reviews = await session.scalars(statement)
+            async with session.begin():
+                await session.execute(_IMPORT_REVIEWS, rows)
+
+    async def stream_reviews(
+        self, *, batch_size: int = 1000
+    ) -> AsyncIterator[models.Review]:
+        async with self._session() as session:
+            rows = await session.stream(
+                _STREAM_REVIEWS, execution_options={"yield_per": batch_size}
+            )
+
+            # rows are fetched in the batches rather than awaited one by one
+            async for partition in rows.partitions():
+                for row in partition:
+                    yield _review(row)
+
 
-            return list(map(Review.parse_scalar, reviews))
+class GroupCommitStats(BaseModel):
+    # Writes committed
+    writes: int = 0
+
+    # Transactions the writes were committed in
+    commits: int = 0
+
+    # Writes that failed
+    failed: int = 0
+
+    # Writes dropped before they were committed, as their callers were cancelled
+    dropped: int = 0
+
+    # Largest number of writes committed at once
+    largest_batch: int = 0
+
+    # Average number of writes committed at once
+    average_batch: float = 0
+
+
+class _Write(NamedTuple):
+    statement: Executable
+    params: dict[str, Any]
+    done: "asyncio.Future[None]"
+
+
+class GroupCommitRepository(ORMRepository):
+    """
+    Reviews repository that commits the concurrent writes together.
+
+    Writes are queued to a single writer task, which commits whatever is queued
+    in one transaction, so that SQLite syncs once per batch instead of once per write
+    and the writes never compete for the database lock with each other.
+    A write returns once its transaction is committed.
+    A write whose caller is cancelled before its batch is taken is dropped,
+    so that every committed write is followed by the caller's cache invalidation.
+    """
+
+    _max_batch: int
+    _max_wait: float
+    _queue: "asyncio.Queue[_Write]"
+    _writer: Optional["asyncio.Task[None]"]
+    _stats: GroupCommitStats
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        *,
+        max_batch: int = 1000,
+        max_wait: float = 0,
+        queue_size: int = 10_000,
+    ) -> None:
+        """
+        At most `max_batch` writes are committed at once. The first write of a batch
+        waits up to `max_wait` seconds for others, while the writes queued during
+        a commit are always committed together in the next one.
+        Writes beyond `queue_size` waiting ones wait for the queue to drain.
+        """
+
+        super().__init__(session_maker)
+
+        self._max_batch = max_batch
+        self._max_wait = max_wait
+        self._queue = asyncio.Queue(queue_size)
+        self._writer = None
+        self._stats = GroupCommitStats()
+
+    @property
+    def stats(self) -> GroupCommitStats:
+        """
+        Snapshot of the writer counters.
+        """
+
+        commits = self._stats.commits
+
+        return self._stats.model_copy(
+            update={"average_batch": self._stats.writes / commits if commits else 0}
+        )
+
+    async def delete_review(self, *, user_id: int, book_id: str) -> None:
+        await self._write(_DELETE_REVIEW, {"user_id": user_id, "book_id": book_id})
+
+    async def create_or_update_review(
+        self,
+        *,
+        user_id: int,
+        book_id: str,
+        rating: int,
+        commentary: Optional[str] = None,
+    ) -> None:
+        await self._write(
+            _UPSERT_REVIEW, _upsert_params(user_id, book_id, rating, commentary)
+        )
+
+    async def close(self) -> None:
+        """
+        Commit the queued writes and stop the writer.
+        """
+
+        if self._writer is None:
+            return
+
+        await self._queue.join()
+
+        self._writer.cancel()
+
+        await asyncio.gather(self._writer, return_exceptions=True)
+
+        self._writer = None
+
+    async def _write(self, statement: Executable, params: dict[str, Any]) -> None:
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._work())
+
+        done = asyncio.get_running_loop().create_future()
+
+        await self._queue.put(_Write(statement, params, done))
+
+        await done
+
+    async def _work(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+
+            if self._max_wait > 0 and self._queue.qsize() < self._max_batch - 1:
+                await asyncio.sleep(self._max_wait)
+
+            while len(batch) < self._max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self._commit_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit_batch(self, batch: Sequence[_Write]) -> None:
+        # callers that gave up before the commit have their writes dropped
+        writes = [write for write in batch if not write.done.done()]
+
+        if len(writes) < len(batch):
+            self._stats.dropped += len(batch) - len(writes)
+
+            _logger.warning(
+                "dropped %d review writes of cancelled callers",
+                len(batch) - len(writes),
+            )
+
+        if not writes:
+            return
+
+        try:
+            await self._commit(writes)
+        except Exception:
+            # a single failing write must not fail the others
+            for write in writes:
+                await self._commit_alone(write)
+
+            return
+
+        self._stats.writes += len(writes)
+        self._stats.commits += 1
+        self._stats.largest_batch = max(self._stats.largest_batch, len(writes))
+
+        for write in writes:
+            if not write.done.done():
+                write.done.set_result(None)
+
+    async def _commit_alone(self, write: _Write) -> None:
+        try:
+            await self._commit([write])
+        except Exception as e:
+            self._stats.failed += 1
+
+            if not write.done.done():
+                write.done.set_exception(e)
+
+            return
+
+        self._stats.writes += 1
+        self._stats.commits += 1
+
+        if not write.done.done():
+            write.done.set_result(None)
+
+    async def _commit(self, writes: Sequence[_Write]) -> None:
+        """
+        Execute the writes in order in a single transaction.
+        Consecutive writes of the same kind are executed with a single executemany.
+        """
+
+        async with self._session() as session:
+            async with session.begin():
+                for statement, group in itertools.groupby(
+                    writes, key=lambda w: w.statement
+                ):
+                    await session.execute(statement, [w.params for w in group])
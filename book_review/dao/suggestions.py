@@ -0,0 +1,164 @@
+import bisect
+import sys
+from abc import ABC, abstractmethod
+from typing import Sequence
+
+from pydantic import BaseModel
+
+from book_review.models.book import Suggestion, SuggestionKind
+
+# separates the fields of the record, it is whitespace, so normalized terms never contain it
+_SEPARATOR = "\x1f"
+
+# pointer to the record in the list
+_POINTER_SIZE = 8
+
+# minimum number of the recent records kept aside before merging them into the sorted ones
+_MIN_BUFFER = 1024
+
+
+class SuggestionsStats(BaseModel):
+    # Suggestions in the index
+    entries: int = 0
+
+    # Approximate memory used by the index in bytes
+    memory: int = 0
+
+    # Suggestions that were not added because the memory cap was reached
+    rejected: int = 0
+
+
+class Repository(ABC):
+    """
+    Index of the suggestions searchable by the prefix of their terms.
+    """
+
+    @abstractmethod
+    async def add_suggestions(
+        self, suggestions: Sequence[tuple[str, Suggestion]]
+    ) -> int:
+        """
+        Add suggestions by their normalized terms, already added ones are ignored.
+        Returns the number of suggestions that were added.
+        """
+        pass
+
+    @abstractmethod
+    async def find_suggestions(self, prefix: str, limit: int) -> Sequence[Suggestion]:
+        """
+        Find suggestions whose terms start with the normalized prefix
+        in the lexicographic order of the terms.
+        """
+        pass
+
+
+class MemoryRepository(Repository):
+    """
+    Suggestions repository kept in the process memory.
+
+    Suggestions are encoded as "<term>\\x1f<kind>\\x1f<id>\\x1f<text>" strings
+    in a sorted list, so that the ones for a prefix are found with binary search
+    and stored without per-entry objects. Recent suggestions are kept in a small
+    sorted buffer and merged into the main list in batches to keep inserts cheap.
+
+    Suggestions are rejected once the memory cap is reached.
+    """
+
+    _max_memory: int
+    _records: list[str]
+    _buffer: list[str]
+    _stats: SuggestionsStats
+
+    def __init__(self, max_memory: int) -> None:
+        super().__init__()
+
+        self._max_memory = max_memory
+        self._records = []
+        self._buffer = []
+        self._stats = SuggestionsStats()
+
+    @property
+    def stats(self) -> SuggestionsStats:
+        """
+        Snapshot of the index counters.
+        """
+
+        return self._stats.model_copy()
+
+    async def add_suggestions(
+        self, suggestions: Sequence[tuple[str, Suggestion]]
+    ) -> int:
+        added = 0
+
+        for term, suggestion in suggestions:
+            record = _SEPARATOR.join(
+                (term, suggestion.kind.value, suggestion.id, suggestion.text)
+            )
+
+            if self._contains(record):
+                continue
+
+            size = sys.getsizeof(record) + _POINTER_SIZE
+
+            if self._stats.memory + size > self._max_memory:
+                self._stats.rejected += 1
+                continue
+
+            bisect.insort(self._buffer, record)
+
+            self._stats.entries += 1
+            self._stats.memory += size
+            added += 1
+
+        if len(self._buffer) >= max(_MIN_BUFFER, len(self._records) // 64):
+            # timsort merges the two sorted runs in linear time
+            self._records = sorted(self._records + self._buffer)
+            self._buffer = []
+
+        return added
+
+    async def find_suggestions(self, prefix: str, limit: int) -> Sequence[Suggestion]:
+        if not prefix:
+            return []
+
+        records = sorted(
+            _find(self._records, prefix, limit) + _find(self._buffer, prefix, limit)
+        )
+
+        suggestions: list[Suggestion] = []
+
+        for record in records[:limit]:
+            _, kind, id, text = record.split(_SEPARATOR, 3)
+
+            suggestions.append(
+                Suggestion.model_construct(kind=SuggestionKind(kind), id=id, text=text)
+            )
+
+        return suggestions
+
+    def _contains(self, record: str) -> bool:
+        for records in (self._records, self._buffer):
+            i = bisect.bisect_left(records, record)
+
+            if i < len(records) and records[i] == record:
+                return True
+
+        return False
+
+
+def _find(records: list[str], prefix: str, limit: int) -> list[str]:
+    """
+    First records starting with the prefix.
+    """
+
+    i = bisect.bisect_left(records, prefix)
+
+    found: list[str] = []
+
+    for record in records[i : i + limit]:
+        if not record.startswith(prefix):
+            break
+
+        found.append(record)
+
+    return found
@@ -1,9 +1,9 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Optional, Sequence
+from typing import Any, Optional, Sequence
 
 from pydantic import BaseModel
-from sqlalchemy import insert, select
+from sqlalchemy import Row, bindparam, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 import book_review.models.user as models
@@ -22,19 +22,6 @@ class User(BaseModel):
     password_hash: str
     created_at: datetime
 
-    @classmethod
-    def parse_scalar(cls, scalar: TableUsers) -> "User":
-        """
-        Create a new user from the given scalar
-        """
-
-        return cls(
-            id=scalar.id,
-            login=scalar.login,
-            password_hash=scalar.password_hash,
-            created_at=scalar.created_at,
-        )
-
     def map(self) -> models.User:
         """
         Map this user into primary user model
@@ -43,13 +30,50 @@ class User(BaseModel):
         return models.User(id=self.id, login=self.login, created_at=self.created_at)
 
 
+# Statements are built once with bound parameters, so that the lookups on every
+# authenticated request skip building the statement and its compiled cache key
+_USER_COLUMNS = (
+    TableUsers.id,
+    TableUsers.login,
+    TableUsers.password_hash,
+    TableUsers.created_at,
+)
+
+_FIND_USERS = select(TableUsers.id, TableUsers.login, TableUsers.created_at)
+
+_FIND_USERS_LIKE = _FIND_USERS.where(TableUsers.login.like(bindparam("login_like")))
+
+_FIND_USER_BY_ID = select(*_USER_COLUMNS).where(TableUsers.id == bindparam("id"))
+
+_FIND_USER_BY_LOGIN = select(*_USER_COLUMNS).where(
+    TableUsers.login == bindparam("login")
+)
+
+_CREATE_USER = (
+    insert(TableUsers)
+    .values(login=bindparam("login"), password_hash=bindparam("password_hash"))
+    .returning(TableUsers.id)
+)
+
+
+def _user(row: Optional[Row[Any]]) -> Optional[User]:
+    if row is None:
+        return None
+
+    id, login, password_hash, created_at = row
+
+    return User(id=id, login=login, password_hash=password_hash, created_at=created_at)
+
+
 class Repository(ABC):
     """
     Users repository.
     """
 
     @abstractmethod
-    async def find_users(self, *, login_like: Optional[str] = None) -> Sequence[User]:
+    async def find_users(
+        self, *, login_like: Optional[str] = None
+    ) -> Sequence[models.User]:
         """
         Find users by the login substring.
         If the login is not provided it will return all users.
@@ -93,21 +117,27 @@ class ORMRepository(Repository):
 
         self._session = session_maker
 
-    async def find_users(self, *, login_like: Optional[str] = None) -> Sequence[User]:
+    async def find_users(
+        self, *, login_like: Optional[str] = None
+    ) -> Sequence[models.User]:
         """
         Find users by the login substring.
         If the login is not provided it will return all users.
         """
 
-        statement = select(TableUsers)
+        # only the public columns as tuples rather than the ORM entities
+        statement, params = _FIND_USERS, {}
 
         if login_like is not None:
-            statement = statement.where(TableUsers.login.like(login_like))
+            statement, params = _FIND_USERS_LIKE, {"login_like": login_like}
 
         async with self._session() as session:
-            users = await session.scalars(statement)
+            rows = await session.execute(statement, params)
 
-            return list(map(User.parse_scalar, users))
+            return [
+                models.User(id=id, login=login, created_at=created_at)
+                for id, login, created_at in rows
+            ]
 
     async def find_user_by_id(self, id: UserID) -> Optional[User]:
         """
@@ -115,15 +145,10 @@ class ORMRepository(Repository):
         If the the user with such id was not found None is returned.
         """
 
-        statement = select(TableUsers).where(TableUsers.id == id)
-
         async with self._session() as session:
-            user = await session.scalar(statement)
-
-            if user is None:
-                return None
+            result = await session.execute(_FIND_USER_BY_ID, {"id": id})
 
-            return User.parse_scalar(user)
+            return _user(result.first())
 
     async def find_user_by_login(self, login: str) -> Optional[User]:
         """
@@ -131,15 +156,10 @@ class ORMRepository(Repository):
         If the the user with such login was not found None is returned.
         """
 
-        statement = select(TableUsers).where(TableUsers.login == login)
-
         async with self._session() as session:
-            user = await session.scalar(statement)
+            result = await session.execute(_FIND_USER_BY_LOGIN, {"login": login})
 
-            if user is None:
-                return None
-
-            return User.parse_scalar(user)
+            return _user(result.first())
 
     async def create_user(self, login: str, password_hash: str) -> int:
         """
@@ -147,15 +167,11 @@ class ORMRepository(Repository):
         Note, that exception will be thrown if the user exists already.
         """
 
-        statement = (
-            insert(TableUsers)
-            .values(login=login, password_hash=password_hash)
-            .returning(TableUsers.id)
-        )
-
         async with self._session() as session:
             async with session.begin():
-                result = await session.execute(statement)
+                result = await session.execute(
+                    _CREATE_USER, {"login": login, "password_hash": password_hash}
+                )
 
                 id = result.scalar_one()
 
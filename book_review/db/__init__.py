@@ -1,7 +1,17 @@
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Sequence
 
-from sqlalchemy import CheckConstraint, DateTime, ForeignKey, String
+from sqlalchemy import (
+    CheckConstraint,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    inspect,
+    text,
+)
+from sqlalchemy.dialects.sqlite import DATETIME
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from sqlalchemy.sql import func
@@ -9,12 +19,185 @@ from sqlalchemy.sql import func
 from book_review.models.book import BookID
 from book_review.models.user import UserID
 
+# Ratings are from 1 to 10
+RATINGS = range(1, 11)
+
 
 async def create_all(engine: AsyncEngine) -> None:
     async with engine.begin() as connection:
+        rating_stats_exist = await connection.run_sync(
+            lambda c: inspect(c).has_table(TableBookRatingStats.__tablename__)
+        )
+
+        review_days_exist = await connection.run_sync(
+            lambda c: inspect(c).has_table(TableBookReviewDays.__tablename__)
+        )
+
         await connection.run_sync(TableUsers.metadata.create_all)
         await connection.run_sync(TableReviews.metadata.create_all)
 
+        # tables created before the indexes were declared
+        await connection.run_sync(_create_reviews_indexes)
+
+        await connection.run_sync(TableCatalogWorks.metadata.create_all)
+        await connection.run_sync(TableCatalogAuthors.metadata.create_all)
+        await connection.run_sync(TableBookPreviews.metadata.create_all)
+        await connection.run_sync(TableBookRatingStats.metadata.create_all)
+        await connection.run_sync(TableBookReviewDays.metadata.create_all)
+
+        for statement in _BOOK_PREVIEWS_FTS:
+            await connection.execute(text(statement))
+
+        for statement in _BOOK_RATING_STATS_TRIGGERS:
+            await connection.execute(text(statement))
+
+        if not rating_stats_exist:
+            # reviews written before the stats were maintained
+            await connection.execute(text(_BOOK_RATING_STATS_BACKFILL))
+
+        for statement in _BOOK_REVIEW_DAYS_TRIGGERS:
+            await connection.execute(text(statement))
+
+        if not review_days_exist:
+            await connection.execute(text(_BOOK_REVIEW_DAYS_BACKFILL))
+
+
+def _create_reviews_indexes(connection: Connection) -> None:
+    for index in TableReviews.__table_args__:
+        index.create(connection, checkfirst=True)
+
+
+# Full-text index over the book previews kept in sync by triggers.
+# Tokenized the same way as the local catalog (see book_review.openlibrary.local).
+_BOOK_PREVIEWS_FTS: Sequence[str] = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS book_previews_fts USING fts5(
+        title, authors, subjects,
+        content = 'book_previews', content_rowid = 'rowid',
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS book_previews_fts_insert
+    AFTER INSERT ON book_previews BEGIN
+        INSERT INTO book_previews_fts (rowid, title, authors, subjects)
+        VALUES (new.rowid, new.title, new.authors, new.subjects);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS book_previews_fts_delete
+    AFTER DELETE ON book_previews BEGIN
+        INSERT INTO book_previews_fts (book_previews_fts, rowid, title, authors, subjects)
+        VALUES ('delete', old.rowid, old.title, old.authors, old.subjects);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS book_previews_fts_update
+    AFTER UPDATE ON book_previews BEGIN
+        INSERT INTO book_previews_fts (book_previews_fts, rowid, title, authors, subjects)
+        VALUES ('delete', old.rowid, old.title, old.authors, old.subjects);
+        INSERT INTO book_previews_fts (rowid, title, authors, subjects)
+        VALUES (new.rowid, new.title, new.authors, new.subjects);
+    END
+    """,
+)
+
+
+def _rating_columns() -> str:
+    return ", ".join(f"rated_{rating}" for rating in RATINGS)
+
+
+def _rating_delta(row: str, sign: str) -> str:
+    """
+    Update of the rating stats by the rating of the review `row` (new or old).
+    """
+
+    histogram = ", ".join(
+        f"rated_{rating} = rated_{rating} {sign} ({row}.rating = {rating})"
+        for rating in RATINGS
+    )
+
+    return f"count = count {sign} 1, sum = sum {sign} {row}.rating, {histogram}"
+
+
+_ADD_RATING = f"""
+    INSERT INTO book_rating_stats (book_id, count, sum, {_rating_columns()})
+    VALUES (new.book_id, 1, new.rating, {
+        ", ".join(f"new.rating = {rating}" for rating in RATINGS)
+    })
+    ON CONFLICT (book_id) DO UPDATE SET {_rating_delta("new", "+")};
+"""
+
+_REMOVE_RATING = f"""
+    UPDATE book_rating_stats SET {_rating_delta("old", "-")}
+    WHERE book_id = old.book_id;
+"""
+
+# Rating aggregates of the books updated along with the reviews,
+# so they are always in the same transaction as the review writes.
+_BOOK_RATING_STATS_TRIGGERS: Sequence[str] = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS book_rating_stats_insert
+    AFTER INSERT ON reviews BEGIN {_ADD_RATING} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS book_rating_stats_delete
+    AFTER DELETE ON reviews BEGIN {_REMOVE_RATING} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS book_rating_stats_update
+    AFTER UPDATE OF book_id, rating ON reviews BEGIN {_REMOVE_RATING} {_ADD_RATING} END
+    """,
+)
+
+_BOOK_RATING_STATS_BACKFILL = f"""
+INSERT OR IGNORE INTO book_rating_stats (book_id, count, sum, {_rating_columns()})
+SELECT book_id, count(*), sum(rating), {
+    ", ".join(f"sum(rating = {rating})" for rating in RATINGS)
+}
+FROM reviews
+GROUP BY book_id
+"""
+
+_ADD_REVIEW_DAY = """
+    INSERT INTO book_review_days (book_id, day, count, sum)
+    VALUES (new.book_id, date(new.created_at), 1, new.rating)
+    ON CONFLICT (book_id, day) DO UPDATE SET
+        count = count + 1, sum = sum + new.rating;
+"""
+
+_REMOVE_REVIEW_DAY = """
+    UPDATE book_review_days SET count = count - 1, sum = sum - old.rating
+    WHERE book_id = old.book_id AND day = date(old.created_at);
+"""
+
+# Reviews of the books counted by the day they were written, so that the books
+# reviewed the most lately are found without aggregating the reviews.
+_BOOK_REVIEW_DAYS_TRIGGERS: Sequence[str] = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS book_review_days_insert
+    AFTER INSERT ON reviews BEGIN {_ADD_REVIEW_DAY} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS book_review_days_delete
+    AFTER DELETE ON reviews BEGIN {_REMOVE_REVIEW_DAY} END
+    """,
+    # imported reviews may overwrite the time they were written
+    f"""
+    CREATE TRIGGER IF NOT EXISTS book_review_days_update
+    AFTER UPDATE OF book_id, rating, created_at ON reviews BEGIN
+        {_REMOVE_REVIEW_DAY} {_ADD_REVIEW_DAY}
+    END
+    """,
+)
+
+_BOOK_REVIEW_DAYS_BACKFILL = """
+INSERT OR IGNORE INTO book_review_days (book_id, day, count, sum)
+SELECT book_id, date(created_at), count(*), sum(rating)
+FROM reviews
+GROUP BY book_id, date(created_at)
+"""
+
 
 class Base(DeclarativeBase):
     pass
@@ -29,9 +212,24 @@ class TableUsers(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(), server_default=func.now())
 
 
+# Stored with seconds precision like CURRENT_TIMESTAMP,
+# so that the compared values are in the same format as the stored ones
+_TIMESTAMP = DATETIME(  # type: ignore[no-untyped-call]
+    storage_format="%(year)04d-%(month)02d-%(day)02d "
+    "%(hour)02d:%(minute)02d:%(second)02d"
+)
+
+
 class TableReviews(Base):
     __tablename__ = "reviews"
 
+    # reviews are listed from the newest by book, by user or all of them
+    __table_args__ = (
+        Index("ix_reviews_book_id_created_at", "book_id", "created_at", "user_id"),
+        Index("ix_reviews_user_id_created_at", "user_id", "created_at", "book_id"),
+        Index("ix_reviews_created_at", "created_at", "user_id", "book_id"),
+    )
+
     user_id: Mapped[UserID] = mapped_column(
         ForeignKey(f"{TableUsers.__tablename__}.id"), primary_key=True
     )
@@ -40,5 +238,97 @@ class TableReviews(Base):
     rating: Mapped[int] = mapped_column(CheckConstraint("rating between 1 and 10"))
     commentary: Mapped[Optional[str]] = mapped_column()
 
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(_TIMESTAMP, server_default=func.now())
     updated_at: Mapped[Optional[datetime]] = mapped_column()
+
+
+class TableCatalogEntry(Base):
+    """
+    Openlibrary document persisted along with the time it was fetched.
+    """
+
+    __abstract__ = True
+
+    key: Mapped[str] = mapped_column(String(), primary_key=True)
+
+    # openlibrary document as JSON
+    data: Mapped[str] = mapped_column()
+
+    fetched_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+class TableCatalogWorks(TableCatalogEntry):
+    __tablename__ = "catalog_works"
+
+
+class TableCatalogAuthors(TableCatalogEntry):
+    __tablename__ = "catalog_authors"
+
+
+class TableBookPreviews(Base):
+    """
+    Openlibrary book preview seen in the search results.
+    """
+
+    __tablename__ = "book_previews"
+
+    key: Mapped[str] = mapped_column(String(), primary_key=True)
+
+    # indexed texts, names and subjects are separated by spaces
+    title: Mapped[str] = mapped_column()
+    authors: Mapped[str] = mapped_column()
+    subjects: Mapped[str] = mapped_column()
+
+    # languages as JSON array
+    languages: Mapped[str] = mapped_column()
+
+    # openlibrary document as JSON
+    data: Mapped[str] = mapped_column()
+
+    indexed_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+class TableBookRatingStats(Base):
+    """
+    Aggregates of the book ratings maintained by triggers on the reviews.
+    """
+
+    __tablename__ = "book_rating_stats"
+
+    book_id: Mapped[BookID] = mapped_column(String(), primary_key=True)
+
+    count: Mapped[int] = mapped_column()
+    sum: Mapped[int] = mapped_column()
+
+    # number of the reviews with each rating
+    rated_1: Mapped[int] = mapped_column()
+    rated_2: Mapped[int] = mapped_column()
+    rated_3: Mapped[int] = mapped_column()
+    rated_4: Mapped[int] = mapped_column()
+    rated_5: Mapped[int] = mapped_column()
+    rated_6: Mapped[int] = mapped_column()
+    rated_7: Mapped[int] = mapped_column()
+    rated_8: Mapped[int] = mapped_column()
+    rated_9: Mapped[int] = mapped_column()
+    rated_10: Mapped[int] = mapped_column()
+
+
+class TableBookReviewDays(Base):
+    """
+    Reviews of the books by the day they were written maintained by triggers.
+    """
+
+    __tablename__ = "book_review_days"
+
+    # the books reviewed since a day are summed up without reading the table
+    __table_args__ = (
+        Index("ix_book_review_days_day", "day", "book_id", "count", "sum"),
+    )
+
+    book_id: Mapped[BookID] = mapped_column(String(), primary_key=True)
+
+    # UTC date as "YYYY-MM-DD" like the SQLite date()
+    day: Mapped[str] = mapped_column(String(), primary_key=True)
+
+    count: Mapped[int] = mapped_column()
+    sum: Mapped[int] = mapped_column()
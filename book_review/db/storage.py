@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import time
+from types import TracebackType
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel, NonNegativeInt, PositiveInt
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import ConnectionPoolEntry, QueuePool
+
+_logger = logging.getLogger(__name__)
+
+# auto_vacuum mode that lets free pages be released by incremental_vacuum
+_AUTO_VACUUM_INCREMENTAL = 2
+
+# Names of the auto_vacuum modes by their values
+_AUTO_VACUUM_MODES = {0: "NONE", 1: "FULL", _AUTO_VACUUM_INCREMENTAL: "INCREMENTAL"}
+
+
+class StorageProfile(BaseModel):
+    """
+    SQLite pragmas applied to every pooled connection.
+    """
+
+    # WAL lets the readers go on while a writer commits
+    journal_mode: Literal["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"] = (
+        "WAL"
+    )
+
+    # NORMAL is durable in WAL mode except for the last commits on power loss
+    synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+
+    # Page cache size in bytes per connection
+    cache_size: NonNegativeInt = 64 * 1024 * 1024
+
+    # Size in bytes of the database mapped into memory, 0 disables it
+    mmap_size: NonNegativeInt = 256 * 1024 * 1024
+
+    # Where temporary tables and indexes are kept
+    temp_store: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
+
+    # Time in seconds a connection waits for a lock before failing
+    busy_timeout: float = 5
+
+    def pragmas(self) -> list[str]:
+        return [
+            # before the first table is created, so that free pages can be released
+            "PRAGMA auto_vacuum = INCREMENTAL",
+            f"PRAGMA journal_mode = {self.journal_mode}",
+            f"PRAGMA synchronous = {self.synchronous}",
+            # negative size is in KiB rather than pages
+            f"PRAGMA cache_size = -{self.cache_size // 1024}",
+            f"PRAGMA mmap_size = {self.mmap_size}",
+            f"PRAGMA temp_store = {self.temp_store}",
+            f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}",
+        ]
+
+
+def apply_profile(engine: AsyncEngine, profile: StorageProfile) -> None:
+    """
+    Apply the profile to every connection the engine opens.
+    """
+
+    pragmas = profile.pragmas()
+
+    def connect(dbapi_connection: Any, _: ConnectionPoolEntry) -> None:
+        cursor = dbapi_connection.cursor()
+
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    event.listen(engine.sync_engine, "connect", connect)
+
+
+class PoolSettings(BaseModel):
+    """
+    Connection pool of the engine.
+    Every aiosqlite connection runs its statements in a thread of its own.
+    """
+
+    # Connections kept open, each with its own page cache
+    size: PositiveInt = 8
+
+    # Connections opened beyond the size under load and closed once returned
+    max_overflow: NonNegativeInt = 0
+
+    # Time in seconds to wait for a free connection before failing
+    timeout: float = 30
+
+    # Whether to test a connection before it is handed out
+    pre_ping: bool = False
+
+    # Time in seconds after which a connection is replaced, -1 keeps it open
+    recycle: int = -1
+
+    def engine_options(self) -> dict[str, Any]:
+        """
+        Keyword arguments of the engine.
+        """
+
+        return {
+            "pool_size": self.size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.timeout,
+            "pool_pre_ping": self.pre_ping,
+            "pool_recycle": self.recycle,
+        }
+
+
+class PoolStats(BaseModel):
+    # Connections kept open
+    size: int = 0
+
+    # Open connections waiting in the pool
+    checked_in: int = 0
+
+    # Connections in use
+    checked_out: int = 0
+
+    # Connections opened beyond the size, negative while the pool is not full
+    overflow: int = 0
+
+
+def pool_stats(engine: AsyncEngine) -> PoolStats:
+    """
+    Snapshot of the engine connection pool.
+    """
+
+    pool = engine.pool
+
+    if not isinstance(pool, QueuePool):
+        return PoolStats()
+
+    return PoolStats(
+        size=pool.size(),
+        checked_in=pool.checkedin(),
+        checked_out=pool.checkedout(),
+        overflow=pool.overflow(),
+    )
+
+
+class MaintenanceStats(BaseModel):
+    # Completed maintenance runs
+    runs: int = 0
+
+    # Maintenance runs that failed
+    failures: int = 0
+
+    # Free pages released to the file system
+    vacuumed_pages: int = 0
+
+    # auto_vacuum mode of the database, pages are released only if INCREMENTAL
+    auto_vacuum: Optional[str] = None
+
+    # Duration of the last completed run in seconds
+    last_duration: float = 0
+
+
+class Maintenance:
+    """
+    Background task keeping the query planner statistics up to date
+    and releasing free pages of the database every `interval` seconds.
+
+    The task is started and stopped with `async with`,
+    so that its lifetime is bound to the application lifespan.
+    """
+
+    _engine: AsyncEngine
+    _interval: float
+    _vacuum_pages: int
+    _analysis_limit: int
+    _task: Optional["asyncio.Task[None]"]
+    _stats: MaintenanceStats
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        *,
+        interval: float = 60 * 60,
+        vacuum_pages: int = 1000,
+        analysis_limit: int = 1000,
+    ) -> None:
+        """
+        At most `vacuum_pages` free pages are released per run, so that the writers
+        are not blocked for long. ANALYZE samples about `analysis_limit` rows per index.
+        """
+
+        self._engine = engine
+        self._interval = interval
+        self._vacuum_pages = vacuum_pages
+        self._analysis_limit = analysis_limit
+        self._task = None
+        self._stats = MaintenanceStats()
+
+    @property
+    def stats(self) -> MaintenanceStats:
+        """
+        Snapshot of the maintenance counters.
+        """
+
+        return self._stats.model_copy()
+
+    async def __aenter__(self) -> "Maintenance":
+        self._task = asyncio.create_task(self._work())
+
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+
+        await asyncio.gather(self._task, return_exceptions=True)
+
+        self._task = None
+
+    async def run(self) -> None:
+        """
+        Run the maintenance once.
+        """
+
+        started_at = time.perf_counter()
+
+        async with self._engine.connect() as connection:
+            await connection.exec_driver_sql(
+                f"PRAGMA analysis_limit = {self._analysis_limit}"
+            )
+
+            analyzed = await connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+
+            if analyzed.first() is None:
+                # optimize analyzes only the tables the queries of the same connection
+                # would have benefited from, so the first statistics are gathered here
+                await connection.exec_driver_sql("ANALYZE")
+            else:
+                await connection.exec_driver_sql("PRAGMA optimize")
+
+            auto_vacuum: int = (
+                await connection.exec_driver_sql("PRAGMA auto_vacuum")
+            ).scalar_one()
+
+            mode = _AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum))
+
+            if mode != "INCREMENTAL" and self._stats.auto_vacuum != mode:
+                _logger.warning(
+                    "incremental vacuum is unavailable with auto_vacuum = %s, "
+                    "databases created before the storage profile "
+                    "need a full VACUUM to enable it",
+                    mode,
+                )
+
+            self._stats.auto_vacuum = mode
+
+            if auto_vacuum == _AUTO_VACUUM_INCREMENTAL:
+                free = await connection.exec_driver_sql("PRAGMA freelist_count")
+                pages = min(free.scalar() or 0, self._vacuum_pages)
+
+                if pages:
+                    # the driver steps the statement, which releases a page per step,
+                    # only once, so the pages are released one by one in a transaction
+                    await connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+                    for _ in range(pages):
+                        await connection.exec_driver_sql("PRAGMA incremental_vacuum(1)")
+
+                    await connection.commit()
+
+                    self._stats.vacuumed_pages += pages
+
+        self._stats.runs += 1
+        self._stats.last_duration = time.perf_counter() - started_at
+
+    async def _work(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+
+            try:
+                await self.run()
+            except Exception:
+                self._stats.failures += 1
+                _logger.warning("failed to maintain the database", exc_info=True)
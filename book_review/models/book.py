@@ -1,4 +1,5 @@
 from datetime import date
+from enum import Enum
 from typing import Optional, Sequence
 
 from pydantic import AnyHttpUrl, BaseModel
@@ -37,3 +38,18 @@ class Book(BaseModel):
     covers: Sequence[CoverID] = []
     subjects: Sequence[str] = []
     author_id: Optional[AuthorID] = None
+
+
+class SuggestionKind(str, Enum):
+    BOOK = "book"
+    AUTHOR = "author"
+
+
+class Suggestion(BaseModel):
+    """
+    Book or author suggested for the typed prefix.
+    """
+
+    kind: SuggestionKind
+    id: BookID | AuthorID
+    text: str
@@ -1,9 +1,9 @@
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Sequence
 
 from pydantic import BaseModel
 
-from .book import BookID
+from .book import BookID, BookPreview
 from .user import UserID
 
 
@@ -14,3 +14,65 @@ class Review(BaseModel):
     commentary: Optional[str]
     created_at: datetime
     updated_at: Optional[datetime]
+
+
+class ReviewCursor(BaseModel):
+    """
+    Position right after the review in the listings, which go from the newest reviews.
+    """
+
+    created_at: datetime
+    user_id: UserID
+    book_id: BookID
+
+    @staticmethod
+    def of(review: Review) -> "ReviewCursor":
+        return ReviewCursor(
+            created_at=review.created_at, user_id=review.user_id, book_id=review.book_id
+        )
+
+
+class RatingStats(BaseModel):
+    book_id: BookID
+    count: int = 0
+    sum: int = 0
+
+    # numbers of the ratings from 1 to 10
+    histogram: Sequence[int] = [0] * 10
+
+    @property
+    def average(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+
+class RankedBook(BaseModel):
+    """
+    Book on a leaderboard along with the reviews it is ranked by.
+    """
+
+    book_id: BookID
+    score: float
+
+    # reviews the score is computed from
+    count: int
+    sum: int
+
+    # preview of the book if it was found by a search before
+    preview: Optional[BookPreview] = None
+
+    @property
+    def average(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+
+class TransferReport(BaseModel):
+    """
+    Number of the reviews imported or exported and the time it took.
+    """
+
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Optional, Sequence, TypeVar
+
+from pydantic import BaseModel
+
+import book_review.dao.catalog as catalog_dao
+
+from .client import Author, Book, BookPreview, Client, CoverSize, SearchBooksFilter
+
+_logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class CatalogStats(BaseModel):
+    # Entries served from the catalog without revalidation
+    fresh: int = 0
+
+    # Stale entries served while being refreshed in background
+    stale: int = 0
+
+    # Stale entries served because the wrapped client failed
+    stale_if_error: int = 0
+
+    # Calls that were passed to the wrapped client
+    misses: int = 0
+
+    # Background refreshes that failed
+    failed_refreshes: int = 0
+
+
+class CatalogClient(Client):
+    """
+    Client wrapper that persists works and authors in the catalog.
+
+    Fresh entries are served from the catalog.
+    Stale entries are served right away while being refreshed in background,
+    and also when the wrapped client fails (stale-while-revalidate, stale-if-error).
+    Searches and covers are passed through as is.
+    """
+
+    _client: Client
+    _catalog: catalog_dao.Repository
+    _fresh_for: timedelta
+    _stale_for: timedelta
+    _refreshing: dict[tuple[catalog_dao.Kind, str], "asyncio.Task[None]"]
+    _stats: CatalogStats
+
+    def __init__(
+        self,
+        client: Client,
+        catalog: catalog_dao.Repository,
+        *,
+        fresh_for: timedelta,
+        stale_for: timedelta,
+    ) -> None:
+        """
+        Entries younger than `fresh_for` are fresh.
+        Stale entries are revalidated in background for `stale_for` more,
+        after that they are served only if the wrapped client fails.
+        """
+
+        super().__init__()
+
+        self._client = client
+        self._catalog = catalog
+        self._fresh_for = fresh_for
+        self._stale_for = stale_for
+        self._refreshing = {}
+        self._stats = CatalogStats()
+
+    @property
+    def stats(self) -> CatalogStats:
+        """
+        Snapshot of the catalog counters.
+        """
+
+        return self._stats.model_copy()
+
+    async def close(self) -> None:
+        """
+        Cancel the background refreshes and wait until they stop.
+        """
+
+        tasks = list(self._refreshing.values())
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def search_books(self, filter: SearchBooksFilter) -> Sequence[BookPreview]:
+        return await self._client.search_books(filter)
+
+    async def get_book(self, key: str) -> Optional[Book]:
+        return await self._get(catalog_dao.Kind.WORK, key, self._client.get_book, Book)
+
+    async def get_cover(
+        self, id: int, size: CoverSize = CoverSize.SMALL
+    ) -> Optional[AsyncIterator[bytes]]:
+        return await self._client.get_cover(id, size)
+
+    async def get_author(self, key: str) -> Optional[Author]:
+        return await self._get(
+            catalog_dao.Kind.AUTHOR, key, self._client.get_author, Author
+        )
+
+    async def _get(
+        self,
+        kind: catalog_dao.Kind,
+        key: str,
+        fetch: Callable[[str], Awaitable[Optional[M]]],
+        model: type[M],
+    ) -> Optional[M]:
+        entry = await self._catalog.get_entry(kind, key)
+
+        if entry is not None:
+            age = datetime.now() - entry.fetched_at
+
+            if age <= self._fresh_for:
+                self._stats.fresh += 1
+
+                return model.model_validate_json(entry.data)
+
+            if age <= self._fresh_for + self._stale_for:
+                self._stats.stale += 1
+                self._refresh_in_background(kind, key, fetch)
+
+                return model.model_validate_json(entry.data)
+
+        self._stats.misses += 1
+
+        try:
+            return await self._fetch(kind, key, fetch)
+        except Exception:
+            if entry is None:
+                raise
+
+            _logger.warning(
+                "serving stale %s %r due to upstream error",
+                kind.value,
+                key,
+                exc_info=True,
+            )
+
+            self._stats.stale_if_error += 1
+
+            return model.model_validate_json(entry.data)
+
+    async def _fetch(
+        self,
+        kind: catalog_dao.Kind,
+        key: str,
+        fetch: Callable[[str], Awaitable[Optional[M]]],
+    ) -> Optional[M]:
+        """
+        Fetch the entry from the wrapped client and persist it in the catalog.
+        """
+
+        value = await fetch(key)
+
+        if value is None:
+            await self._catalog.delete_entry(kind, key)
+        else:
+            await self._catalog.put_entry(
+                kind, key, value.model_dump_json(), datetime.now()
+            )
+
+        return value
+
+    def _refresh_in_background(
+        self,
+        kind: catalog_dao.Kind,
+        key: str,
+        fetch: Callable[[str], Awaitable[Optional[M]]],
+    ) -> None:
+        if (kind, key) in self._refreshing:
+            return
+
+        async def refresh() -> None:
+            try:
+                await self._fetch(kind, key, fetch)
+            except Exception:
+                _logger.warning(
+                    "failed to refresh %s %r", kind.value, key, exc_info=True
+                )
+
+                self._stats.failed_refreshes += 1
+            finally:
+                del self._refreshing[(kind, key)]
+
+        self._refreshing[(kind, key)] = asyncio.create_task(refresh())
@@ -1,15 +1,25 @@
+import asyncio
 from abc import ABC, abstractmethod
 from datetime import date
 from enum import Enum
-from typing import Any, Optional, Sequence
+from typing import Any, AsyncIterator, Awaitable, Optional, Protocol, Sequence
 
 import aiohttp
-from pydantic import AnyHttpUrl, BaseModel, PositiveInt
+from pydantic import AnyHttpUrl, BaseModel, PositiveFloat, PositiveInt
 
 import book_review.models.book as models
 
+from .resilience import BreakerStats, CircuitBreaker, RetryPolicy
+from .resilience import UpstreamError as UpstreamError
+
 QueryParams = list[tuple[str, str]]
 
+# statuses that are worth retrying, anything else is not going to change
+_RETRYABLE_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# size of the chunks cover images are streamed with
+_COVER_CHUNK_SIZE = 64 * 1024
+
 
 class CoverSize(str, Enum):
     SMALL = "S"
@@ -73,23 +83,16 @@ class BookPreview(BaseModel):
             for key, name in zip(self.author_key, self.author_name)
         ]
 
-        first_year: Optional[int] = None
-
-        for year in self.publish_year:
-            if year <= 0:
-                continue
-
-            if first_year is not None:
-                first_year = min(first_year or 1, year)
-            else:
-                first_year = year
+        years = [year for year in self.publish_year if year > 0]
 
         first_publishment_date: Optional[date] = None
 
-        if first_year is not None:
-            first_publishment_date = date(year=first_year, month=1, day=1)
+        if years:
+            first_publishment_date = date(year=min(years), month=1, day=1)
 
-        return models.BookPreview(
+        # fields were validated when this preview was decoded,
+        # so the preview is constructed without validating them again
+        return models.BookPreview.model_construct(
             id=self.key,
             title=self.title,
             cover_id=self.cover_i,
@@ -100,6 +103,10 @@ class BookPreview(BaseModel):
         )
 
 
+class SearchBooksResponse(BaseModel):
+    docs: Sequence[BookPreview]
+
+
 class TypedField(BaseModel):
     type: str
     value: Any
@@ -146,6 +153,19 @@ class Book(BaseModel):
         )
 
 
+async def _iter_chunks(resp: aiohttp.ClientResponse) -> AsyncIterator[bytes]:
+    """
+    Stream the response body so that it is never loaded into RAM entirely.
+    The response is released once the stream is exhausted or closed.
+    """
+
+    try:
+        async for chunk in resp.content.iter_chunked(_COVER_CHUNK_SIZE):
+            yield chunk
+    finally:
+        resp.release()
+
+
 def adjust_key(key: str) -> str:
     """
     Adjust openlibrary key from "/works/OL49024" to "OL49024"
@@ -154,6 +174,20 @@ def adjust_key(key: str) -> str:
     return key.split("/")[-1]
 
 
+def decode_search_books_response(body: bytes) -> Sequence[BookPreview]:
+    """
+    Decode books previews from the search response body.
+    JSON is parsed and validated in a single pass without building intermediate dicts.
+    """
+
+    books = SearchBooksResponse.model_validate_json(body).docs
+
+    for book in books:
+        book.key = adjust_key(book.key)
+
+    return books
+
+
 def normalize_query(query: str) -> str:
     """
     Normalize given query by removing odd spaces and making it lowercase.
@@ -196,9 +230,9 @@ class Client(ABC):
     @abstractmethod
     async def get_cover(
         self, id: int, size: CoverSize = CoverSize.SMALL
-    ) -> Optional[bytes]:
+    ) -> Optional[AsyncIterator[bytes]]:
         """
-        Get book or author cover image bytes by its id.
+        Get book or author cover image by its id as a stream of byte chunks.
         It will return None if the cover was not found.
         """
         pass
@@ -212,24 +246,73 @@ class Client(ABC):
         pass
 
 
+class Session(Protocol):
+    """
+    Session to make HTTP requests with, e.g. aiohttp.ClientSession
+    """
+
+    def get(
+        self,
+        url: str,
+        *,
+        params: Optional[QueryParams] = None,
+        timeout: aiohttp.ClientTimeout = ...,
+    ) -> Awaitable[aiohttp.ClientResponse]: ...
+
+
+class Timeouts(BaseModel):
+    """
+    Timeouts for the openlibrary endpoints in seconds.
+    """
+
+    search: PositiveFloat = 10
+    works: PositiveFloat = 5
+    authors: PositiveFloat = 5
+    covers: PositiveFloat = 10
+
+
 class HTTPAPIClient(Client):
     """
     Openlibrary client based on their HTTP API
+
+    Every request is bounded by the endpoint timeout.
+    Failed requests are retried according to the retry policy.
+    API and covers are served by different hosts, so each session has its own circuit breaker.
     """
 
-    _api: aiohttp.ClientSession
-    _covers: aiohttp.ClientSession
+    _api: Session
+    _covers: Session
+    _api_breaker: CircuitBreaker
+    _covers_breaker: CircuitBreaker
+    _timeouts: Timeouts
+    _retry: RetryPolicy
 
     def __init__(
         self,
         *,
-        api_session: aiohttp.ClientSession,
-        covers_session: aiohttp.ClientSession,
+        api_session: Session,
+        covers_session: Session,
+        api_breaker: Optional[CircuitBreaker] = None,
+        covers_breaker: Optional[CircuitBreaker] = None,
+        timeouts: Timeouts = Timeouts(),
+        retry: RetryPolicy = RetryPolicy(),
     ) -> None:
         super().__init__()
 
         self._api = api_session
         self._covers = covers_session
+        self._api_breaker = api_breaker or CircuitBreaker()
+        self._covers_breaker = covers_breaker or CircuitBreaker()
+        self._timeouts = timeouts
+        self._retry = retry
+
+    @property
+    def breakers(self) -> dict[str, BreakerStats]:
+        """
+        Circuit breakers state by the session name.
+        """
+
+        return {"api": self._api_breaker.stats, "covers": self._covers_breaker.stats}
 
     @staticmethod
     def _build_search_books_filters_params(filter: SearchBooksFilter) -> QueryParams:
@@ -262,27 +345,36 @@ class HTTPAPIClient(Client):
     async def search_books(self, filter: SearchBooksFilter) -> Sequence[BookPreview]:
         params = self._build_search_books_filters_params(filter)
 
-        async with self._api.get("/search.json", params=params) as resp:
-            if resp.status != 200:
-                raise Exception(f"unexpected status {resp.status}")
-
-            class Response(BaseModel):
-                docs: Sequence[BookPreview]
+        resp = await self._get(
+            self._api,
+            self._api_breaker,
+            "/search.json",
+            timeout=self._timeouts.search,
+            params=params,
+        )
 
-            books = Response(**await resp.json()).docs
+        async with resp:
+            if resp.status != 200:
+                raise UpstreamError(f"unexpected status {resp.status}")
 
-            for book in books:
-                book.key = adjust_key(book.key)
+            body = await resp.read()
 
-            return books
+        return decode_search_books_response(body)
 
     async def get_book(self, key: str) -> Optional[Book]:
-        async with self._api.get(f"/works/{key}.json") as resp:
+        resp = await self._get(
+            self._api,
+            self._api_breaker,
+            f"/works/{key}.json",
+            timeout=self._timeouts.works,
+        )
+
+        async with resp:
             if resp.status == 404:
                 return None
 
             if resp.status != 200:
-                raise Exception(f"unexpected status {resp.status}")
+                raise UpstreamError(f"unexpected status {resp.status}")
 
             book = Book(**await resp.json())
 
@@ -292,27 +384,113 @@ class HTTPAPIClient(Client):
 
     async def get_cover(
         self, id: int, size: CoverSize = CoverSize.SMALL
-    ) -> Optional[bytes]:
-        async with self._covers.get(f"/b/id/{id}-{size.value}.jpg") as resp:
-            if resp.status == 404:
-                return None
+    ) -> Optional[AsyncIterator[bytes]]:
+        resp = await self._get(
+            self._covers,
+            self._covers_breaker,
+            f"/b/id/{id}-{size.value}.jpg",
+            timeout=self._timeouts.covers,
+            read=False,
+        )
 
-            if resp.status != 200:
-                raise Exception(f"unexpected status {resp.status}")
+        if resp.status == 404:
+            resp.release()
+            return None
+
+        if resp.status != 200:
+            resp.release()
+            raise UpstreamError(f"unexpected status {resp.status}")
 
-            # TODO: stream the response instead to avoid loading entire image into RAM
-            return await resp.content.read()
+        return _iter_chunks(resp)
 
     async def get_author(self, key: str) -> Optional[Author]:
-        async with self._api.get(f"/authors/{key}.json") as resp:
+        resp = await self._get(
+            self._api,
+            self._api_breaker,
+            f"/authors/{key}.json",
+            timeout=self._timeouts.authors,
+        )
+
+        async with resp:
             if resp.status == 404:
                 return None
 
             if resp.status != 200:
-                raise Exception(f"unexpected status {resp.status}")
+                raise UpstreamError(f"unexpected status {resp.status}")
 
             author = Author(**await resp.json())
 
             author.key = adjust_key(author.key)
 
             return author
+
+    async def _get(
+        self,
+        session: Session,
+        breaker: CircuitBreaker,
+        path: str,
+        *,
+        timeout: float,
+        params: Optional[QueryParams] = None,
+        read: bool = True,
+    ) -> aiohttp.ClientResponse:
+        """
+        Make GET request guarded by the circuit breaker and retry it on failures.
+        Response with any status that is not worth retrying is returned as is.
+
+        With `read` the body is read before the response is returned, so that
+        a stalled or truncated body is retried and counted like a failed request.
+        Otherwise the caller streams the body and releases the response.
+        """
+
+        attempt = 0
+
+        while True:
+            breaker.before_call()
+
+            retry_after: Optional[float] = None
+
+            try:
+                resp = await session.get(
+                    path,
+                    params=params,
+                    timeout=aiohttp.ClientTimeout(total=timeout),
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                breaker.record_failure()
+                error = UpstreamError(f"request failed: {e!r}")
+            except BaseException:
+                breaker.record_abandoned()
+                raise
+            else:
+                if resp.status not in _RETRYABLE_STATUSES:
+                    try:
+                        if read:
+                            # kept by the response for the later reads
+                            await resp.read()
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        resp.release()
+                        breaker.record_failure()
+                        error = UpstreamError(f"reading response failed: {e!r}")
+                    except BaseException:
+                        resp.release()
+                        breaker.record_abandoned()
+                        raise
+                    else:
+                        breaker.record_success()
+                        return resp
+                else:
+                    breaker.record_failure()
+                    error = UpstreamError(f"unexpected status {resp.status}")
+
+                    if resp.headers.get("Retry-After", "").isdigit():
+                        retry_after = float(resp.headers["Retry-After"])
+
+                    resp.release()
+
+            attempt += 1
+
+            if attempt >= self._retry.attempts:
+                raise error
+
+            await asyncio.sleep(self._retry.delay(attempt - 1, retry_after))
@@ -0,0 +1,115 @@
+import asyncio
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Hashable,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+from pydantic import BaseModel
+
+from .client import (
+    Author,
+    Book,
+    BookPreview,
+    Client,
+    CoverSize,
+    SearchBooksFilter,
+    normalize_query,
+)
+
+T = TypeVar("T")
+
+
+class CoalescingStats(BaseModel):
+    # Calls made to the client
+    calls: int = 0
+
+    # Calls that were passed to the wrapped client
+    upstream_calls: int = 0
+
+    # Calls that joined an already in-flight call of another caller
+    deduplicated: int = 0
+
+
+class CoalescingClient(Client):
+    """
+    Client wrapper that shares a single in-flight request
+    between concurrent identical calls (also known as single-flight).
+
+    Cover images are streamed and therefore passed through as is.
+    """
+
+    _client: Client
+    _in_flight: dict[Hashable, "asyncio.Task[Any]"]
+    _stats: CoalescingStats
+
+    def __init__(self, client: Client) -> None:
+        super().__init__()
+
+        self._client = client
+        self._in_flight = {}
+        self._stats = CoalescingStats()
+
+    @property
+    def stats(self) -> CoalescingStats:
+        """
+        Snapshot of the coalescing counters.
+        """
+
+        return self._stats.model_copy()
+
+    async def search_books(self, filter: SearchBooksFilter) -> Sequence[BookPreview]:
+        query = None if filter.query is None else normalize_query(filter.query)
+
+        key = ("search", query, filter.sort, filter.language, filter.page, filter.limit)
+
+        return await self._coalesce(key, lambda: self._client.search_books(filter))
+
+    async def get_book(self, key: str) -> Optional[Book]:
+        return await self._coalesce(("book", key), lambda: self._client.get_book(key))
+
+    async def get_cover(
+        self, id: int, size: CoverSize = CoverSize.SMALL
+    ) -> Optional[AsyncIterator[bytes]]:
+        return await self._client.get_cover(id, size)
+
+    async def get_author(self, key: str) -> Optional[Author]:
+        return await self._coalesce(
+            ("author", key), lambda: self._client.get_author(key)
+        )
+
+    async def _coalesce(
+        self, key: Hashable, call: Callable[[], Coroutine[Any, Any, T]]
+    ) -> T:
+        """
+        Await the in-flight call with the same key or start a new one.
+        """
+
+        self._stats.calls += 1
+
+        task: Optional[asyncio.Task[T]] = self._in_flight.get(key)
+
+        if task is None:
+            task = asyncio.create_task(call())
+            task.add_done_callback(lambda t: self._done(key, t))
+
+            self._in_flight[key] = task
+            self._stats.upstream_calls += 1
+        else:
+            self._stats.deduplicated += 1
+
+        # a cancelled caller must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+        # mark the exception as retrieved in case all callers were cancelled
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,426 @@
+"""
+Import openlibrary data dumps into the local catalog.
+
+Dumps are gzipped TSV files with the JSON document in the last column,
+see https://openlibrary.org/developers/dumps
+
+    python -m book_review.openlibrary.dump \\
+        --authors ol_dump_authors_latest.txt.gz \\
+        --works ol_dump_works_latest.txt.gz \\
+        --editions ol_dump_editions_latest.txt.gz
+"""
+
+import argparse
+import gzip
+import re
+import resource
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+import orjson
+from pydantic import BaseModel
+
+from .client import adjust_key
+from .local import SCHEMA
+
+# Rows derived from a dump document: (statement, parameters)
+Rows = Iterator[tuple[str, tuple[Any, ...]]]
+
+_INSERT_AUTHOR = """
+INSERT OR REPLACE INTO authors (key, name, bio, wikipedia) VALUES (?, ?, ?, ?)
+"""
+
+_INSERT_WORK = """
+INSERT OR REPLACE INTO works (
+    key, title, subtitle, description, covers, subjects, author_keys
+) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_WORK_LANGUAGE = """
+INSERT OR IGNORE INTO work_languages (work_key, language) VALUES (?, ?)
+"""
+
+_INSERT_WORK_YEAR = """
+INSERT INTO work_years (work_key, first_publish_year) VALUES (?, ?)
+ON CONFLICT (work_key) DO UPDATE
+SET first_publish_year = min(first_publish_year, excluded.first_publish_year)
+"""
+
+_CLEAR_INDEX = "DELETE FROM works_fts"
+
+_INDEX_WORKS = """
+INSERT INTO works_fts (rowid, title, authors, subjects)
+SELECT
+    w.rowid,
+    w.title,
+    (
+        SELECT group_concat(a.name, ' ')
+        FROM json_each(w.author_keys) AS j
+        JOIN authors AS a ON a.key = j.value
+    ),
+    (SELECT group_concat(j.value, ' ') FROM json_each(w.subjects) AS j)
+FROM works AS w
+WHERE w.rowid > ? AND w.rowid <= ?
+"""
+
+_OPTIMIZE_INDEX = "INSERT INTO works_fts (works_fts) VALUES ('optimize')"
+
+_YEAR = re.compile(r"\b(\d{4})\b")
+
+
+class MemoryBudgetExceededError(Exception):
+    pass
+
+
+class ImportReport(BaseModel):
+    name: str
+    rows: int
+    seconds: float
+
+    # Peak resident memory of the process in bytes
+    peak_memory: int
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.rows:,} rows in {self.seconds:.1f}s, "
+            f"{self.rows_per_second:,.0f} rows/s, "
+            f"peak memory {self.peak_memory / 2**20:,.0f} MiB"
+        )
+
+
+def peak_memory() -> int:
+    """
+    Peak resident memory of the process in bytes.
+    """
+
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # linux reports kilobytes, macOS reports bytes
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def read_dump(path: Path) -> Iterator[dict[str, Any]]:
+    """
+    Stream the documents of the gzipped dump one by one.
+    """
+
+    with gzip.open(path, "rb") as file:
+        for line in file:
+            columns = line.split(b"\t", 4)
+
+            if len(columns) != 5:
+                continue
+
+            yield orjson.loads(columns[4])
+
+
+def _text(value: Any) -> Optional[str]:
+    """
+    Texts are either plain strings or typed values like {"type": "/type/text", "value": "..."}
+    """
+
+    if isinstance(value, dict):
+        value = value.get("value")
+
+    return value if isinstance(value, str) else None
+
+
+def _json(value: Any) -> str:
+    return orjson.dumps(value).decode()
+
+
+def author_rows(doc: dict[str, Any]) -> Rows:
+    name = doc.get("name")
+
+    if not isinstance(name, str):
+        return
+
+    wikipedia = doc.get("wikipedia")
+
+    if not isinstance(wikipedia, str) or not wikipedia.startswith(
+        ("http://", "https://")
+    ):
+        wikipedia = None
+
+    yield (
+        _INSERT_AUTHOR,
+        (adjust_key(doc["key"]), name, _text(doc.get("bio")), wikipedia),
+    )
+
+
+def work_rows(doc: dict[str, Any]) -> Rows:
+    title = doc.get("title")
+
+    if not isinstance(title, str):
+        return
+
+    author_keys: list[str] = []
+
+    for author in doc.get("authors") or []:
+        # usually {"author": {"key": "/authors/OL1A"}}, but older ones are different
+        author = author.get("author") if isinstance(author, dict) else None
+        key = author.get("key") if isinstance(author, dict) else author
+
+        if isinstance(key, str):
+            author_keys.append(adjust_key(key))
+
+    covers = [c for c in doc.get("covers") or [] if isinstance(c, int) and c > 0]
+    subjects = [s for s in doc.get("subjects") or [] if isinstance(s, str)]
+
+    yield (
+        _INSERT_WORK,
+        (
+            adjust_key(doc["key"]),
+            title,
+            _text(doc.get("subtitle")),
+            _text(doc.get("description")),
+            _json(covers),
+            _json(subjects),
+            _json(author_keys),
+        ),
+    )
+
+
+def edition_rows(doc: dict[str, Any]) -> Rows:
+    works = [
+        adjust_key(w["key"])
+        for w in doc.get("works") or []
+        if isinstance(w, dict) and isinstance(w.get("key"), str)
+    ]
+
+    if not works:
+        return
+
+    languages = [
+        adjust_key(lang["key"])
+        for lang in doc.get("languages") or []
+        if isinstance(lang, dict) and isinstance(lang.get("key"), str)
+    ]
+
+    year: Optional[int] = None
+
+    publish_date = doc.get("publish_date")
+
+    if isinstance(publish_date, str):
+        match = _YEAR.search(publish_date)
+
+        if match is not None:
+            year = int(match.group(1))
+
+    for work in works:
+        for language in languages:
+            yield _INSERT_WORK_LANGUAGE, (work, language)
+
+        if year is not None and year > 0:
+            yield _INSERT_WORK_YEAR, (work, year)
+
+
+class Importer:
+    """
+    Imports dumps into the local catalog in large batched transactions.
+    """
+
+    _connection: sqlite3.Connection
+    _batch_size: int
+    _memory_budget: int
+    _report: Callable[[str], None]
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        *,
+        batch_size: int = 50_000,
+        memory_budget: int = 512 * 2**20,
+        report: Callable[[str], None] = print,
+    ) -> None:
+        """
+        Rows are inserted in transactions of `batch_size` rows.
+        Import fails if the peak memory exceeds `memory_budget` bytes.
+        """
+
+        self._connection = connection
+        self._batch_size = batch_size
+        self._memory_budget = memory_budget
+        self._report = report
+
+        # it is a one-shot bulk load, durability of every commit is not needed
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = OFF")
+
+        for statement in SCHEMA:
+            connection.execute(statement)
+
+    def import_dump(
+        self, name: str, path: Path, rows: Callable[[dict[str, Any]], Rows]
+    ) -> ImportReport:
+        """
+        Import all documents of the dump as rows produced by the given function.
+        """
+
+        started_at = time.perf_counter()
+        imported = 0
+
+        batch: dict[str, list[tuple[Any, ...]]] = {}
+        batched = 0
+
+        def report() -> ImportReport:
+            return ImportReport(
+                name=name,
+                rows=imported,
+                seconds=time.perf_counter() - started_at,
+                peak_memory=peak_memory(),
+            )
+
+        def flush() -> None:
+            nonlocal batched, imported
+
+            with self._transaction():
+                for statement, params in batch.items():
+                    self._connection.executemany(statement, params)
+
+            imported += batched
+            batch.clear()
+            batched = 0
+
+            progress = report()
+
+            self._report(str(progress))
+
+            if progress.peak_memory > self._memory_budget:
+                raise MemoryBudgetExceededError(
+                    f"peak memory {progress.peak_memory} exceeds "
+                    f"the budget {self._memory_budget}"
+                )
+
+        for doc in read_dump(path):
+            for statement, params in rows(doc):
+                batch.setdefault(statement, []).append(params)
+                batched += 1
+
+            if batched >= self._batch_size:
+                flush()
+
+        if batched:
+            flush()
+
+        return report()
+
+    def build_index(self) -> ImportReport:
+        """
+        Rebuild full-text search index of the works.
+        Author names are indexed too, so it should be run after all dumps are imported.
+        """
+
+        started_at = time.perf_counter()
+
+        def report() -> ImportReport:
+            (rows,) = self._connection.execute(
+                "SELECT count(*) FROM works_fts"
+            ).fetchone()
+
+            return ImportReport(
+                name="index",
+                rows=rows,
+                seconds=time.perf_counter() - started_at,
+                peak_memory=peak_memory(),
+            )
+
+        with self._transaction():
+            self._connection.execute(_CLEAR_INDEX)
+
+        (last,) = self._connection.execute("SELECT max(rowid) FROM works").fetchone()
+
+        # works are indexed in transactions of at most `batch_size` rows,
+        # so that the journal stays small and the readers are not blocked for long
+        for after in range(0, last or 0, self._batch_size):
+            with self._transaction():
+                self._connection.execute(
+                    _INDEX_WORKS, (after, after + self._batch_size)
+                )
+
+            self._report(str(report()))
+
+        with self._transaction():
+            self._connection.execute(_OPTIMIZE_INDEX)
+
+        return report()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """
+        Explicit transaction, so that it does not depend on the connection isolation level.
+        """
+
+        self._connection.execute("BEGIN")
+
+        try:
+            yield
+        except BaseException:
+            self._connection.rollback()
+            raise
+
+        self._connection.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Import openlibrary data dumps into the local catalog"
+    )
+
+    parser.add_argument("--db", type=Path, required=True, help="catalog database")
+    parser.add_argument("--authors", type=Path, help="gzipped authors dump")
+    parser.add_argument("--works", type=Path, help="gzipped works dump")
+    parser.add_argument("--editions", type=Path, help="gzipped editions dump")
+    parser.add_argument(
+        "--batch-size", type=int, default=50_000, help="rows per transaction"
+    )
+    parser.add_argument(
+        "--memory-budget", type=int, default=512, help="peak memory budget in MiB"
+    )
+
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.db, isolation_level=None)
+
+    importer = Importer(
+        connection,
+        batch_size=args.batch_size,
+        memory_budget=args.memory_budget * 2**20,
+    )
+
+    dumps = [
+        ("authors", args.authors, author_rows),
+        ("works", args.works, work_rows),
+        ("editions", args.editions, edition_rows),
+    ]
+
+    reports: list[ImportReport] = []
+
+    try:
+        for name, path, rows in dumps:
+            if path is not None:
+                reports.append(importer.import_dump(name, path, rows))
+
+        reports.append(importer.build_index())
+    except MemoryBudgetExceededError as e:
+        print(f"import failed: {e}", file=sys.stderr)
+        exit(1)
+    finally:
+        connection.close()
+
+    print()
+
+    for report in reports:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+from typing import Any, AsyncIterator, Optional, Sequence
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .client import (
+    Author,
+    Book,
+    BookAuthor,
+    BookPreview,
+    Client,
+    CoverSize,
+    SearchBooksFilter,
+    Sort,
+    normalize_query,
+)
+
+# Schema of the local catalog imported from the openlibrary data dumps.
+# JSON columns hold arrays.
+SCHEMA: Sequence[str] = (
+    """
+    CREATE TABLE IF NOT EXISTS works (
+        key TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        subtitle TEXT,
+        description TEXT,
+        covers TEXT NOT NULL DEFAULT '[]',
+        subjects TEXT NOT NULL DEFAULT '[]',
+        author_keys TEXT NOT NULL DEFAULT '[]'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS authors (
+        key TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        bio TEXT,
+        wikipedia TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS work_languages (
+        work_key TEXT NOT NULL,
+        language TEXT NOT NULL,
+        PRIMARY KEY (work_key, language)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS work_years (
+        work_key TEXT PRIMARY KEY,
+        first_publish_year INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS works_fts USING fts5(
+        title, authors, subjects, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+)
+
+# openlibrary returns 100 documents per page by default
+_DEFAULT_LIMIT = 100
+
+_ORDER_BY: dict[Optional[Sort], str] = {
+    None: "f.rank",
+    Sort.OLD: "y.first_publish_year IS NULL, y.first_publish_year",
+    Sort.NEW: "y.first_publish_year DESC",
+    Sort.TITLE_ASC: "w.title",
+    Sort.KEY_ASC: "w.key",
+    Sort.KEY_DESC: "w.key DESC",
+}
+
+_SEARCH_BOOKS = """
+SELECT
+    w.key,
+    w.title,
+    w.covers,
+    w.subjects,
+    y.first_publish_year,
+    (
+        SELECT json_group_array(json_array(a.key, a.name))
+        FROM json_each(w.author_keys) AS j
+        JOIN authors AS a ON a.key = j.value
+    ) AS authors,
+    (
+        SELECT json_group_array(l.language)
+        FROM work_languages AS l
+        WHERE l.work_key = w.key
+    ) AS languages
+FROM works_fts AS f
+JOIN works AS w ON w.rowid = f.rowid
+LEFT JOIN work_years AS y ON y.work_key = w.key
+WHERE works_fts MATCH :match {language}
+ORDER BY {order_by}
+LIMIT :limit OFFSET :offset
+"""
+
+_SEARCH_BOOKS_LANGUAGE = """
+AND EXISTS (
+    SELECT 1 FROM work_languages AS l
+    WHERE l.work_key = w.key AND l.language = :language
+)
+"""
+
+_GET_BOOK = """
+SELECT key, title, subtitle, description, covers, subjects, author_keys
+FROM works
+WHERE key = :key
+"""
+
+_GET_AUTHOR = """
+SELECT key, name, bio, wikipedia
+FROM authors
+WHERE key = :key
+"""
+
+
+def build_match_query(query: str) -> str:
+    """
+    Build FTS5 match expression that requires every token of the normalized query.
+    Tokens are quoted so that FTS5 operators in the query are treated as text.
+    """
+
+    tokens = normalize_query(query).split()
+
+    return " ".join('"{}"'.format(token.replace('"', '""')) for token in tokens)
+
+
+class LocalCatalogClient(Client):
+    """
+    Client that serves works and authors from the local catalog
+    imported from the openlibrary data dumps (see `book_review.openlibrary.dump`).
+
+    Calls that the catalog can not answer are passed to the fallback client if given.
+    Dumps do not contain images, so covers are always taken from the fallback.
+    """
+
+    _engine: AsyncEngine
+    _fallback: Optional[Client]
+
+    def __init__(self, engine: AsyncEngine, *, fallback: Optional[Client]) -> None:
+        super().__init__()
+
+        self._engine = engine
+        self._fallback = fallback
+
+    async def search_books(self, filter: SearchBooksFilter) -> Sequence[BookPreview]:
+        match = None if filter.query is None else build_match_query(filter.query)
+
+        if not match or filter.sort not in _ORDER_BY:
+            return await self._fallback_search_books(filter)
+
+        limit = filter.limit or _DEFAULT_LIMIT
+
+        params: dict[str, Any] = {
+            "match": match,
+            "limit": limit,
+            "offset": ((filter.page or 1) - 1) * limit,
+        }
+
+        language = ""
+
+        if filter.language is not None:
+            language = _SEARCH_BOOKS_LANGUAGE
+            params["language"] = filter.language
+
+        statement = text(
+            _SEARCH_BOOKS.format(language=language, order_by=_ORDER_BY[filter.sort])
+        )
+
+        async with self._engine.connect() as connection:
+            rows = (await connection.execute(statement, params)).all()
+
+        if not rows:
+            return await self._fallback_search_books(filter)
+
+        books: list[BookPreview] = []
+
+        for key, title, covers, subjects, year, authors, languages in rows:
+            covers = orjson.loads(covers)
+            authors = orjson.loads(authors)
+
+            books.append(
+                BookPreview(
+                    key=key,
+                    title=title,
+                    cover_i=covers[0] if covers else None,
+                    author_key=[key for key, _ in authors],
+                    author_name=[name for _, name in authors],
+                    language=orjson.loads(languages),
+                    publish_year=[] if year is None else [year],
+                    subject=orjson.loads(subjects),
+                )
+            )
+
+        return books
+
+    async def get_book(self, key: str) -> Optional[Book]:
+        async with self._engine.connect() as connection:
+            row = (await connection.execute(text(_GET_BOOK), {"key": key})).first()
+
+        if row is None:
+            if self._fallback is None:
+                return None
+
+            return await self._fallback.get_book(key)
+
+        key, title, subtitle, description, covers, subjects, author_keys = row
+
+        return Book(
+            key=key,
+            title=title,
+            subtitle=subtitle,
+            description=description,
+            covers=orjson.loads(covers),
+            subjects=orjson.loads(subjects),
+            authors=[
+                BookAuthor(author=BookAuthor._Author(key=f"/authors/{author_key}"))
+                for author_key in orjson.loads(author_keys)
+            ],
+        )
+
+    async def get_cover(
+        self, id: int, size: CoverSize = CoverSize.SMALL
+    ) -> Optional[AsyncIterator[bytes]]:
+        if self._fallback is None:
+            return None
+
+        return await self._fallback.get_cover(id, size)
+
+    async def get_author(self, key: str) -> Optional[Author]:
+        async with self._engine.connect() as connection:
+            row = (await connection.execute(text(_GET_AUTHOR), {"key": key})).first()
+
+        if row is None:
+            if self._fallback is None:
+                return None
+
+            return await self._fallback.get_author(key)
+
+        key, name, bio, wikipedia = row
+
+        return Author(key=key, name=name, bio=bio, wikipedia=wikipedia)
+
+    async def _fallback_search_books(
+        self, filter: SearchBooksFilter
+    ) -> Sequence[BookPreview]:
+        if self._fallback is None:
+            return []
+
+        return await self._fallback.search_books(filter)
@@ -0,0 +1,124 @@
+from types import TracebackType
+from typing import Any, Awaitable, Callable, Optional, Sized
+
+import aiohttp
+from pydantic import BaseModel, NonNegativeInt, PositiveFloat
+from yarl import URL
+
+
+class PoolSettings(BaseModel):
+    """
+    Connection pool settings of the session.
+    """
+
+    # Maximum connections in total, 0 means no limit
+    limit: NonNegativeInt = 100
+
+    # Maximum connections to the same host, 0 means no limit
+    limit_per_host: NonNegativeInt = 32
+
+    # Time in seconds an idle connection is kept open for reuse
+    keepalive_timeout: PositiveFloat = 30
+
+    # Time in seconds resolved addresses are cached, None caches them forever
+    dns_cache_ttl: Optional[NonNegativeInt] = 300
+
+
+class PoolStats(BaseModel):
+    limit: int
+    limit_per_host: int
+
+    # Connections used by requests at the moment
+    in_use: int
+
+    # Open connections waiting to be reused
+    idle: int
+
+    # Requests waiting for a connection because the pool is saturated
+    waiters: int
+
+
+class ManagedSession:
+    """
+    HTTP client session with a tuned connection pool.
+
+    The session is opened and closed with `async with`,
+    so that its lifetime is bound to the application lifespan.
+    """
+
+    _base_url: URL
+    _pool: PoolSettings
+    _json_serialize: Callable[[Any], str]
+    _session: Optional[aiohttp.ClientSession]
+
+    def __init__(
+        self,
+        base_url: URL,
+        pool: PoolSettings,
+        *,
+        json_serialize: Callable[[Any], str],
+    ) -> None:
+        self._base_url = base_url
+        self._pool = pool
+        self._json_serialize = json_serialize
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            raise RuntimeError(f"session for {self._base_url} is not opened")
+
+        return self._session
+
+    @property
+    def stats(self) -> PoolStats:
+        in_use = idle = waiters = 0
+
+        if self._session is not None:
+            # aiohttp does not expose pool usage publicly
+            connector = self._session.connector
+
+            in_use = len(getattr(connector, "_acquired", ()))
+            idle = sum(map(len, getattr(connector, "_conns", {}).values()))
+            waiters = sum(
+                len(w)
+                for w in getattr(connector, "_waiters", {}).values()
+                if isinstance(w, Sized)
+            )
+
+        return PoolStats(
+            limit=self._pool.limit,
+            limit_per_host=self._pool.limit_per_host,
+            in_use=in_use,
+            idle=idle,
+            waiters=waiters,
+        )
+
+    def get(self, url: str, **kwargs: Any) -> Awaitable[aiohttp.ClientResponse]:
+        return self.session.get(url, **kwargs)
+
+    async def __aenter__(self) -> "ManagedSession":
+        connector = aiohttp.TCPConnector(
+            limit=self._pool.limit,
+            limit_per_host=self._pool.limit_per_host,
+            keepalive_timeout=self._pool.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self._pool.dns_cache_ttl,
+        )
+
+        self._session = aiohttp.ClientSession(
+            self._base_url, connector=connector, json_serialize=self._json_serialize
+        )
+
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+            self._session = None
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
+
+from pydantic import BaseModel
+
+import book_review.dao.previews as previews_dao
+
+from .client import (
+    Author,
+    Book,
+    BookPreview,
+    Client,
+    CoverSize,
+    SearchBooksFilter,
+)
+from .local import build_match_query
+from .resilience import UpstreamError
+
+_logger = logging.getLogger(__name__)
+
+# openlibrary returns 100 documents per page by default
+_DEFAULT_LIMIT = 100
+
+
+class PreviewsIndexStats(BaseModel):
+    # Searches answered from the index alone
+    local: int = 0
+
+    # Searches passed to the wrapped client
+    upstream: int = 0
+
+    # Upstream searches merged with the hits from the index
+    merged: int = 0
+
+    # Searches answered from the index because the wrapped client failed
+    degraded: int = 0
+
+    # Previews written to the index
+    indexed: int = 0
+
+    # Fraction of the searches answered from the index alone
+    hit_ratio: float = 0
+
+    # Average time in seconds to search the index
+    local_latency: float = 0
+
+    # Average time in seconds to search with the wrapped client
+    upstream_latency: float = 0
+
+
+class PreviewsIndexClient(Client):
+    """
+    Client wrapper that indexes every book preview found by the wrapped client.
+
+    Searches are answered from the index when it has enough hits matching
+    the title or the authors, otherwise the hits are merged into the upstream results.
+    Only the first page of relevance-sorted searches can be answered from the index.
+    """
+
+    _client: Client
+    _previews: previews_dao.Repository
+    _min_hits: int
+    _answer_locally: bool
+    _indexing: set["asyncio.Task[None]"]
+    _stats: PreviewsIndexStats
+    _lookups: int
+    _local_seconds: float
+    _upstream_seconds: float
+
+    def __init__(
+        self,
+        client: Client,
+        previews: previews_dao.Repository,
+        *,
+        min_hits: int = 10,
+        answer_locally: bool = True,
+    ) -> None:
+        """
+        Search is answered from the index if it has at least `min_hits` strong hits
+        or as many as requested. Set `answer_locally` to False to only index previews.
+        """
+
+        super().__init__()
+
+        self._client = client
+        self._previews = previews
+        self._min_hits = min_hits
+        self._answer_locally = answer_locally
+        self._indexing = set()
+        self._stats = PreviewsIndexStats()
+        self._lookups = 0
+        self._local_seconds = 0
+        self._upstream_seconds = 0
+
+    @property
+    def stats(self) -> PreviewsIndexStats:
+        """
+        Snapshot of the index counters.
+        """
+
+        searches = self._stats.local + self._stats.upstream
+
+        return self._stats.model_copy(
+            update={
+                "hit_ratio": self._stats.local / searches if searches else 0,
+                "local_latency": (
+                    self._local_seconds / self._lookups if self._lookups else 0
+                ),
+                "upstream_latency": (
+                    self._upstream_seconds / self._stats.upstream
+                    if self._stats.upstream
+                    else 0
+                ),
+            }
+        )
+
+    async def search_books(self, filter: SearchBooksFilter) -> Sequence[BookPreview]:
+        limit = filter.limit or _DEFAULT_LIMIT
+        hits: Sequence[previews_dao.Hit] = []
+
+        if self._answer_locally and self._is_local(filter):
+            assert filter.query is not None
+
+            start = time.perf_counter()
+
+            hits = await self._previews.search_previews(
+                build_match_query(filter.query), language=filter.language, limit=limit
+            )
+
+            self._lookups += 1
+            self._local_seconds += time.perf_counter() - start
+
+            if sum(hit.strong for hit in hits) >= min(self._min_hits, limit):
+                self._stats.local += 1
+
+                return _decode(hits)
+
+        self._stats.upstream += 1
+
+        start = time.perf_counter()
+
+        try:
+            books = await self._client.search_books(filter)
+        except UpstreamError:
+            if not hits:
+                raise
+
+            self._stats.degraded += 1
+
+            return _decode(hits)
+        finally:
+            self._upstream_seconds += time.perf_counter() - start
+
+        self._index(books)
+
+        if not hits:
+            return books
+
+        self._stats.merged += 1
+
+        # upstream ranking knows popularity, so local hits only fill the gaps
+        keys = {book.key for book in books}
+        merged = list(books)
+        merged.extend(book for book in _decode(hits) if book.key not in keys)
+
+        return merged[:limit]
+
+    async def get_book(self, key: str) -> Optional[Book]:
+        return await self._client.get_book(key)
+
+    async def get_cover(
+        self, id: int, size: CoverSize = CoverSize.SMALL
+    ) -> Optional[AsyncIterator[bytes]]:
+        return await self._client.get_cover(id, size)
+
+    async def get_author(self, key: str) -> Optional[Author]:
+        return await self._client.get_author(key)
+
+    @staticmethod
+    def _is_local(filter: SearchBooksFilter) -> bool:
+        """
+        Whether the index can answer the search with the given filter.
+        """
+
+        return (
+            filter.query is not None
+            and bool(build_match_query(filter.query))
+            and filter.sort is None
+            and (filter.page or 1) == 1
+        )
+
+    def _index(self, books: Sequence[BookPreview]) -> None:
+        """
+        Index the previews in background so that the search is not delayed by writing.
+        """
+
+        if not books:
+            return
+
+        previews = [
+            previews_dao.Preview(
+                key=book.key,
+                title=book.title,
+                authors=book.author_name,
+                subjects=book.subject,
+                languages=book.language,
+                data=book.model_dump_json(),
+            )
+            for book in books
+        ]
+
+        task = asyncio.create_task(self._write(previews))
+
+        self._indexing.add(task)
+        task.add_done_callback(self._indexing.discard)
+
+    async def _write(self, previews: Sequence[previews_dao.Preview]) -> None:
+        try:
+            await self._previews.index_previews(previews, datetime.now())
+        except Exception:
+            _logger.warning("failed to index book previews", exc_info=True)
+        else:
+            self._stats.indexed += len(previews)
+
+
+def _decode(hits: Sequence[previews_dao.Hit]) -> list[BookPreview]:
+    return [BookPreview.model_validate_json(hit.data) for hit in hits]
@@ -0,0 +1,165 @@
+import random
+import time
+from enum import Enum
+from typing import Callable, Optional
+
+from pydantic import BaseModel, NonNegativeFloat, PositiveInt
+
+
+class UpstreamError(Exception):
+    """
+    Openlibrary could not be reached or responded with an unexpected status.
+    """
+
+    pass
+
+
+class CircuitOpenError(UpstreamError):
+    """
+    Request was not made because the circuit breaker is open.
+    """
+
+    pass
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class BreakerStats(BaseModel):
+    state: BreakerState
+
+    # How many times the breaker was opened
+    trips: int
+
+    # Failures in a row since the last success
+    consecutive_failures: int
+
+    # Calls rejected without making a request
+    rejected: int
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker that fails fast once the upstream keeps failing.
+
+    After `failure_threshold` consecutive failures the breaker opens and rejects all calls.
+    Once `reset_timeout` seconds passed it becomes half-open and lets a single probe call through.
+    Successful probe closes the breaker, failed one opens it again.
+    """
+
+    _failure_threshold: int
+    _reset_timeout: float
+    _clock: Callable[[], float]
+
+    _state: BreakerState
+    _opened_at: float
+    _probing: bool
+    _consecutive_failures: int
+    _trips: int
+    _rejected: int
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+
+        self._state = BreakerState.CLOSED
+        self._opened_at = 0
+        self._probing = False
+        self._consecutive_failures = 0
+        self._trips = 0
+        self._rejected = 0
+
+    @property
+    def stats(self) -> BreakerStats:
+        return BreakerStats(
+            state=self._state,
+            trips=self._trips,
+            consecutive_failures=self._consecutive_failures,
+            rejected=self._rejected,
+        )
+
+    def before_call(self) -> None:
+        """
+        Check whether the call is allowed.
+        Raises CircuitOpenError if it is not.
+        """
+
+        if self._state == BreakerState.OPEN:
+            if self._clock() - self._opened_at < self._reset_timeout:
+                self._reject()
+
+            self._state = BreakerState.HALF_OPEN
+
+        if self._state == BreakerState.HALF_OPEN:
+            if self._probing:
+                self._reject()
+
+            self._probing = True
+
+    def record_success(self) -> None:
+        self._state = BreakerState.CLOSED
+        self._probing = False
+        self._consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self._consecutive_failures += 1
+
+        if (
+            self._state == BreakerState.HALF_OPEN
+            or self._consecutive_failures >= self._failure_threshold
+        ):
+            self._open()
+
+    def record_abandoned(self) -> None:
+        """
+        The allowed call was abandoned (e.g. cancelled) without an outcome.
+        """
+
+        self._probing = False
+
+    def _open(self) -> None:
+        if self._state != BreakerState.OPEN:
+            self._trips += 1
+
+        self._state = BreakerState.OPEN
+        self._opened_at = self._clock()
+        self._probing = False
+
+    def _reject(self) -> None:
+        self._rejected += 1
+
+        raise CircuitOpenError("circuit breaker is open")
+
+
+class RetryPolicy(BaseModel):
+    """
+    Bounded retries with exponential backoff and full jitter.
+    """
+
+    # Attempts in total, including the first one
+    attempts: PositiveInt = 3
+
+    # Delays in seconds
+    base_delay: NonNegativeFloat = 0.2
+    max_delay: NonNegativeFloat = 2
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Delay before the next attempt, given the zero-based number of the failed one.
+        Delay requested by the upstream is respected unless it exceeds the max delay.
+        """
+
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))  # nosec: B311
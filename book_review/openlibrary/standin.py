@@ -0,0 +1,279 @@
+"""
+Stand-in for openlibrary that replays recorded fixtures, so that load tests
+and benchmarks measure our server and not the internet.
+
+Fixtures are plain response bodies stored in the fixtures directory:
+
+    search/<digest of the query parameters>.json
+    search/default.json (returned for searches that were not recorded)
+    works/<key>.json
+    authors/<key>.json
+    covers/<id>-<size>.jpg
+
+Responses missing there can be recorded from openlibrary with --record.
+Point both OPENLIBRARY_BASE_URL and OPENLIBRARY_COVERS_BASE_URL to the stand-in:
+
+    python -m book_review.openlibrary.standin --port 8081 \\
+        --fixtures benchmarks/fixtures/openlibrary --latency 0.05 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+from itertools import cycle, islice
+from pathlib import Path
+from typing import AsyncGenerator, Awaitable, Callable, Optional
+
+import aiohttp
+import orjson
+from aiohttp import web
+from multidict import MultiMapping
+from pydantic import BaseModel, Field, NonNegativeFloat, PositiveInt
+from yarl import URL
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+_UPSTREAM_API = URL("https://openlibrary.org")
+_UPSTREAM_COVERS = URL("https://covers.openlibrary.org")
+
+# parameters that do not change which documents are found
+_IGNORED_SEARCH_PARAMS = frozenset(["fields"])
+
+
+class Knobs(BaseModel):
+    """
+    Knobs to shape the stand-in responses like the real openlibrary ones.
+    """
+
+    # Time in seconds every response is delayed by
+    latency: NonNegativeFloat = 0
+
+    # Maximum random time in seconds added to the latency
+    jitter: NonNegativeFloat = 0
+
+    # Fraction of the requests answered with 503 Service Unavailable
+    error_rate: float = Field(default=0, ge=0, le=1)
+
+    # Number of documents every search returns, recorded ones are repeated or cut.
+    # Recorded number is returned if not set.
+    search_docs: Optional[PositiveInt] = None
+
+    # Size in bytes of the synthetic covers served for any id.
+    # Recorded covers are served if not set.
+    cover_size: Optional[PositiveInt] = None
+
+    # Seed of the latency and errors randomness to make runs reproducible
+    seed: Optional[int] = None
+
+
+def search_fixture_name(params: MultiMapping[str]) -> str:
+    """
+    Name of the fixture recorded for the search with the given query parameters.
+    """
+
+    items = sorted(
+        (key, value)
+        for key, value in params.items()
+        if key not in _IGNORED_SEARCH_PARAMS
+    )
+
+    digest = hashlib.sha1(orjson.dumps(items), usedforsecurity=False).hexdigest()
+
+    return f"{digest[:16]}.json"
+
+
+def resize_search_docs(body: bytes, docs: int) -> bytes:
+    """
+    Repeat or cut the documents of the search response to the given number.
+    """
+
+    response = orjson.loads(body)
+
+    found = response.get("docs", [])
+    response["docs"] = list(islice(cycle(found), docs)) if found else []
+    response["numFound"] = max(response.get("numFound", 0), len(response["docs"]))
+
+    return orjson.dumps(response)
+
+
+class _Recorder:
+    """
+    Fetch responses missing in the fixtures from openlibrary and store them.
+    """
+
+    _api: aiohttp.ClientSession
+    _covers: aiohttp.ClientSession
+
+    def __init__(self) -> None:
+        self._api = aiohttp.ClientSession(_UPSTREAM_API)
+        self._covers = aiohttp.ClientSession(_UPSTREAM_COVERS)
+
+    async def record(self, request: web.Request, fixture: Path) -> Optional[bytes]:
+        session = self._covers if request.path.startswith("/b/") else self._api
+
+        async with session.get(request.path, params=request.query) as resp:
+            if resp.status != 200:
+                return None
+
+            body = await resp.read()
+
+        fixture.parent.mkdir(parents=True, exist_ok=True)
+        fixture.write_bytes(body)
+
+        return body
+
+    async def close(self) -> None:
+        await self._api.close()
+        await self._covers.close()
+
+
+def create_app(
+    fixtures: Path, knobs: Knobs = Knobs(), *, record: bool = False
+) -> web.Application:
+    """
+    Create the stand-in application serving the given fixtures directory.
+    """
+
+    rng = random.Random(knobs.seed)
+    recorder: Optional[_Recorder] = None
+
+    async def replay(request: web.Request, fixture: Path) -> Optional[bytes]:
+        if fixture.is_file():
+            return await asyncio.to_thread(fixture.read_bytes)
+
+        if recorder is not None:
+            return await recorder.record(request, fixture)
+
+        return None
+
+    @web.middleware
+    async def shape(request: web.Request, handler: Handler) -> web.StreamResponse:
+        delay = knobs.latency + rng.uniform(0, knobs.jitter)
+
+        if delay:
+            await asyncio.sleep(delay)
+
+        if rng.random() < knobs.error_rate:
+            return web.Response(status=503, text="injected error")
+
+        return await handler(request)
+
+    async def search(request: web.Request) -> web.StreamResponse:
+        body = await replay(
+            request, fixtures / "search" / search_fixture_name(request.query)
+        )
+
+        if body is None:
+            default = fixtures / "search" / "default.json"
+            body = default.read_bytes() if default.is_file() else b'{"docs": []}'
+
+        if knobs.search_docs is not None:
+            body = resize_search_docs(body, knobs.search_docs)
+
+        return web.Response(body=body, content_type="application/json")
+
+    def document(kind: str) -> Handler:
+        async def handler(request: web.Request) -> web.StreamResponse:
+            key = request.match_info["key"]
+
+            body = await replay(request, fixtures / kind / f"{key}.json")
+
+            if body is None:
+                raise web.HTTPNotFound()
+
+            return web.Response(body=body, content_type="application/json")
+
+        return handler
+
+    async def cover(request: web.Request) -> web.StreamResponse:
+        if knobs.cover_size is not None:
+            return web.Response(body=bytes(knobs.cover_size), content_type="image/jpeg")
+
+        id, size = request.match_info["id"], request.match_info["size"]
+
+        body = await replay(request, fixtures / "covers" / f"{id}-{size}.jpg")
+
+        if body is None:
+            raise web.HTTPNotFound()
+
+        return web.Response(body=body, content_type="image/jpeg")
+
+    async def recording(_: web.Application) -> AsyncGenerator[None, None]:
+        nonlocal recorder
+
+        if record:
+            recorder = _Recorder()
+
+        yield
+
+        if recorder is not None:
+            await recorder.close()
+
+    app = web.Application(middlewares=[shape])
+
+    app.router.add_get("/search.json", search)
+    app.router.add_get(r"/works/{key:\w+}.json", document("works"))
+    app.router.add_get(r"/authors/{key:\w+}.json", document("authors"))
+    app.router.add_get(r"/b/id/{id:\d+}-{size:[SML]}.jpg", cover)
+
+    app.cleanup_ctx.append(recording)
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve recorded openlibrary responses locally"
+    )
+
+    parser.add_argument("--host", default="localhost", help="host to listen on")
+    parser.add_argument("--port", type=int, default=8081, help="port to listen on")
+    parser.add_argument(
+        "--fixtures",
+        type=Path,
+        default=Path("benchmarks/fixtures/openlibrary"),
+        help="recorded fixtures directory",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="record responses missing in the fixtures from openlibrary",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0, help="response delay in seconds"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0, help="maximum random extra delay in seconds"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0, help="fraction of 503 responses"
+    )
+    parser.add_argument(
+        "--search-docs", type=int, help="number of documents every search returns"
+    )
+    parser.add_argument(
+        "--cover-size", type=int, help="size of synthetic covers in bytes"
+    )
+    parser.add_argument("--seed", type=int, help="seed of the randomness")
+
+    args = parser.parse_args()
+
+    knobs = Knobs(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        search_docs=args.search_docs,
+        cover_size=args.cover_size,
+        seed=args.seed,
+    )
+
+    web.run_app(
+        create_app(args.fixtures, knobs, record=args.record),
+        host=args.host,
+        port=args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+import asyncio
+import heapq
+import logging
+import time
+from types import TracebackType
+from typing import Iterable, Optional, Sequence
+
+from pydantic import BaseModel
+
+import book_review.dao.leaderboard as dao
+import book_review.dao.previews as previews_dao
+import book_review.openlibrary.client as openlibrary
+from book_review.models.book import BookID, BookPreview
+from book_review.models.reviews import RankedBook
+
+_logger = logging.getLogger(__name__)
+
+# mean of the ratings from 1 to 10 taken while there are no reviews
+_DEFAULT_MEAN_RATING = 5.5
+
+# books rescored by a single query, so that the query stays within the SQLite limits
+_UPDATE_BATCH = 500
+
+
+class LeaderboardStats(BaseModel):
+    # Full refreshes of the leaderboards
+    refreshes: int = 0
+
+    # Books rescored after their reviews were written
+    updates: int = 0
+
+    # Refreshes and updates that failed
+    failures: int = 0
+
+    # Duration of the last full refresh in seconds
+    last_refresh_duration: float = 0
+
+
+def _rank(book: RankedBook) -> tuple[float, str]:
+    # the highest scores first, the ties in the order of the repository
+    return -book.score, book.book_id
+
+
+class _Board:
+    """
+    Candidates for the top `size` books of a leaderboard.
+
+    Every book scored above `floor` is a candidate, so the top of the candidates
+    is the top of all the books as long as there are at least `size` of them.
+    The floor is None when every book with reviews is a candidate.
+    """
+
+    size: int
+    floor: Optional[float]
+    candidates: dict[BookID, RankedBook]
+    _top: Optional[Sequence[RankedBook]]
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.floor = None
+        self.candidates = {}
+        self._top = []
+
+    @property
+    def short(self) -> bool:
+        """
+        Whether there are too few candidates to tell the top.
+        """
+
+        return self.floor is not None and len(self.candidates) < self.size
+
+    def reset(self, books: Sequence[RankedBook], capacity: int) -> None:
+        """
+        Take the books sorted by their scores, one more than `capacity` if there are.
+        """
+
+        self.candidates = {book.book_id: book for book in books[:capacity]}
+        self.floor = books[capacity].score if len(books) > capacity else None
+        self._top = None
+
+    def update(self, book_id: BookID, book: Optional[RankedBook]) -> None:
+        """
+        Rescore the book, None if it has no reviews counted any more.
+        """
+
+        if book is not None and (self.floor is None or book.score > self.floor):
+            self.candidates[book_id] = book
+        elif self.candidates.pop(book_id, None) is None:
+            return
+
+        self._top = None
+
+        if len(self.candidates) > 4 * self.size:
+            # the dropped candidates are not above the new floor
+            kept = heapq.nsmallest(
+                2 * self.size + 1, self.candidates.values(), key=_rank
+            )
+
+            self.reset(kept, 2 * self.size)
+
+    def top(self, limit: int) -> Sequence[RankedBook]:
+        if self._top is None:
+            self._top = heapq.nsmallest(self.size, self.candidates.values(), key=_rank)
+
+        return self._top[:limit]
+
+
+class Leaderboard:
+    """
+    Trending and top rated books kept in memory, so that they are served
+    without aggregating the reviews.
+
+    Trending books are the ones reviewed the most in the last `days` days.
+    Top rated books are ranked by the Bayesian average of their ratings,
+    which takes `prior_count` more ratings of the mean rating of all the reviews,
+    so that a book with a few high ratings is not ranked above well-rated ones.
+
+    Books are rescored in background once their reviews are written and touched.
+    Both leaderboards are refreshed from the review aggregates every `interval`
+    seconds, which slides the trending days and updates the mean rating.
+    """
+
+    _repo: dao.Repository
+    _previews: previews_dao.Repository
+    _size: int
+    _days: int
+    _prior_count: float
+    _interval: float
+    _trending: _Board
+    _top_rated: _Board
+    _mean_rating: float
+    _book_previews: dict[BookID, BookPreview]
+    _touched: set[BookID]
+    _changed: asyncio.Event
+    _next_refresh: float
+    _task: Optional["asyncio.Task[None]"]
+    _stats: LeaderboardStats
+
+    def __init__(
+        self,
+        repo: dao.Repository,
+        previews: previews_dao.Repository,
+        *,
+        size: int = 100,
+        days: int = 7,
+        prior_count: float = 10,
+        interval: float = 5 * 60,
+    ) -> None:
+        """
+        At most `size` books are kept on each leaderboard.
+        """
+
+        self._repo = repo
+        self._previews = previews
+        self._size = size
+        self._days = days
+        self._prior_count = prior_count
+        self._interval = interval
+        self._trending = _Board(size)
+        self._top_rated = _Board(size)
+        self._mean_rating = _DEFAULT_MEAN_RATING
+        self._book_previews = {}
+        self._touched = set()
+        self._changed = asyncio.Event()
+        self._next_refresh = 0
+        self._task = None
+        self._stats = LeaderboardStats()
+
+    @property
+    def stats(self) -> LeaderboardStats:
+        """
+        Snapshot of the leaderboard counters.
+        """
+
+        return self._stats.model_copy()
+
+    async def __aenter__(self) -> "Leaderboard":
+        self._task = asyncio.create_task(self._work())
+
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+
+        await asyncio.gather(self._task, return_exceptions=True)
+
+        self._task = None
+
+    def trending(self, limit: int) -> Sequence[RankedBook]:
+        """
+        Books reviewed the most lately, scored by the number of their reviews.
+        """
+
+        return self._trending.top(limit)
+
+    def top_rated(self, limit: int) -> Sequence[RankedBook]:
+        """
+        Books with the highest Bayesian average of their ratings.
+        """
+
+        return self._top_rated.top(limit)
+
+    def touch(self, book_ids: Iterable[BookID]) -> None:
+        """
+        Rescore the books in background, once their reviews are written.
+        """
+
+        self._touched.update(book_ids)
+        self._changed.set()
+
+    async def refresh(self) -> None:
+        """
+        Rank all the books again.
+        """
+
+        started_at = time.perf_counter()
+
+        # the books touched so far are counted by the queries below
+        self._touched.clear()
+
+        capacity = 2 * self._size
+
+        mean_rating = await self._repo.find_mean_rating() or _DEFAULT_MEAN_RATING
+
+        trending = await self._repo.find_trending(days=self._days, limit=capacity + 1)
+        top_rated = await self._repo.find_top_rated(
+            prior_mean=mean_rating, prior_count=self._prior_count, limit=capacity + 1
+        )
+
+        # previews of the books that left the leaderboards are not kept
+        self._book_previews = await self._find_previews(
+            {tally.book_id for tally in [*trending, *top_rated]}
+        )
+
+        # kept until the next refresh, so that the rescored books are comparable
+        self._mean_rating = mean_rating
+
+        self._trending.reset(list(map(self._trending_book, trending)), capacity)
+        self._top_rated.reset(list(map(self._top_rated_book, top_rated)), capacity)
+
+        self._stats.refreshes += 1
+        self._stats.last_refresh_duration = time.perf_counter() - started_at
+
+    async def update(self) -> None:
+        """
+        Rescore the touched books.
+        """
+
+        touched = list(self._touched)
+        self._touched.clear()
+
+        for start in range(0, len(touched), _UPDATE_BATCH):
+            book_ids = touched[start : start + _UPDATE_BATCH]
+
+            totals = await self._repo.find_totals(book_ids)
+            recent = await self._repo.find_recent(book_ids, days=self._days)
+
+            self._book_previews.update(
+                await self._find_previews(
+                    {id for id in book_ids if id not in self._book_previews}
+                )
+            )
+
+            for id in book_ids:
+                self._trending.update(
+                    id, self._trending_book(recent[id]) if id in recent else None
+                )
+                self._top_rated.update(
+                    id, self._top_rated_book(totals[id]) if id in totals else None
+                )
+
+            self._stats.updates += len(book_ids)
+
+    async def _work(self) -> None:
+        while True:
+            self._changed.clear()
+
+            refreshing = time.monotonic() >= self._next_refresh
+
+            try:
+                if refreshing:
+                    self._next_refresh = time.monotonic() + self._interval
+
+                    await self.refresh()
+                elif self._touched:
+                    await self.update()
+            except Exception:
+                self._stats.failures += 1
+                _logger.warning("failed to rank the leaderboards", exc_info=True)
+
+            if not refreshing and (self._trending.short or self._top_rated.short):
+                # candidates fell behind the floor, so the top is not known any more
+                self._next_refresh = time.monotonic()
+
+                continue
+
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait(),
+                    timeout=max(self._next_refresh - time.monotonic(), 0),
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _find_previews(self, book_ids: set[BookID]) -> dict[BookID, BookPreview]:
+        """
+        Previews of the books found by the searches before.
+        """
+
+        found = await self._previews.find_previews(list(book_ids))
+
+        return {
+            id: openlibrary.BookPreview.model_validate_json(data).map()
+            for id, data in found.items()
+        }
+
+    def _trending_book(self, tally: dao.Tally) -> RankedBook:
+        return self._ranked_book(tally, tally.count)
+
+    def _top_rated_book(self, tally: dao.Tally) -> RankedBook:
+        # the same as the one the repository ranks by
+        score = (self._mean_rating * self._prior_count + tally.sum) / (
+            self._prior_count + tally.count
+        )
+
+        return self._ranked_book(tally, score)
+
+    def _ranked_book(self, tally: dao.Tally, score: float) -> RankedBook:
+        return RankedBook(
+            book_id=tally.book_id,
+            score=score,
+            count=tally.count,
+            sum=tally.sum,
+            preview=self._book_previews.get(tally.book_id),
+        )
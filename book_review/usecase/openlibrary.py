@@ -1,9 +1,220 @@
-from typing import Optional, Sequence
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import AsyncIterator, BinaryIO, Iterator, Optional, Sequence
 
+from pydantic import BaseModel
+
+import book_review.dao.covers as covers_dao
+import book_review.dao.previews as previews_dao
+import book_review.dao.suggestions as suggestions_dao
 import book_review.models.book as models
 import book_review.openlibrary.client as openlibrary
 
 CoverSize = openlibrary.CoverSize
+Sort = openlibrary.Sort
+UpstreamError = openlibrary.UpstreamError
+normalize_query = openlibrary.normalize_query
+
+# Cover image that is either stored locally and opened or streamed as byte chunks
+Cover = BinaryIO | AsyncIterator[bytes]
+
+_logger = logging.getLogger(__name__)
+
+# number of the indexed previews loaded into the suggestions at once
+_LOAD_SUGGESTIONS_BATCH = 1000
+
+
+class PrefetchStats(BaseModel):
+    # Books queued for prefetching
+    scheduled: int = 0
+
+    # Books not queued because the queue was full
+    dropped: int = 0
+
+    # Books and authors fetched in background
+    prefetched: int = 0
+
+    # Prefetches that failed
+    failed: int = 0
+
+    # Book and author requests for the prefetched ones
+    hits: int = 0
+
+    # Book and author requests for the ones that were not prefetched
+    misses: int = 0
+
+    # Fraction of the book and author requests that were prefetched
+    hit_rate: float = 0
+
+
+class Prefetcher:
+    """
+    Fetch details of the top search results in background,
+    so that they are already cached when the user opens one of them.
+
+    Prefetching waits while there are interactive requests in flight,
+    so it never competes with them for the upstream connections.
+    """
+
+    _client: openlibrary.Client
+    _top: int
+    _concurrency: int
+    _queue: "asyncio.Queue[models.BookID]"
+    _workers: list["asyncio.Task[None]"]
+    _idle: asyncio.Event
+    _interactive: int
+    _prefetched: OrderedDict[str, None]
+    _remember: int
+    _stats: PrefetchStats
+
+    def __init__(
+        self,
+        client: openlibrary.Client,
+        *,
+        top: int = 3,
+        concurrency: int = 2,
+        queue_size: int = 100,
+        remember: int = 10_000,
+    ) -> None:
+        """
+        Details of `top` results of every search are prefetched by `concurrency` workers.
+        Books beyond `queue_size` waiting ones are dropped.
+        Last `remember` prefetched books and authors are tracked to compute hits.
+        """
+
+        self._client = client
+        self._top = top
+        self._concurrency = concurrency
+        self._queue = asyncio.Queue(queue_size)
+        self._workers = []
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._interactive = 0
+        self._prefetched = OrderedDict()
+        self._remember = remember
+        self._stats = PrefetchStats()
+
+    @property
+    def stats(self) -> PrefetchStats:
+        """
+        Snapshot of the prefetch counters.
+        """
+
+        requests = self._stats.hits + self._stats.misses
+
+        return self._stats.model_copy(
+            update={"hit_rate": self._stats.hits / requests if requests else 0}
+        )
+
+    def schedule(self, books: Sequence[openlibrary.BookPreview]) -> None:
+        """
+        Queue the top of the found books for prefetching.
+        """
+
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._work()) for _ in range(self._concurrency)
+            ]
+
+        for book in books[: self._top]:
+            if book.key in self._prefetched:
+                continue
+
+            try:
+                self._queue.put_nowait(book.key)
+            except asyncio.QueueFull:
+                self._stats.dropped += 1
+                continue
+
+            self._remember_prefetched(book.key)
+            self._stats.scheduled += 1
+
+    def record_request(self, id: str) -> None:
+        """
+        Record interactive request for the book or author details.
+        """
+
+        if id in self._prefetched:
+            # count only the first request, later ones are served by caches anyway
+            del self._prefetched[id]
+            self._stats.hits += 1
+        else:
+            self._stats.misses += 1
+
+    @contextmanager
+    def interactive(self) -> Iterator[None]:
+        """
+        Pause prefetching while the interactive request is in flight.
+        """
+
+        self._interactive += 1
+        self._idle.clear()
+
+        try:
+            yield
+        finally:
+            self._interactive -= 1
+
+            if not self._interactive:
+                self._idle.set()
+
+    async def join(self) -> None:
+        """
+        Wait until all the queued books are prefetched.
+        """
+
+        await self._queue.join()
+
+    async def close(self) -> None:
+        """
+        Cancel the workers and wait until they stop, the queued books are dropped.
+        """
+
+        for worker in self._workers:
+            worker.cancel()
+
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        self._workers = []
+
+    def _remember_prefetched(self, id: str) -> None:
+        self._prefetched[id] = None
+
+        if len(self._prefetched) > self._remember:
+            self._prefetched.popitem(last=False)
+
+    async def _work(self) -> None:
+        while True:
+            id = await self._queue.get()
+
+            try:
+                await self._idle.wait()
+                await self._prefetch(id)
+            except Exception:
+                self._stats.failed += 1
+                _logger.warning("failed to prefetch %s", id, exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _prefetch(self, id: models.BookID) -> None:
+        book = await self._client.get_book(id)
+        self._stats.prefetched += 1
+
+        if book is None or not book.authors:
+            return
+
+        author_id = openlibrary.adjust_key(book.authors[0].author.key)
+
+        if author_id in self._prefetched:
+            return
+
+        self._remember_prefetched(author_id)
+
+        await self._idle.wait()
+        await self._client.get_author(author_id)
+        self._stats.prefetched += 1
 
 
 class UseCase:
@@ -12,22 +223,90 @@ class UseCase:
     """
 
     _client: openlibrary.Client
+    _covers: Optional[covers_dao.Repository]
+    _prefetcher: Optional[Prefetcher]
+    _suggestions: Optional[suggestions_dao.Repository]
 
-    def __init__(self, client: openlibrary.Client) -> None:
+    def __init__(
+        self,
+        client: openlibrary.Client,
+        *,
+        covers: Optional[covers_dao.Repository] = None,
+        prefetcher: Optional[Prefetcher] = None,
+        suggestions: Optional[suggestions_dao.Repository] = None,
+    ) -> None:
         self._client = client
+        self._covers = covers
+        self._prefetcher = prefetcher
+        self._suggestions = suggestions
 
-    async def search_books_previews(self, query: str) -> Sequence[models.BookPreview]:
+    async def search_books_previews(
+        self,
+        query: str,
+        *,
+        sort: Optional[Sort] = None,
+        language: Optional[str] = None,
+        page: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Sequence[models.BookPreview]:
         """
         Search books previews for the given title query.
         Book preview does not hold all available information for the sake of performance.
         Use `get_book` to get more information for a specific book.
         """
 
-        books = await self._client.search_books(
-            openlibrary.SearchBooksFilter(query=query)
+        with self._interactive():
+            books = await self._client.search_books(
+                openlibrary.SearchBooksFilter(
+                    query=query, sort=sort, language=language, page=page, limit=limit
+                )
+            )
+
+        if self._prefetcher is not None:
+            self._prefetcher.schedule(books)
+
+        if self._suggestions is not None:
+            await self._suggestions.add_suggestions(_suggestions(books))
+
+        return [book.map() for book in books]
+
+    async def suggest(
+        self, prefix: str, *, limit: int = 10
+    ) -> Sequence[models.Suggestion]:
+        """
+        Suggest books and authors whose titles and names start with the given prefix.
+        Only the books found before are suggested.
+        """
+
+        if self._suggestions is None:
+            return []
+
+        return await self._suggestions.find_suggestions(
+            openlibrary.normalize_query(prefix), limit
         )
 
-        return list(map(lambda b: b.map(), books))
+    async def load_suggestions(self, previews: previews_dao.Repository) -> int:
+        """
+        Load suggestions for the previews indexed before, the reviewed books first.
+        Returns the number of loaded suggestions.
+        """
+
+        if self._suggestions is None:
+            return 0
+
+        loaded = 0
+        books: list[openlibrary.BookPreview] = []
+
+        async for data in previews.stream_previews():
+            books.append(openlibrary.BookPreview.model_validate_json(data))
+
+            if len(books) >= _LOAD_SUGGESTIONS_BATCH:
+                loaded += await self._suggestions.add_suggestions(_suggestions(books))
+                books = []
+
+        loaded += await self._suggestions.add_suggestions(_suggestions(books))
+
+        return loaded
 
     async def get_book(self, id: models.BookID) -> Optional[models.Book]:
         """
@@ -35,7 +314,11 @@ class UseCase:
         If the book with such id was not found None is returned.
         """
 
-        book = await self._client.get_book(id)
+        if self._prefetcher is not None:
+            self._prefetcher.record_request(id)
+
+        with self._interactive():
+            book = await self._client.get_book(id)
 
         if book is None:
             return None
@@ -43,20 +326,84 @@ class UseCase:
         return book.map()
 
     async def get_cover(
-        self, id: int, size: CoverSize = CoverSize.SMALL
-    ) -> Optional[bytes]:
+        self, id: models.CoverID, size: CoverSize = CoverSize.SMALL
+    ) -> Optional[Cover]:
         """
-        Get book or author cover image by its id as bytes.
+        Get book or author cover image by its id.
+        Stored covers are returned as the file opened for reading,
+        so that it is read completely even if the cover is evicted meanwhile.
+        Others are streamed from the client and stored along the way.
         If the image with such id was not found None is returned.
         """
 
-        # TODO: stream the image instead
-        return await self._client.get_cover(id, size)
+        if self._covers is not None:
+            path = await self._covers.get_cover(id, size.value)
+
+            if path is not None:
+                try:
+                    file: BinaryIO = await asyncio.to_thread(path.open, "rb")
+
+                    return file
+                except FileNotFoundError:
+                    # evicted since it was looked up, so it is fetched again
+                    pass
+
+        chunks = await self._client.get_cover(id, size)
+
+        if chunks is None or self._covers is None:
+            return chunks
+
+        return self._covers.store_cover(id, size.value, chunks)
 
     async def get_author(self, id: models.AuthorID) -> Optional[models.Author]:
-        author = await self._client.get_author(id)
+        if self._prefetcher is not None:
+            self._prefetcher.record_request(id)
+
+        with self._interactive():
+            author = await self._client.get_author(id)
 
         if author is None:
             return None
 
         return author.map()
+
+    @contextmanager
+    def _interactive(self) -> Iterator[None]:
+        if self._prefetcher is None:
+            yield
+            return
+
+        with self._prefetcher.interactive():
+            yield
+
+
+def _suggestions(
+    books: Sequence[openlibrary.BookPreview],
+) -> list[tuple[str, models.Suggestion]]:
+    """
+    Suggestions for the titles and the author names of the books with their terms.
+    """
+
+    suggestions: list[tuple[str, models.Suggestion]] = []
+
+    for book in books:
+        suggestions.append(
+            (
+                openlibrary.normalize_query(book.title),
+                models.Suggestion(
+                    kind=models.SuggestionKind.BOOK, id=book.key, text=book.title
+                ),
+            )
+        )
+
+        for key, name in zip(book.author_key, book.author_name):
+            suggestions.append(
+                (
+                    openlibrary.normalize_query(name),
+                    models.Suggestion(
+                        kind=models.SuggestionKind.AUTHOR, id=key, text=name
+                    ),
+                )
+            )
+
+    return suggestions
@@ -1,9 +1,17 @@
-from typing import Optional, Sequence
+import time
+from typing import AsyncIterable, AsyncIterator, Mapping, Optional, Sequence
 
+import book_review.usecase.tags as tags
 from book_review.dao.reviews import Repository
 from book_review.models.book import BookID
-from book_review.models.reviews import Review
+from book_review.models.reviews import (
+    RatingStats,
+    Review,
+    ReviewCursor,
+    TransferReport,
+)
 from book_review.models.user import UserID
+from book_review.usecase.leaderboard import Leaderboard
 
 
 class UseCase:
@@ -12,9 +20,19 @@ class UseCase:
     """
 
     _repo: Repository
+    _invalidator: Optional[tags.Invalidator]
+    _leaderboard: Optional[Leaderboard]
 
-    def __init__(self, repo: Repository) -> None:
+    def __init__(
+        self,
+        repo: Repository,
+        *,
+        invalidator: Optional[tags.Invalidator] = None,
+        leaderboard: Optional[Leaderboard] = None,
+    ) -> None:
         self._repo = repo
+        self._invalidator = invalidator
+        self._leaderboard = leaderboard
 
     async def create_or_update_review(
         self,
@@ -31,16 +49,47 @@ class UseCase:
             user_id=user_id, book_id=book_id, rating=rating, commentary=commentary
         )
 
+        await self._invalidate(user_id, book_id)
+
     async def find_reviews(
-        self, book_id: Optional[BookID] = None, user_id: Optional[UserID] = None
+        self,
+        book_id: Optional[BookID] = None,
+        user_id: Optional[UserID] = None,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[ReviewCursor] = None,
     ) -> Sequence[Review]:
         """
         Find reviews by optionally limiting the results by specific book and/or user.
+        Reviews go from the newest, the next page starts after the cursor of the last one.
+        """
+
+        return await self._repo.find_reviews(
+            book_id=book_id, user_id=user_id, limit=limit, after=after
+        )
+
+    async def get_rating(self, book_id: BookID) -> RatingStats:
+        """
+        Aggregated ratings of the book.
         """
 
-        reviews = await self._repo.find_reviews(book_id=book_id, user_id=user_id)
+        ratings = await self.find_ratings([book_id])
 
-        return list(map(lambda r: r.map(), reviews))
+        return ratings[book_id]
+
+    async def find_ratings(
+        self, book_ids: Sequence[BookID]
+    ) -> Mapping[BookID, RatingStats]:
+        """
+        Aggregated ratings of the books, empty ones for the books without reviews.
+        """
+
+        stats = await self._repo.find_rating_stats(list(set(book_ids)))
+
+        return {
+            id: stats[id].map() if id in stats else RatingStats(book_id=id)
+            for id in book_ids
+        }
 
     async def delete_review(self, user_id: UserID, book_id: BookID) -> None:
         """
@@ -49,3 +98,70 @@ class UseCase:
         """
 
         await self._repo.delete_review(user_id=user_id, book_id=book_id)
+
+        await self._invalidate(user_id, book_id)
+
+    async def import_reviews(
+        self, reviews: AsyncIterable[Review], *, batch_size: int = 10_000
+    ) -> TransferReport:
+        """
+        Create or overwrite the reviews in transactions of `batch_size` reviews.
+        Importing the same reviews again is harmless, so a failed import can be rerun.
+        """
+
+        started_at = time.perf_counter()
+        imported = 0
+
+        batch: list[Review] = []
+
+        async def flush() -> None:
+            nonlocal imported
+
+            await self._repo.import_reviews(batch)
+
+            if self._leaderboard is not None:
+                self._leaderboard.touch(r.book_id for r in batch)
+
+            if self._invalidator is not None:
+                await self._invalidator.invalidate(
+                    [
+                        *{tags.book(r.book_id) for r in batch},
+                        *{tags.user(r.user_id) for r in batch},
+                        tags.REVIEWS,
+                    ]
+                )
+
+            imported += len(batch)
+            batch.clear()
+
+        async for review in reviews:
+            batch.append(review)
+
+            if len(batch) >= batch_size:
+                await flush()
+
+        if batch:
+            await flush()
+
+        return TransferReport(rows=imported, seconds=time.perf_counter() - started_at)
+
+    def export_reviews(self, *, batch_size: int = 1000) -> AsyncIterator[Review]:
+        """
+        Stream all the reviews, holding at most `batch_size` of them in memory.
+        """
+
+        return self._repo.stream_reviews(batch_size=batch_size)
+
+    async def _invalidate(self, user_id: UserID, book_id: BookID) -> None:
+        """
+        Invalidate cached reviews of the book and the user and rescore the book.
+        Must be called after the write, so that no entry is cached with stale data.
+        """
+
+        if self._leaderboard is not None:
+            self._leaderboard.touch([book_id])
+
+        if self._invalidator is not None:
+            await self._invalidator.invalidate(
+                [tags.book(book_id), tags.user(user_id), tags.REVIEWS]
+            )
@@ -0,0 +1,51 @@
+"""
+Tags of the cached data changed by the use cases.
+Cached entries carry the tags of the data they were built from,
+so that the writes invalidate exactly the affected entries.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Optional, Sequence
+
+from book_review.models.book import BookID
+from book_review.models.user import UserID
+
+# all the reviews, e.g. listed without filters
+REVIEWS = "reviews"
+
+# all the users, e.g. searched by login
+USERS = "users"
+
+
+def book(id: BookID) -> str:
+    return f"book:{id}"
+
+
+def user(id: UserID) -> str:
+    return f"user:{id}"
+
+
+def reviews(book_id: Optional[BookID], user_id: Optional[UserID]) -> Sequence[str]:
+    """
+    Tags of the reviews found by the optional book and user.
+    """
+
+    tags: list[str] = []
+
+    if book_id is not None:
+        tags.append(book(book_id))
+
+    if user_id is not None:
+        tags.append(user(user_id))
+
+    return tags or [REVIEWS]
+
+
+class Invalidator(ABC):
+    """
+    Invalidates the cached entries carrying the tags.
+    """
+
+    @abstractmethod
+    async def invalidate(self, tags: Sequence[str]) -> None:
+        pass
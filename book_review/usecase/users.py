@@ -3,6 +3,7 @@ from typing import Optional, Sequence
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 
+import book_review.usecase.tags as tags
 from book_review.dao.users import Repository
 from book_review.models.user import User, UserID
 
@@ -14,10 +15,14 @@ class UseCase:
 
     _hasher: PasswordHasher
     _repo: Repository
+    _invalidator: Optional[tags.Invalidator]
 
-    def __init__(self, repo: Repository) -> None:
+    def __init__(
+        self, repo: Repository, *, invalidator: Optional[tags.Invalidator] = None
+    ) -> None:
         self._hasher = PasswordHasher()
         self._repo = repo
+        self._invalidator = invalidator
 
     async def find_users(self, *, login: Optional[str] = None) -> Sequence[User]:
         """
@@ -25,9 +30,7 @@ class UseCase:
         If the login is not provided it will return all users.
         """
 
-        users = await self._repo.find_users(login_like=login)
-
-        return list(map(lambda u: u.map(), users))
+        return await self._repo.find_users(login_like=login)
 
     async def find_user_by_id(self, id: UserID) -> Optional[User]:
         """
@@ -61,7 +64,12 @@ class UseCase:
         Note, that exception will be thrown if the user exists already.
         """
 
-        return await self._repo.create_user(login, self._hash_password(password))
+        id = await self._repo.create_user(login, self._hash_password(password))
+
+        if self._invalidator is not None:
+            await self._invalidator.invalidate([tags.USERS])
+
+        return id
 
     async def authenticate_user(self, login: str, password: str) -> Optional[User]:
         """
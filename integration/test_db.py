@@ -1,15 +1,25 @@
+import asyncio
 from collections.abc import AsyncGenerator
 from dataclasses import dataclass
-from typing import Optional
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
 
 import pytest
 import pytest_asyncio
 from pytest_subtests import SubTests
+from sqlalchemy import delete, event, insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+import book_review.dao.catalog as dao_catalog
+import book_review.dao.leaderboard as dao_leaderboard
+import book_review.dao.previews as dao_previews
 import book_review.dao.reviews as dao_reviews
 import book_review.dao.users as dao_users
-from book_review.db import create_all
+from book_review.db import TableCatalogWorks, create_all
+from book_review.db.storage import Maintenance, StorageProfile, apply_profile
+from book_review.models.reviews import Review, ReviewCursor
 
 engine = create_async_engine("sqlite+aiosqlite://")
 
@@ -39,6 +49,27 @@ async def reviews_repo(
     yield dao_reviews.ORMRepository(session_maker)
 
 
+@pytest_asyncio.fixture
+async def catalog_repo(
+    session_maker: async_sessionmaker[AsyncSession],
+) -> AsyncGenerator[dao_catalog.Repository, None]:
+    yield dao_catalog.ORMRepository(session_maker)
+
+
+@pytest_asyncio.fixture
+async def leaderboard_repo(
+    session_maker: async_sessionmaker[AsyncSession],
+) -> AsyncGenerator[dao_leaderboard.Repository, None]:
+    yield dao_leaderboard.ORMRepository(session_maker)
+
+
+@pytest_asyncio.fixture
+async def previews_repo(
+    session_maker: async_sessionmaker[AsyncSession],
+) -> AsyncGenerator[dao_previews.Repository, None]:
+    yield dao_previews.ORMRepository(session_maker)
+
+
 @pytest.mark.asyncio
 async def test_users_create_and_find(
     users_repo: dao_users.Repository, subtests: SubTests
@@ -123,7 +154,7 @@ async def test_reviews_create_and_find(
         print(reviews)
 
         expected_pairs = map(lambda p: (p.user_id, p.book_id), mock_reviews)
-        actual_pairs = map(lambda r: (r.user_id, r.book_id), reviews)
+        actual_pairs = list(map(lambda r: (r.user_id, r.book_id), reviews))
 
         assert all(p in actual_pairs for p in expected_pairs)
 
@@ -136,7 +167,7 @@ async def test_reviews_create_and_find(
                 filter(lambda p: p.user_id == user_id, mock_reviews),
             )
 
-            actual_pairs = map(lambda r: (r.user_id, r.book_id), reviews)
+            actual_pairs = list(map(lambda r: (r.user_id, r.book_id), reviews))
 
             assert all(p in actual_pairs for p in expected_pairs)
 
@@ -149,7 +180,7 @@ async def test_reviews_create_and_find(
                 filter(lambda p: p.book_id == book_id, mock_reviews),
             )
 
-            actual_pairs = map(lambda r: (r.user_id, r.book_id), reviews)
+            actual_pairs = list(map(lambda r: (r.user_id, r.book_id), reviews))
 
             assert all(p in actual_pairs for p in expected_pairs)
 
@@ -161,3 +192,541 @@ async def test_reviews_not_found(reviews_repo: dao_reviews.Repository) -> None:
     )
 
     assert len(reviews) == 0
+
+
+@pytest.mark.asyncio
+async def test_catalog_put_get_delete(
+    catalog_repo: dao_catalog.Repository, subtests: SubTests
+) -> None:
+    for kind in dao_catalog.Kind:
+        with subtests.test("put and get", kind=kind):
+            await catalog_repo.put_entry(kind, "OL1X", "{}", datetime(2024, 1, 1))
+            await catalog_repo.put_entry(kind, "OL1X", '{"a":1}', datetime(2024, 2, 1))
+
+            entry = await catalog_repo.get_entry(kind, "OL1X")
+
+            assert entry is not None
+            assert entry.data == '{"a":1}'
+            assert entry.fetched_at == datetime(2024, 2, 1)
+
+        with subtests.test("delete", kind=kind):
+            await catalog_repo.delete_entry(kind, "OL1X")
+            await catalog_repo.delete_entry(kind, "OL1X")
+
+            assert await catalog_repo.get_entry(kind, "OL1X") is None
+
+
+@pytest.mark.asyncio
+async def test_previews_index_and_search(
+    previews_repo: dao_previews.Repository, subtests: SubTests
+) -> None:
+    def preview(
+        key: str, title: str, subject: str, language: str
+    ) -> dao_previews.Preview:
+        return dao_previews.Preview(
+            key=key,
+            title=title,
+            authors=["J.R.R. Tolkien"],
+            subjects=[subject],
+            languages=[language],
+            data=f'{{"key":"{key}"}}',
+        )
+
+    await previews_repo.index_previews(
+        [
+            preview("OL1W", "The Lord of the Rings", "Fantasy", "eng"),
+            preview("OL2W", "Silmarillion", "Rings", "eng"),
+            preview("OL3W", "Le Seigneur des Anneaux", "Fantasy", "fre"),
+        ],
+        datetime(2024, 1, 1),
+    )
+
+    with subtests.test("ranked by title first"):
+        hits = await previews_repo.search_previews('"rings"', limit=10)
+
+        assert [(hit.data, hit.strong) for hit in hits] == [
+            ('{"key":"OL1W"}', True),
+            ('{"key":"OL2W"}', False),
+        ]
+
+    with subtests.test("authors are indexed"):
+        hits = await previews_repo.search_previews('"tolkien"', limit=10)
+
+        assert len(hits) == 3
+        assert all(hit.strong for hit in hits)
+
+    with subtests.test("filtered by language"):
+        hits = await previews_repo.search_previews(
+            '"tolkien"', language="fre", limit=10
+        )
+
+        assert [hit.data for hit in hits] == ['{"key":"OL3W"}']
+
+    with subtests.test("reindexed preview replaces the old one"):
+        await previews_repo.index_previews(
+            [preview("OL2W", "Unfinished Tales", "Fantasy", "eng")],
+            datetime(2024, 2, 1),
+        )
+
+        assert await previews_repo.search_previews('"silmarillion"', limit=10) == []
+        assert len(await previews_repo.search_previews('"unfinished"', limit=10)) == 1
+
+
+@pytest.mark.asyncio
+async def test_previews_stream_reviewed_first(
+    previews_repo: dao_previews.Repository,
+    users_repo: dao_users.Repository,
+    reviews_repo: dao_reviews.Repository,
+) -> None:
+    await previews_repo.index_previews(
+        [
+            dao_previews.Preview(
+                key=key,
+                title=key,
+                authors=[],
+                subjects=[],
+                languages=[],
+                data=f'{{"key":"{key}"}}',
+            )
+            for key in ("OL10W", "OL11W")
+        ],
+        datetime(2024, 3, 1),
+    )
+
+    user_id = await users_repo.create_user("previews_reader", "hash")
+    await reviews_repo.create_or_update_review(
+        user_id=user_id, book_id="OL10W", rating=7
+    )
+
+    streamed = [data async for data in previews_repo.stream_previews()]
+
+    assert streamed[0] == '{"key":"OL10W"}'
+    assert '{"key":"OL11W"}' in streamed
+
+
+@pytest.mark.asyncio
+async def test_reviews_rating_stats(
+    users_repo: dao_users.Repository,
+    reviews_repo: dao_reviews.Repository,
+    subtests: SubTests,
+) -> None:
+    book_id = "OL42W"
+
+    users = [await users_repo.create_user(f"rater{i}", "hash") for i in range(3)]
+
+    for user_id, rating in zip(users, [3, 9, 9]):
+        await reviews_repo.create_or_update_review(
+            user_id=user_id, book_id=book_id, rating=rating
+        )
+
+    def check(count: int, sum: int, ratings: dict[int, int]) -> None:
+        assert stats[book_id].count == count
+        assert stats[book_id].sum == sum
+        assert stats[book_id].histogram == [ratings.get(r, 0) for r in range(1, 11)]
+
+    with subtests.test("created"):
+        stats = await reviews_repo.find_rating_stats([book_id, "OL43W"])
+
+        assert list(stats) == [book_id]
+        check(3, 21, {3: 1, 9: 2})
+
+    with subtests.test("updated with the old rating subtracted"):
+        await reviews_repo.create_or_update_review(
+            user_id=users[1], book_id=book_id, rating=5, commentary="changed my mind"
+        )
+
+        stats = await reviews_repo.find_rating_stats([book_id])
+        check(3, 17, {3: 1, 5: 1, 9: 1})
+
+    with subtests.test("commentary update keeps the stats"):
+        await reviews_repo.create_or_update_review(
+            user_id=users[1], book_id=book_id, rating=5, commentary="indeed"
+        )
+
+        stats = await reviews_repo.find_rating_stats([book_id])
+        check(3, 17, {3: 1, 5: 1, 9: 1})
+
+    with subtests.test("deleted"):
+        await reviews_repo.delete_review(user_id=users[0], book_id=book_id)
+        await reviews_repo.delete_review(user_id=users[0], book_id=book_id)
+
+        stats = await reviews_repo.find_rating_stats([book_id])
+        check(2, 14, {5: 1, 9: 1})
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_aggregates(
+    users_repo: dao_users.Repository,
+    reviews_repo: dao_reviews.Repository,
+    leaderboard_repo: dao_leaderboard.Repository,
+    subtests: SubTests,
+) -> None:
+    book_ids = ["OL900W", "OL901W", "OL902W"]
+
+    users = [await users_repo.create_user(f"ranker{i}", "hash") for i in range(3)]
+
+    for user_id in users:
+        await reviews_repo.create_or_update_review(
+            user_id=user_id, book_id=book_ids[0], rating=8
+        )
+
+    await reviews_repo.create_or_update_review(
+        user_id=users[0], book_id=book_ids[1], rating=10
+    )
+
+    old = [
+        Review(
+            user_id=user_id,
+            book_id=book_ids[2],
+            rating=9,
+            commentary=None,
+            created_at=datetime(2000, 1, 1),
+            updated_at=None,
+        )
+        for user_id in users
+    ]
+
+    await reviews_repo.import_reviews(old)
+
+    def tallies(found: Any) -> dict[str, tuple[int, int]]:
+        return {
+            id: (tally.count, tally.sum)
+            for id, tally in found.items()
+            if id in book_ids
+        }
+
+    def ranked(found: Any) -> list[str]:
+        return [tally.book_id for tally in found if tally.book_id in book_ids]
+
+    with subtests.test("recent and totals"):
+        recent = await leaderboard_repo.find_recent(book_ids, days=7)
+        totals = await leaderboard_repo.find_totals(book_ids)
+
+        assert tallies(recent) == {book_ids[0]: (3, 24), book_ids[1]: (1, 10)}
+        assert tallies(totals) == {
+            book_ids[0]: (3, 24),
+            book_ids[1]: (1, 10),
+            book_ids[2]: (3, 27),
+        }
+
+    with subtests.test("trending"):
+        trending = await leaderboard_repo.find_trending(days=7, limit=1000)
+
+        assert ranked(trending) == book_ids[:2]
+
+    with subtests.test("top rated by the Bayesian average"):
+        top = await leaderboard_repo.find_top_rated(
+            prior_mean=5, prior_count=10, limit=1000
+        )
+
+        assert ranked(top) == [book_ids[2], book_ids[0], book_ids[1]]
+
+        top = await leaderboard_repo.find_top_rated(
+            prior_mean=5, prior_count=0, limit=1000
+        )
+
+        assert ranked(top) == [book_ids[1], book_ids[2], book_ids[0]]
+
+        assert await leaderboard_repo.find_mean_rating() is not None
+
+    with subtests.test("review moved to another day"):
+        await reviews_repo.import_reviews(
+            [old[0].model_copy(update={"book_id": book_ids[0], "rating": 2})]
+        )
+
+        recent = await leaderboard_repo.find_recent(book_ids, days=7)
+        totals = await leaderboard_repo.find_totals(book_ids)
+
+        assert tallies(recent)[book_ids[0]] == (2, 16)
+        assert tallies(totals)[book_ids[0]] == (3, 18)
+
+    with subtests.test("deleted"):
+        await reviews_repo.delete_review(user_id=users[0], book_id=book_ids[1])
+
+        recent = await leaderboard_repo.find_recent(book_ids, days=7)
+        totals = await leaderboard_repo.find_totals(book_ids)
+
+        assert book_ids[1] not in recent
+        assert book_ids[1] not in totals
+
+
+@pytest.mark.asyncio
+async def test_reviews_keyset_pagination(
+    users_repo: dao_users.Repository, reviews_repo: dao_reviews.Repository
+) -> None:
+    user_id = await users_repo.create_user("paginated_reviewer", "hash")
+
+    # created in the same second, so the pages are split by the tie-breakers
+    for i in range(5):
+        await reviews_repo.create_or_update_review(
+            user_id=user_id, book_id=f"OL{100 + i}W", rating=5
+        )
+
+    expected = await reviews_repo.find_reviews(user_id=user_id)
+
+    pages: list[list[tuple[int, str]]] = []
+    after: Optional[ReviewCursor] = None
+
+    while True:
+        page = await reviews_repo.find_reviews(user_id=user_id, limit=2, after=after)
+
+        if not page:
+            break
+
+        pages.append([(r.user_id, r.book_id) for r in page])
+        after = ReviewCursor.of(page[-1])
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sum(pages, []) == [(r.user_id, r.book_id) for r in expected]
+    assert [r.book_id for r in expected] == [f"OL{104 - i}W" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_reviews_queries_do_not_scan(
+    reviews_repo: dao_reviews.Repository, subtests: SubTests
+) -> None:
+    statements: list[tuple[str, Any]] = []
+
+    def capture(
+        connection: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        statements.append((statement, parameters))
+
+    after = ReviewCursor(created_at=datetime(2024, 1, 1), user_id=1, book_id="OL1W")
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+
+    try:
+        filters: list[dict[str, Any]] = [
+            {},
+            {"book_id": "OL1W"},
+            {"user_id": 1},
+            {"book_id": "OL1W", "user_id": 1},
+        ]
+
+        for filter in filters:
+            await reviews_repo.find_reviews(**filter, limit=10)
+            await reviews_repo.find_reviews(**filter, limit=10, after=after)
+
+        await reviews_repo.find_rating_stats(["OL1W", "OL2W"])
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    async with engine.connect() as connection:
+        for statement, parameters in statements:
+            with subtests.test("query plan", statement=statement):
+                plan = await connection.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                )
+
+                for _, _, _, detail in plan:
+                    assert "TEMP B-TREE" not in detail
+
+                    # the first page of all reviews is read from the head of the index
+                    assert detail.startswith("SEARCH") or (
+                        detail == "SCAN reviews USING INDEX ix_reviews_created_at"
+                        and "WHERE" not in statement
+                        and "LIMIT" in statement
+                    )
+
+
+@pytest.mark.asyncio
+async def test_reviews_import_and_stream(
+    users_repo: dao_users.Repository, reviews_repo: dao_reviews.Repository
+) -> None:
+    book_id = "OL200W"
+
+    users = [await users_repo.create_user(f"imported{i}", "hash") for i in range(3)]
+
+    await reviews_repo.create_or_update_review(
+        user_id=users[0], book_id=book_id, rating=1
+    )
+
+    imported = [
+        Review(
+            user_id=user_id,
+            book_id=book_id,
+            rating=rating,
+            commentary=commentary,
+            created_at=datetime(2020, 1, 1, 12, 30, 15),
+            updated_at=None,
+        )
+        for user_id, rating, commentary in zip(users, [4, 6, 10], [None, "ok", None])
+    ]
+
+    await reviews_repo.import_reviews(imported)
+
+    # imported again on rerun
+    await reviews_repo.import_reviews(imported[1:])
+
+    streamed = [
+        review
+        async for review in reviews_repo.stream_reviews(batch_size=2)
+        if review.book_id == book_id
+    ]
+
+    assert sorted(streamed, key=lambda r: r.user_id) == imported
+
+    # the overwritten rating is subtracted from the stats
+    stats = await reviews_repo.find_rating_stats([book_id])
+
+    assert stats[book_id].count == 3
+    assert stats[book_id].sum == 20
+
+
+@pytest.mark.asyncio
+async def test_storage_profile_and_maintenance(tmp_path: Path) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite3'}")
+
+    apply_profile(engine, StorageProfile(cache_size=2**20, busy_timeout=1.5))
+
+    await create_all(engine)
+
+    async def pragma(name: str) -> Any:
+        async with engine.connect() as connection:
+            return (await connection.exec_driver_sql(f"PRAGMA {name}")).scalar()
+
+    try:
+        assert await pragma("journal_mode") == "wal"
+        assert await pragma("synchronous") == 1
+        assert await pragma("cache_size") == -1024
+        assert await pragma("busy_timeout") == 1500
+        assert await pragma("auto_vacuum") == 2
+
+        async with engine.begin() as connection:
+            for i in range(100):
+                await connection.execute(
+                    insert(TableCatalogWorks).values(
+                        key=f"OL{i}W", data="x" * 4096, fetched_at=datetime.now()
+                    )
+                )
+
+            await connection.execute(delete(TableCatalogWorks))
+
+        free = await pragma("freelist_count")
+
+        maintenance = Maintenance(engine, vacuum_pages=10)
+        await maintenance.run()
+
+        assert maintenance.stats.vacuumed_pages == 10
+        assert maintenance.stats.auto_vacuum == "INCREMENTAL"
+        assert await pragma("freelist_count") <= free - 10
+
+        # analyzed the first time
+        async with engine.connect() as connection:
+            stats = await connection.exec_driver_sql(
+                "SELECT count(*) FROM sqlite_stat1"
+            )
+
+            assert stats.scalar()
+
+        await maintenance.run()
+
+        assert maintenance.stats.runs == 2
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_maintenance_without_incremental_vacuum(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite3'}")
+
+    # created before the profile was enabled
+    await create_all(engine)
+
+    apply_profile(engine, StorageProfile())
+
+    try:
+        maintenance = Maintenance(engine)
+
+        await maintenance.run()
+        await maintenance.run()
+
+        assert maintenance.stats.auto_vacuum == "NONE"
+        assert maintenance.stats.vacuumed_pages == 0
+
+        # warned once rather than on every run
+        warnings = [r for r in caplog.records if "incremental vacuum" in r.message]
+
+        assert len(warnings) == 1
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reviews_group_commit(
+    session_maker: async_sessionmaker[AsyncSession],
+    users_repo: dao_users.Repository,
+) -> None:
+    repo = dao_reviews.GroupCommitRepository(session_maker, max_batch=50)
+
+    user_id = await users_repo.create_user("group_committer", "hash")
+    book_ids = [f"OL{300 + i}W" for i in range(100)]
+
+    try:
+        results = await asyncio.gather(
+            *(
+                repo.create_or_update_review(user_id=user_id, book_id=id, rating=7)
+                for id in book_ids
+            ),
+            # violates the rating constraint
+            repo.create_or_update_review(user_id=user_id, book_id="OL400W", rating=11),
+            repo.delete_review(user_id=user_id, book_id=book_ids[0]),
+            return_exceptions=True,
+        )
+    finally:
+        await repo.close()
+
+    assert [isinstance(r, IntegrityError) for r in results] == [False] * 100 + [
+        True,
+        False,
+    ]
+
+    reviews = await repo.find_reviews(user_id=user_id)
+
+    # deleted after it was created, as the writes are committed in order
+    assert sorted(r.book_id for r in reviews) == sorted(book_ids[1:])
+
+    stats = repo.stats
+
+    assert stats.writes == 101
+    assert stats.failed == 1
+    assert stats.largest_batch <= 50
+    assert stats.commits < 101
+
+
+@pytest.mark.asyncio
+async def test_reviews_group_commit_drops_cancelled_writes(
+    session_maker: async_sessionmaker[AsyncSession],
+    users_repo: dao_users.Repository,
+) -> None:
+    repo = dao_reviews.GroupCommitRepository(session_maker)
+
+    user_id = await users_repo.create_user("cancelled_committer", "hash")
+
+    try:
+        write = asyncio.create_task(
+            repo.create_or_update_review(user_id=user_id, book_id="OL500W", rating=7)
+        )
+
+        # queued, but not taken by the writer yet
+        await asyncio.sleep(0)
+
+        write.cancel()
+
+        await repo.create_or_update_review(user_id=user_id, book_id="OL501W", rating=7)
+    finally:
+        await repo.close()
+
+    reviews = await repo.find_reviews(user_id=user_id)
+
+    assert [r.book_id for r in reviews] == ["OL501W"]
+    assert repo.stats.dropped == 1
+    assert repo.stats.writes == 1
@@ -0,0 +1,48 @@
+import socket
+from typing import AsyncGenerator
+
+import aiomcache
+import pytest
+import pytest_asyncio
+
+from book_review.config import settings
+from book_review.controller.http.backends import MemcachedBackend
+
+
+def _memcached_is_running() -> bool:
+    try:
+        with socket.create_connection(
+            (settings.CACHE_MEMCACHED_HOST, settings.CACHE_MEMCACHED_PORT), timeout=1
+        ):
+            return True
+    except OSError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(
+    not _memcached_is_running(), reason="memcached is not running"
+)
+
+
+@pytest_asyncio.fixture
+async def backend() -> AsyncGenerator[MemcachedBackend, None]:
+    client = aiomcache.Client(
+        settings.CACHE_MEMCACHED_HOST, settings.CACHE_MEMCACHED_PORT
+    )
+
+    yield MemcachedBackend(client)
+
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_set_get_clear(backend: MemcachedBackend) -> None:
+    await backend.set("test:memcached", '{"a": "b:c"}', 60)
+
+    ttl, value = await backend.get_with_ttl("test:memcached")
+
+    assert value == '{"a": "b:c"}'
+    assert 59 <= ttl <= 60
+
+    assert await backend.clear(key="test:memcached") == 1
+    assert await backend.get("test:memcached") is None
@@ -0,0 +1,197 @@
+import sys
+from typing import Optional
+from unittest.mock import AsyncMock
+
+import aiomcache
+import pytest
+from fastapi_cache.backends import Backend
+
+from book_review.controller.http.backends import (
+    LRUBackend,
+    MemcachedBackend,
+    TieredBackend,
+)
+
+
+class Clock:
+    now: float
+
+    def __init__(self) -> None:
+        self.now = 0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class MockBackend(Backend):
+    values: dict[str, tuple[int, str]]
+    fail: bool
+
+    def __init__(self) -> None:
+        self.values = {}
+        self.fail = False
+
+    async def get_with_ttl(self, key: str) -> tuple[int, Optional[str]]:
+        if self.fail:
+            raise ConnectionError("down")
+
+        return self.values.get(key, (0, None))
+
+    async def get(self, key: str) -> Optional[str]:
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: str, expire: Optional[int] = None) -> None:
+        if self.fail:
+            raise ConnectionError("down")
+
+        self.values[key] = (expire or -1, value)
+
+    async def clear(
+        self, namespace: Optional[str] = None, key: Optional[str] = None
+    ) -> int:
+        if self.fail:
+            raise ConnectionError("down")
+
+        return 0
+
+
+def _size(key: str, value: str) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+@pytest.mark.asyncio
+async def test_lru_evicts_least_recently_used() -> None:
+    cache = LRUBackend(max_size=_size("k1", "v" * 100) * 2)
+
+    await cache.set("k1", "v" * 100, 60)
+    await cache.set("k2", "v" * 100, 60)
+
+    # k1 becomes the most recently used one
+    assert await cache.get("k1") is not None
+
+    await cache.set("k3", "v" * 100, 60)
+
+    assert await cache.get("k2") is None
+    assert await cache.get("k1") is not None
+    assert await cache.get("k3") is not None
+
+    stats = cache.stats
+    assert stats.entries == 2
+    assert stats.evictions == 1
+    assert stats.size <= stats.max_size
+    assert stats.hits == 3
+    assert stats.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_skips_values_larger_than_budget() -> None:
+    cache = LRUBackend(max_size=100)
+
+    await cache.set("key", "v" * 1000, 60)
+
+    assert await cache.get("key") is None
+    assert cache.stats.size == 0
+
+
+@pytest.mark.asyncio
+async def test_lru_overwrite_keeps_size() -> None:
+    cache = LRUBackend(max_size=10_000)
+
+    await cache.set("key", "first", 60)
+    await cache.set("key", "second", 60)
+
+    assert cache.stats.size == _size("key", "second")
+    assert await cache.get("key") == "second"
+
+
+@pytest.mark.asyncio
+async def test_lru_expires_entries() -> None:
+    clock = Clock()
+    cache = LRUBackend(max_size=10_000, clock=clock)
+
+    await cache.set("key", "value", 60)
+
+    clock.now = 50
+    assert await cache.get_with_ttl("key") == (10, "value")
+
+    clock.now = 60
+    assert await cache.get_with_ttl("key") == (0, None)
+
+    stats = cache.stats
+    assert stats.expirations == 1
+    assert stats.entries == 0
+    assert stats.size == 0
+
+
+@pytest.mark.asyncio
+async def test_lru_clear() -> None:
+    cache = LRUBackend(max_size=10_000)
+
+    await cache.set("ns1:a", "value", 60)
+    await cache.set("ns1:b", "value", 60)
+    await cache.set("ns2:a", "value", 60)
+
+    assert await cache.clear(namespace="ns1") == 2
+    assert await cache.clear(key="ns2:a") == 1
+    assert cache.stats.entries == 0
+
+
+@pytest.mark.asyncio
+async def test_tiered_fills_l1_from_l2() -> None:
+    l1 = LRUBackend(max_size=10_000)
+    l2 = MockBackend()
+    cache = TieredBackend(l1, l2)
+
+    l2.values["key"] = (30, "value")
+
+    assert await cache.get_with_ttl("key") == (30, "value")
+    assert await l1.get_with_ttl("key") == (30, "value")
+    assert await cache.get_with_ttl("missing") == (0, None)
+
+    stats = cache.stats
+    assert stats.l2_hits == 1
+    assert stats.l2_misses == 1
+
+
+@pytest.mark.asyncio
+async def test_tiered_sets_both_tiers() -> None:
+    l1 = LRUBackend(max_size=10_000)
+    l2 = MockBackend()
+    cache = TieredBackend(l1, l2)
+
+    await cache.set("key", "value", 60)
+
+    assert await l1.get("key") == "value"
+    assert l2.values["key"] == (60, "value")
+
+
+@pytest.mark.asyncio
+async def test_tiered_survives_l2_failures() -> None:
+    l1 = LRUBackend(max_size=10_000)
+    l2 = MockBackend()
+    cache = TieredBackend(l1, l2)
+
+    l2.fail = True
+
+    await cache.set("key", "value", 60)
+
+    assert await cache.get("key") == "value"
+    assert await cache.get("missing") is None
+    assert await cache.clear(key="key") == 1
+    assert cache.stats.l2_errors == 3
+
+
+@pytest.mark.asyncio
+async def test_memcached_clears_only_single_keys() -> None:
+    client = AsyncMock(spec=aiomcache.Client)
+    client.delete.return_value = True
+
+    cache = MemcachedBackend(client)
+
+    # namespace entries are left to expire by their TTL
+    assert await cache.clear(namespace="ns1") == 0
+    assert await cache.clear() == 0
+    client.delete.assert_not_awaited()
+
+    assert await cache.clear(key="ns1:a") == 1
+    client.delete.assert_awaited_once_with(b"ns1:a")
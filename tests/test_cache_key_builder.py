@@ -0,0 +1,162 @@
+from datetime import datetime
+from typing import Iterator, Optional
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+
+import book_review.usecase.tags as tags
+from book_review.controller.http.cache import TagVersions, key_builder
+from book_review.controller.http.decorator import ResponseCache
+from book_review.controller.http.models import Sort, User
+
+
+@pytest.fixture(autouse=True)
+def cache() -> Iterator[None]:
+    FastAPICache.reset()
+    FastAPICache.init(InMemoryBackend(), prefix="test")
+
+    yield
+
+    FastAPICache.reset()
+
+
+async def search_books(query: str, sort: Optional[Sort] = None) -> None:
+    pass
+
+
+async def find_reviews(
+    book_id: Optional[str] = None, user_id: Optional[int] = None
+) -> None:
+    pass
+
+
+async def get_current_user(user: User) -> None:
+    pass
+
+
+def _user(id: int, login: str) -> User:
+    return User(id=id, login=login, created_at=datetime(2024, 1, 1))
+
+
+def test_query_is_normalized() -> None:
+    assert key_builder(
+        search_books, kwargs={"query": "Don Quixote", "sort": Sort.NEW}
+    ) == key_builder(search_books, kwargs={"query": " don  QUIXOTE", "sort": "new"})
+
+    assert key_builder(search_books, kwargs={"query": "don quixote"}) != key_builder(
+        search_books, kwargs={"query": "don quixote", "sort": Sort.NEW}
+    )
+
+
+def test_parameters_are_sorted_and_unset_are_omitted() -> None:
+    keys = {
+        key_builder(find_reviews, kwargs={"book_id": "OL1W", "user_id": None}),
+        key_builder(find_reviews, kwargs={"user_id": None, "book_id": "OL1W"}),
+        key_builder(find_reviews, kwargs={"book_id": "OL1W"}),
+    }
+
+    assert len(keys) == 1
+    assert keys != {key_builder(find_reviews, kwargs={"user_id": 1})}
+
+
+def test_routes_do_not_share_keys() -> None:
+    assert key_builder(find_reviews, kwargs={}) != key_builder(search_books, kwargs={})
+
+
+def test_private_routes_are_cached_per_user() -> None:
+    first = key_builder(get_current_user, kwargs={"user": _user(1, "first")})
+    second = key_builder(get_current_user, kwargs={"user": _user(2, "second")})
+
+    assert first != second
+    assert first == key_builder(get_current_user, kwargs={"user": _user(1, "first")})
+
+
+def test_key_has_prefix_and_namespace() -> None:
+    assert key_builder(search_books, "books", kwargs={}).startswith("test:books:")
+
+
+@pytest.mark.asyncio
+async def test_tagged_keys_change_when_tags_are_invalidated() -> None:
+    versions = TagVersions()
+
+    build = versions.key_builder(
+        lambda kw: tags.reviews(kw.get("book_id"), kw.get("user_id"))
+    )
+
+    by_book = await build(find_reviews, kwargs={"book_id": "OL1W"})
+    by_other_book = await build(find_reviews, kwargs={"book_id": "OL2W"})
+    by_user = await build(find_reviews, kwargs={"user_id": 1})
+
+    assert by_book == await build(find_reviews, kwargs={"book_id": "OL1W"})
+
+    await versions.invalidate([tags.book("OL1W")])
+
+    assert by_book != await build(find_reviews, kwargs={"book_id": "OL1W"})
+    assert by_other_book == await build(find_reviews, kwargs={"book_id": "OL2W"})
+    assert by_user == await build(find_reviews, kwargs={"user_id": 1})
+
+
+@pytest.mark.asyncio
+async def test_evicted_tag_version_does_not_restore_old_keys() -> None:
+    backend = InMemoryBackend()
+    versions = TagVersions(backend)
+
+    build = versions.key_builder(lambda _: [tags.USERS])
+
+    key = await build(find_reviews, kwargs={})
+
+    await backend.clear(namespace="test:tags")
+
+    assert key != await build(find_reviews, kwargs={})
+
+
+class FailingBackend(InMemoryBackend):
+    async def get(self, key: str) -> Optional[str]:
+        raise ConnectionError("down")
+
+    async def set(self, key: str, value: str, expire: Optional[int] = None) -> None:
+        raise ConnectionError("down")
+
+
+@pytest.mark.asyncio
+async def test_tag_keys_do_not_carry_request_ids() -> None:
+    backend = AsyncMock(spec=InMemoryBackend)
+    versions = TagVersions(backend)
+
+    await versions.invalidate([tags.book("a b\n" + "x" * 300)])
+
+    key = backend.set.await_args.args[0]
+
+    assert key.startswith("test:tags:")
+    assert len(key) < 250
+    assert not any(c.isspace() for c in key)
+
+
+@pytest.mark.asyncio
+async def test_unavailable_tag_versions_skip_cache() -> None:
+    versions = TagVersions(FailingBackend())
+    cache = ResponseCache()
+
+    calls = 0
+
+    @cache.cached(expire=60, key_builder=versions.key_builder(lambda _: [tags.USERS]))
+    async def find_users() -> int:
+        nonlocal calls
+        calls += 1
+
+        return calls
+
+    assert await find_users() == 1
+    assert await find_users() == 2
+    assert versions.stats.read_failures == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_invalidation_is_counted() -> None:
+    versions = TagVersions(FailingBackend())
+
+    await versions.invalidate([tags.USERS, tags.REVIEWS])
+
+    assert versions.stats.invalidation_failures == 2
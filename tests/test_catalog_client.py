@@ -0,0 +1,173 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from unittest.mock import AsyncMock
+
+import pytest
+
+import book_review.dao.catalog as dao
+from book_review.openlibrary.catalog import CatalogClient
+from book_review.openlibrary.client import Author, Book, Client
+
+
+class MockRepo(dao.Repository):
+    entries: dict[tuple[dao.Kind, str], dao.Entry]
+
+    def __init__(self) -> None:
+        self.entries = {}
+
+    async def get_entry(self, kind: dao.Kind, key: str) -> Optional[dao.Entry]:
+        return self.entries.get((kind, key))
+
+    async def put_entry(
+        self, kind: dao.Kind, key: str, data: str, fetched_at: datetime
+    ) -> None:
+        self.entries[(kind, key)] = dao.Entry(key=key, data=data, fetched_at=fetched_at)
+
+    async def delete_entry(self, kind: dao.Kind, key: str) -> None:
+        self.entries.pop((kind, key), None)
+
+
+@pytest.fixture
+def mock_client() -> AsyncMock:
+    return AsyncMock(spec=Client)
+
+
+@pytest.fixture
+def repo() -> MockRepo:
+    return MockRepo()
+
+
+@pytest.fixture
+def client(mock_client: AsyncMock, repo: MockRepo) -> CatalogClient:
+    return CatalogClient(
+        mock_client,
+        repo,
+        fresh_for=timedelta(hours=1),
+        stale_for=timedelta(days=1),
+    )
+
+
+def _put_book(repo: MockRepo, book: Book, age: timedelta) -> None:
+    repo.entries[(dao.Kind.WORK, book.key)] = dao.Entry(
+        key=book.key, data=book.model_dump_json(), fetched_at=datetime.now() - age
+    )
+
+
+@pytest.mark.asyncio
+async def test_miss_is_persisted(
+    client: CatalogClient, mock_client: AsyncMock, repo: MockRepo
+) -> None:
+    # Arrange
+    mock_client.get_author.return_value = Author(name="Miguel", key="OL1A")
+
+    # Act
+    first = await client.get_author("OL1A")
+    second = await client.get_author("OL1A")
+
+    # Assert
+    assert first == second == Author(name="Miguel", key="OL1A")
+    assert mock_client.get_author.await_count == 1
+    assert (dao.Kind.AUTHOR, "OL1A") in repo.entries
+    assert client.stats.misses == 1
+    assert client.stats.fresh == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_is_served_while_revalidated(
+    client: CatalogClient, mock_client: AsyncMock, repo: MockRepo
+) -> None:
+    # Arrange
+    _put_book(repo, Book(key="OL1W", title="Old"), timedelta(hours=2))
+    mock_client.get_book.return_value = Book(key="OL1W", title="New")
+
+    # Act
+    stale = await client.get_book("OL1W")
+
+    # let the background refresh finish
+    await asyncio.sleep(0.01)
+
+    fresh = await client.get_book("OL1W")
+
+    # Assert
+    assert stale is not None and stale.title == "Old"
+    assert fresh is not None and fresh.title == "New"
+    assert mock_client.get_book.await_count == 1
+    assert client.stats.stale == 1
+    assert client.stats.fresh == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_is_served_on_error(
+    client: CatalogClient, mock_client: AsyncMock, repo: MockRepo
+) -> None:
+    # Arrange
+    _put_book(repo, Book(key="OL1W", title="Old"), timedelta(days=7))
+    mock_client.get_book.side_effect = Exception("unexpected status 503")
+
+    # Act
+    book = await client.get_book("OL1W")
+
+    # Assert
+    assert book is not None and book.title == "Old"
+    assert client.stats.stale_if_error == 1
+
+
+@pytest.mark.asyncio
+async def test_error_without_entry_is_raised(
+    client: CatalogClient, mock_client: AsyncMock
+) -> None:
+    # Arrange
+    mock_client.get_book.side_effect = Exception("unexpected status 503")
+
+    # Act & Assert
+    with pytest.raises(Exception):
+        await client.get_book("OL1W")
+
+
+@pytest.mark.asyncio
+async def test_removed_upstream_is_deleted(
+    client: CatalogClient, mock_client: AsyncMock, repo: MockRepo
+) -> None:
+    # Arrange
+    _put_book(repo, Book(key="OL1W", title="Old"), timedelta(days=7))
+    mock_client.get_book.return_value = None
+
+    # Act
+    book = await client.get_book("OL1W")
+
+    # Assert
+    assert book is None
+    assert (dao.Kind.WORK, "OL1W") not in repo.entries
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_refreshes(
+    client: CatalogClient, mock_client: AsyncMock, repo: MockRepo
+) -> None:
+    # Arrange
+    cancelled = asyncio.Event()
+
+    async def get_book(key: str) -> Book:
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+        return Book(key=key, title="New")
+
+    _put_book(repo, Book(key="OL1W", title="Old"), timedelta(hours=2))
+    mock_client.get_book.side_effect = get_book
+
+    stale = await client.get_book("OL1W")
+    await asyncio.sleep(0.01)
+
+    # Act
+    await client.close()
+
+    # Assert
+    assert stale is not None and stale.title == "Old"
+    assert cancelled.is_set()
+    assert client.stats.failed_refreshes == 0
+    assert repo.entries[(dao.Kind.WORK, "OL1W")].data == stale.model_dump_json()
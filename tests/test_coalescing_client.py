@@ -0,0 +1,128 @@
+import asyncio
+from typing import Optional, Sequence
+from unittest.mock import AsyncMock
+
+import pytest
+
+from book_review.openlibrary.client import (
+    Book,
+    BookPreview,
+    Client,
+    SearchBooksFilter,
+)
+from book_review.openlibrary.coalescing import CoalescingClient
+
+
+@pytest.fixture
+def mock_client() -> AsyncMock:
+    return AsyncMock(spec=Client)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_searches_are_coalesced(mock_client: AsyncMock) -> None:
+    # Arrange
+    release = asyncio.Event()
+
+    async def search_books(filter: SearchBooksFilter) -> Sequence[BookPreview]:
+        await release.wait()
+
+        return [BookPreview(key="OL1W", title="Don Quixote")]
+
+    mock_client.search_books.side_effect = search_books
+    client = CoalescingClient(mock_client)
+
+    queries = ["Don Quixote", "don  quixote", " DON QUIXOTE"] * 10
+
+    # Act
+    calls = [client.search_books(SearchBooksFilter(query=q)) for q in queries]
+    tasks = [asyncio.ensure_future(call) for call in calls]
+
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(*tasks)
+
+    # Assert
+    assert mock_client.search_books.await_count == 1
+    assert all(r[0].title == "Don Quixote" for r in results)
+    assert client.stats.calls == len(queries)
+    assert client.stats.upstream_calls == 1
+    assert client.stats.deduplicated == len(queries) - 1
+
+
+@pytest.mark.asyncio
+async def test_different_calls_are_not_coalesced(mock_client: AsyncMock) -> None:
+    # Arrange
+    async def get_book(key: str) -> Optional[Book]:
+        await asyncio.sleep(0)
+
+        return Book(key=key, title=key)
+
+    mock_client.get_book.side_effect = get_book
+    client = CoalescingClient(mock_client)
+
+    # Act
+    first, second = await asyncio.gather(
+        client.get_book("OL1W"), client.get_book("OL2W")
+    )
+
+    # Assert
+    assert first is not None and first.key == "OL1W"
+    assert second is not None and second.key == "OL2W"
+    assert client.stats.upstream_calls == 2
+    assert client.stats.deduplicated == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared(mock_client: AsyncMock) -> None:
+    # Arrange
+    async def get_author(key: str) -> None:
+        await asyncio.sleep(0)
+
+        raise RuntimeError("upstream is down")
+
+    mock_client.get_author.side_effect = get_author
+    client = CoalescingClient(mock_client)
+
+    # Act
+    results = await asyncio.gather(
+        client.get_author("OL1A"), client.get_author("OL1A"), return_exceptions=True
+    )
+
+    # Assert
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert mock_client.get_author.await_count == 1
+
+    # the failed call is not cached
+    with pytest.raises(RuntimeError):
+        await client.get_author("OL1A")
+
+    assert mock_client.get_author.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_others(mock_client: AsyncMock) -> None:
+    # Arrange
+    release = asyncio.Event()
+
+    async def get_book(key: str) -> Optional[Book]:
+        await release.wait()
+
+        return Book(key=key, title=key)
+
+    mock_client.get_book.side_effect = get_book
+    client = CoalescingClient(mock_client)
+
+    # Act
+    first = asyncio.ensure_future(client.get_book("OL1W"))
+    second = asyncio.ensure_future(client.get_book("OL1W"))
+
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    book = await second
+
+    # Assert
+    assert first.cancelled()
+    assert book is not None and book.key == "OL1W"
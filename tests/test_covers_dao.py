@@ -0,0 +1,88 @@
+from pathlib import Path
+from typing import AsyncGenerator, AsyncIterator, Sequence
+
+import pytest
+
+from book_review.dao.covers import FileSystemRepository
+
+
+async def _chunks(chunks: Sequence[bytes]) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def _consume(chunks: AsyncIterator[bytes]) -> bytes:
+    return b"".join([chunk async for chunk in chunks])
+
+
+@pytest.mark.asyncio
+async def test_store_and_get_cover(tmp_path: Path) -> None:
+    repo = FileSystemRepository(tmp_path, 1024)
+
+    assert await repo.get_cover(42, "S") is None
+
+    data = await _consume(repo.store_cover(42, "S", _chunks([b"abc", b"def"])))
+
+    assert data == b"abcdef"
+
+    path = await repo.get_cover(42, "S")
+
+    assert path is not None
+    assert path.read_bytes() == b"abcdef"
+    assert await repo.get_cover(42, "L") is None
+
+
+@pytest.mark.asyncio
+async def test_interrupted_stream_is_not_stored(tmp_path: Path) -> None:
+    repo = FileSystemRepository(tmp_path, 1024)
+
+    chunks = repo.store_cover(42, "S", _chunks([b"abc", b"def"]))
+
+    assert isinstance(chunks, AsyncGenerator)
+    assert await anext(chunks) == b"abc"
+
+    await chunks.aclose()
+
+    assert await repo.get_cover(42, "S") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_are_evicted(tmp_path: Path) -> None:
+    repo = FileSystemRepository(tmp_path, 10)
+
+    await _consume(repo.store_cover(1, "S", _chunks([b"1234"])))
+    await _consume(repo.store_cover(2, "S", _chunks([b"1234"])))
+
+    # touch the first one so that the second becomes least recently used
+    assert await repo.get_cover(1, "S") is not None
+
+    await _consume(repo.store_cover(3, "S", _chunks([b"1234"])))
+
+    assert await repo.get_cover(1, "S") is not None
+    assert await repo.get_cover(2, "S") is None
+    assert await repo.get_cover(3, "S") is not None
+    assert repo.size == 8
+
+
+@pytest.mark.asyncio
+async def test_too_large_cover_is_streamed_but_not_stored(tmp_path: Path) -> None:
+    repo = FileSystemRepository(tmp_path, 4)
+
+    data = await _consume(repo.store_cover(42, "S", _chunks([b"abc", b"def"])))
+
+    assert data == b"abcdef"
+    assert await repo.get_cover(42, "S") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_restore_after_restart(tmp_path: Path) -> None:
+    repo = FileSystemRepository(tmp_path, 1024)
+
+    await _consume(repo.store_cover(42, "M", _chunks([b"abc"])))
+
+    repo = FileSystemRepository(tmp_path, 1024)
+
+    assert await repo.get_cover(42, "M") is not None
+    assert repo.size == 3
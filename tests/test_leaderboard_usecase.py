@@ -0,0 +1,193 @@
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, Mapping, Optional, Sequence
+
+import pytest
+
+import book_review.dao.leaderboard as dao
+import book_review.dao.previews as previews_dao
+from book_review.models.reviews import RankedBook
+from book_review.openlibrary.client import BookPreview
+from book_review.usecase.leaderboard import Leaderboard
+
+
+class MockRepo(dao.Repository):
+    totals: dict[str, dao.Tally]
+    recent: dict[str, dao.Tally]
+
+    def __init__(self) -> None:
+        self.totals = {}
+        self.recent = {}
+
+    def review(self, book_id: str, rating: int, *, recent: bool = True) -> None:
+        for tallies in [self.totals, self.recent] if recent else [self.totals]:
+            tally = tallies.get(book_id, dao.Tally(book_id=book_id, count=0, sum=0))
+
+            tallies[book_id] = dao.Tally(
+                book_id=book_id, count=tally.count + 1, sum=tally.sum + rating
+            )
+
+    async def find_mean_rating(self) -> Optional[float]:
+        count = sum(t.count for t in self.totals.values())
+
+        return sum(t.sum for t in self.totals.values()) / count if count else None
+
+    async def find_top_rated(
+        self, *, prior_mean: float, prior_count: float, limit: int
+    ) -> Sequence[dao.Tally]:
+        def score(t: dao.Tally) -> float:
+            return (prior_mean * prior_count + t.sum) / (prior_count + t.count)
+
+        tallies = sorted(self.totals.values(), key=lambda t: (-score(t), t.book_id))
+
+        return tallies[:limit]
+
+    async def find_trending(self, *, days: int, limit: int) -> Sequence[dao.Tally]:
+        tallies = sorted(self.recent.values(), key=lambda t: (-t.count, t.book_id))
+
+        return tallies[:limit]
+
+    async def find_totals(self, book_ids: Sequence[str]) -> Mapping[str, dao.Tally]:
+        return {id: self.totals[id] for id in book_ids if id in self.totals}
+
+    async def find_recent(
+        self, book_ids: Sequence[str], *, days: int
+    ) -> Mapping[str, dao.Tally]:
+        return {id: self.recent[id] for id in book_ids if id in self.recent}
+
+
+class MockPreviewsRepo(previews_dao.Repository):
+    async def index_previews(
+        self, previews: Sequence[previews_dao.Preview], indexed_at: datetime
+    ) -> None:
+        raise Exception()
+
+    async def search_previews(
+        self, match: str, *, language: Optional[str] = None, limit: int
+    ) -> Sequence[previews_dao.Hit]:
+        raise Exception()
+
+    async def find_previews(self, keys: Sequence[str]) -> Mapping[str, str]:
+        # only the first book was found by a search
+        return {
+            key: BookPreview(key=key, title="Don Quixote").model_dump_json()
+            for key in keys
+            if key == "OL0W"
+        }
+
+    def stream_previews(self) -> AsyncIterator[str]:
+        raise Exception()
+
+
+def _ids(books: Sequence[RankedBook]) -> list[str]:
+    return [book.book_id for book in books]
+
+
+@pytest.mark.asyncio
+async def test_refresh_ranks_books() -> None:
+    repo = MockRepo()
+
+    for i, count in enumerate([5, 3, 8, 1]):
+        for _ in range(count):
+            repo.review(f"OL{i}W", 8)
+
+    leaderboard = Leaderboard(repo, MockPreviewsRepo(), size=3)
+
+    await leaderboard.refresh()
+
+    trending = leaderboard.trending(10)
+
+    assert _ids(trending) == ["OL2W", "OL0W", "OL1W"]
+    assert [book.count for book in trending] == [8, 5, 3]
+    assert _ids(leaderboard.trending(2)) == ["OL2W", "OL0W"]
+
+    assert trending[1].preview is not None
+    assert trending[1].preview.title == "Don Quixote"
+    assert trending[0].preview is None
+
+
+@pytest.mark.asyncio
+async def test_top_rated_by_bayesian_average() -> None:
+    repo = MockRepo()
+
+    # a single perfect rating is not enough to outrank many good ones
+    repo.review("OL0W", 10)
+
+    for _ in range(20):
+        repo.review("OL1W", 9)
+
+    for _ in range(20):
+        repo.review("OL2W", 3)
+
+    leaderboard = Leaderboard(repo, MockPreviewsRepo(), size=3, prior_count=5)
+
+    await leaderboard.refresh()
+
+    top = leaderboard.top_rated(3)
+
+    assert _ids(top) == ["OL1W", "OL0W", "OL2W"]
+    assert top[0].average == 9
+
+
+@pytest.mark.asyncio
+async def test_update_rescores_touched_books() -> None:
+    repo = MockRepo()
+
+    for i in range(6):
+        for _ in range(10 - i):
+            repo.review(f"OL{i}W", 8)
+
+    leaderboard = Leaderboard(repo, MockPreviewsRepo(), size=2)
+
+    await leaderboard.refresh()
+
+    assert _ids(leaderboard.trending(2)) == ["OL0W", "OL1W"]
+
+    # beyond the candidates kept by the refresh
+    for _ in range(20):
+        repo.review("OL5W", 8)
+
+    # the second one is touched without changes, e.g. by a commentary update
+    leaderboard.touch(["OL5W", "OL0W"])
+
+    await leaderboard.update()
+
+    assert _ids(leaderboard.trending(2)) == ["OL5W", "OL0W"]
+
+    # reviews deleted or moved out of the trending days
+    repo.recent["OL5W"] = dao.Tally(book_id="OL5W", count=0, sum=0)
+    del repo.recent["OL0W"]
+
+    leaderboard.touch(["OL5W", "OL0W"])
+
+    await leaderboard.update()
+
+    assert _ids(leaderboard.trending(2)) == ["OL1W", "OL2W"]
+
+    stats = leaderboard.stats
+
+    assert stats.refreshes == 1
+    assert stats.updates == 4
+
+
+@pytest.mark.asyncio
+async def test_touched_books_rescored_in_background() -> None:
+    repo = MockRepo()
+    repo.review("OL1W", 8)
+
+    async with Leaderboard(repo, MockPreviewsRepo(), size=2) as leaderboard:
+        async with asyncio.timeout(1):
+            while not leaderboard.stats.refreshes:
+                await asyncio.sleep(0.01)
+
+        assert _ids(leaderboard.trending(2)) == ["OL1W"]
+
+        repo.review("OL0W", 8)
+        leaderboard.touch(["OL0W"])
+
+        async with asyncio.timeout(1):
+            while not leaderboard.stats.updates:
+                await asyncio.sleep(0.01)
+
+        assert _ids(leaderboard.trending(2)) == ["OL0W", "OL1W"]
+        assert leaderboard.stats.refreshes == 1
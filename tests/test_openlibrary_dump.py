@@ -0,0 +1,224 @@
+import gzip
+import sqlite3
+from pathlib import Path
+from typing import Any, AsyncGenerator, Sequence
+from unittest.mock import AsyncMock
+
+import orjson
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from book_review.openlibrary.client import Client, SearchBooksFilter, Sort
+from book_review.openlibrary.dump import (
+    Importer,
+    author_rows,
+    edition_rows,
+    work_rows,
+)
+from book_review.openlibrary.local import LocalCatalogClient, build_match_query
+
+
+def _write_dump(path: Path, type: str, docs: Sequence[dict[str, Any]]) -> Path:
+    with gzip.open(path, "wb") as file:
+        for doc in docs:
+            columns = [type.encode(), doc["key"].encode(), b"1", b"2024-01-01"]
+            file.write(b"\t".join([*columns, orjson.dumps(doc)]) + b"\n")
+
+    return path
+
+
+@pytest.fixture
+def catalog(tmp_path: Path) -> Path:
+    authors = _write_dump(
+        tmp_path / "authors.txt.gz",
+        "/type/author",
+        [
+            {
+                "key": "/authors/OL1A",
+                "name": "Miguel de Cervantes Saavedra",
+                "bio": {"type": "/type/text", "value": "Spanish writer"},
+                "wikipedia": "http://en.wikipedia.org/wiki/Cervantes",
+            },
+            {"key": "/authors/OL2A", "name": "Leo Tolstoy", "wikipedia": "n/a"},
+        ],
+    )
+
+    works = _write_dump(
+        tmp_path / "works.txt.gz",
+        "/type/work",
+        [
+            {
+                "key": "/works/OL1W",
+                "title": "Don Quixote",
+                "covers": [-1, 42],
+                "subjects": ["Knights", "Spain"],
+                "authors": [{"author": {"key": "/authors/OL1A"}}],
+                "description": "Man reads too many books",
+            },
+            {
+                "key": "/works/OL2W",
+                "title": "War and Peace",
+                "subjects": ["Russia"],
+                "authors": [{"author": {"key": "/authors/OL2A"}}],
+            },
+            {"key": "/works/OL3W"},
+        ],
+    )
+
+    editions = _write_dump(
+        tmp_path / "editions.txt.gz",
+        "/type/edition",
+        [
+            {
+                "key": "/books/OL1M",
+                "works": [{"key": "/works/OL1W"}],
+                "languages": [{"key": "/languages/spa"}],
+                "publish_date": "1605",
+            },
+            {
+                "key": "/books/OL2M",
+                "works": [{"key": "/works/OL1W"}],
+                "languages": [{"key": "/languages/eng"}],
+                "publish_date": "March 5, 1612",
+            },
+            {"key": "/books/OL3M", "publish_date": "1869"},
+        ],
+    )
+
+    path = tmp_path / "catalog.sqlite3"
+    connection = sqlite3.connect(path, isolation_level=None)
+    reports: list[str] = []
+
+    importer = Importer(connection, batch_size=2, report=reports.append)
+
+    assert importer.import_dump("authors", authors, author_rows).rows == 2
+    assert importer.import_dump("works", works, work_rows).rows == 2
+    assert importer.import_dump("editions", editions, edition_rows).rows == 4
+    assert importer.build_index().rows == 2
+    assert reports
+
+    connection.close()
+
+    return path
+
+
+@pytest_asyncio.fixture
+async def client(catalog: Path) -> AsyncGenerator[LocalCatalogClient, None]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{catalog}")
+
+    yield LocalCatalogClient(engine, fallback=None)
+
+    await engine.dispose()
+
+
+def test_build_index_in_batches(tmp_path: Path) -> None:
+    works = _write_dump(
+        tmp_path / "works.txt.gz",
+        "/type/work",
+        [{"key": f"/works/OL{i}W", "title": f"Title {i}"} for i in range(5)],
+    )
+
+    connection = sqlite3.connect(tmp_path / "catalog.sqlite3", isolation_level=None)
+    reports: list[str] = []
+
+    importer = Importer(connection, batch_size=2, report=reports.append)
+    importer.import_dump("works", works, work_rows)
+
+    reports.clear()
+
+    assert importer.build_index().rows == 5
+
+    # committed every 2 works
+    assert [report.split(":")[0] for report in reports] == ["index"] * 3
+    assert not connection.in_transaction
+
+    connection.close()
+
+
+def test_build_match_query() -> None:
+    assert build_match_query("  Don   QUIXOTE ") == '"don" "quixote"'
+    assert build_match_query('war AND "peace') == '"war" "and" """peace"'
+
+
+@pytest.mark.asyncio
+async def test_search_books(client: LocalCatalogClient) -> None:
+    books = await client.search_books(SearchBooksFilter(query="cervantes quixote"))
+
+    assert len(books) == 1
+
+    book = books[0]
+
+    assert book.key == "OL1W"
+    assert book.title == "Don Quixote"
+    assert book.cover_i == 42
+    assert book.author_key == ["OL1A"]
+    assert book.author_name == ["Miguel de Cervantes Saavedra"]
+    assert sorted(book.language) == ["eng", "spa"]
+    assert book.publish_year == [1605]
+    assert book.subject == ["Knights", "Spain"]
+
+
+@pytest.mark.asyncio
+async def test_search_books_filters(client: LocalCatalogClient) -> None:
+    russia = await client.search_books(SearchBooksFilter(query="russia"))
+    spanish = await client.search_books(
+        SearchBooksFilter(query="quixote", language="spa")
+    )
+    russian = await client.search_books(
+        SearchBooksFilter(query="quixote", language="rus")
+    )
+
+    assert [b.key for b in russia] == ["OL2W"]
+    assert [b.key for b in spanish] == ["OL1W"]
+    assert russian == []
+
+
+@pytest.mark.asyncio
+async def test_search_books_fallback(catalog: Path) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{catalog}")
+    fallback = AsyncMock(spec=Client)
+    fallback.search_books.return_value = []
+
+    client = LocalCatalogClient(engine, fallback=fallback)
+
+    await client.search_books(SearchBooksFilter(query="quixote"))
+    fallback.search_books.assert_not_awaited()
+
+    # nothing found locally
+    await client.search_books(SearchBooksFilter(query="anna karenina"))
+    # sort is not supported locally
+    await client.search_books(SearchBooksFilter(query="quixote", sort=Sort.RANDOM_ASC))
+
+    assert fallback.search_books.await_count == 2
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_get_book(client: LocalCatalogClient) -> None:
+    book = await client.get_book("OL1W")
+
+    assert book is not None
+
+    mapped = book.map()
+
+    assert mapped.id == "OL1W"
+    assert mapped.description == "Man reads too many books"
+    assert mapped.covers == [42]
+    assert mapped.author_id == "OL1A"
+
+    assert await client.get_book("OL3W") is None
+
+
+@pytest.mark.asyncio
+async def test_get_author(client: LocalCatalogClient) -> None:
+    cervantes = await client.get_author("OL1A")
+    tolstoy = await client.get_author("OL2A")
+
+    assert cervantes is not None
+    assert cervantes.bio == "Spanish writer"
+    assert str(cervantes.wikipedia) == "http://en.wikipedia.org/wiki/Cervantes"
+
+    assert tolstoy is not None
+    assert tolstoy.wikipedia is None
@@ -0,0 +1,241 @@
+import asyncio
+from typing import AsyncGenerator, Awaitable, Callable
+
+import pytest
+import pytest_asyncio
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from book_review.openlibrary.client import HTTPAPIClient, SearchBooksFilter, Timeouts
+from book_review.openlibrary.resilience import (
+    BreakerState,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    UpstreamError,
+)
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+@pytest_asyncio.fixture
+async def server() -> AsyncGenerator[Callable[[Handler], Awaitable[str]], None]:
+    servers: list[TestServer] = []
+
+    async def start(handler: Handler) -> str:
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+
+        server = TestServer(app)
+        await server.start_server()
+
+        servers.append(server)
+
+        return str(server.make_url("/"))
+
+    yield start
+
+    for server in servers:
+        await server.close()
+
+
+def _client(
+    session: ClientSession, breaker: CircuitBreaker, attempts: int = 3
+) -> HTTPAPIClient:
+    return HTTPAPIClient(
+        api_session=session,
+        covers_session=session,
+        api_breaker=breaker,
+        timeouts=Timeouts(works=0.2),
+        retry=RetryPolicy(attempts=attempts, base_delay=0, max_delay=0),
+    )
+
+
+@pytest.mark.asyncio
+async def test_retries_server_errors(
+    server: Callable[[Handler], Awaitable[str]],
+) -> None:
+    calls = 0
+
+    async def handler(_: web.Request) -> web.StreamResponse:
+        nonlocal calls
+        calls += 1
+
+        if calls < 3:
+            return web.Response(status=503)
+
+        return web.json_response({"key": "/works/OL1W", "title": "Don Quixote"})
+
+    base_url = await server(handler)
+
+    async with ClientSession(base_url) as session:
+        client = _client(session, CircuitBreaker(failure_threshold=10))
+
+        book = await client.get_book("OL1W")
+
+    assert book is not None and book.key == "OL1W"
+    assert calls == 3
+
+
+@pytest.mark.asyncio
+async def test_does_not_retry_client_errors(
+    server: Callable[[Handler], Awaitable[str]],
+) -> None:
+    calls = 0
+
+    async def handler(_: web.Request) -> web.StreamResponse:
+        nonlocal calls
+        calls += 1
+
+        return web.Response(status=400)
+
+    base_url = await server(handler)
+
+    async with ClientSession(base_url) as session:
+        client = _client(session, CircuitBreaker())
+
+        with pytest.raises(UpstreamError):
+            await client.get_book("OL1W")
+
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_timeout_opens_breaker(
+    server: Callable[[Handler], Awaitable[str]],
+) -> None:
+    calls = 0
+
+    async def handler(_: web.Request) -> web.StreamResponse:
+        nonlocal calls
+        calls += 1
+
+        await asyncio.sleep(1)
+
+        return web.Response(status=200)
+
+    base_url = await server(handler)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+    async with ClientSession(base_url) as session:
+        client = _client(session, breaker, attempts=3)
+
+        with pytest.raises(CircuitOpenError):
+            await client.get_book("OL1W")
+
+        # fails fast without making requests
+        with pytest.raises(CircuitOpenError):
+            await client.get_author("OL1A")
+
+    assert calls == 2
+    assert client.breakers["api"].state == BreakerState.OPEN
+    assert client.breakers["api"].trips == 1
+    assert client.breakers["covers"].state == BreakerState.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_retries_stalled_body(
+    server: Callable[[Handler], Awaitable[str]],
+) -> None:
+    calls = 0
+
+    async def handler(request: web.Request) -> web.StreamResponse:
+        nonlocal calls
+        calls += 1
+
+        if calls > 1:
+            return web.json_response({"key": "/works/OL1W", "title": "Don Quixote"})
+
+        resp = web.StreamResponse()
+        resp.content_length = 100
+
+        # headers arrive in time, the rest of the body does not
+        await resp.prepare(request)
+        await resp.write(b'{"key": ')
+        await asyncio.sleep(1)
+
+        return resp
+
+    base_url = await server(handler)
+    breaker = CircuitBreaker(failure_threshold=10)
+
+    async with ClientSession(base_url) as session:
+        client = _client(session, breaker)
+
+        book = await client.get_book("OL1W")
+
+    assert book is not None and book.title == "Don Quixote"
+    assert calls == 2
+    assert breaker.stats.consecutive_failures == 0
+
+
+@pytest.mark.asyncio
+async def test_truncated_body_is_upstream_error(
+    server: Callable[[Handler], Awaitable[str]],
+) -> None:
+    async def handler(request: web.Request) -> web.StreamResponse:
+        resp = web.StreamResponse()
+        resp.content_length = 100
+
+        await resp.prepare(request)
+        await resp.write(b'{"key": ')
+
+        # the connection is closed before the promised body is sent
+        assert request.transport is not None
+        request.transport.close()
+
+        return resp
+
+    base_url = await server(handler)
+    breaker = CircuitBreaker(failure_threshold=10)
+
+    async with ClientSession(base_url) as session:
+        client = _client(session, breaker, attempts=2)
+
+        with pytest.raises(UpstreamError):
+            await client.get_author("OL1A")
+
+    assert breaker.stats.consecutive_failures == 2
+
+
+@pytest.mark.asyncio
+async def test_search_books(server: Callable[[Handler], Awaitable[str]]) -> None:
+    query: dict[str, str] = {}
+
+    async def handler(request: web.Request) -> web.StreamResponse:
+        query.update(request.query)
+
+        return web.json_response(
+            {
+                "numFound": 1,
+                "docs": [
+                    {
+                        "key": "/works/OL1W",
+                        "title": "Don Quixote",
+                        "author_key": ["OL1A"],
+                        "author_name": ["Miguel de Cervantes"],
+                        "publish_year": [1620, -1, 1605],
+                    }
+                ],
+            }
+        )
+
+    base_url = await server(handler)
+
+    async with ClientSession(base_url) as session:
+        client = _client(session, CircuitBreaker())
+
+        books = await client.search_books(
+            SearchBooksFilter(query="Don  QUIXOTE", limit=1)
+        )
+
+    assert query["q"] == "don quixote"
+    assert query["limit"] == "1"
+    assert len(books) == 1
+
+    book = books[0].map()
+
+    assert book.id == "OL1W"
+    assert book.authors[0].name == "Miguel de Cervantes"
+    assert book.first_publishment_date is not None
+    assert book.first_publishment_date.year == 1605
@@ -0,0 +1,87 @@
+import asyncio
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from yarl import URL
+
+from book_review.openlibrary.pool import ManagedSession, PoolSettings
+
+
+@pytest_asyncio.fixture
+async def server() -> AsyncGenerator[tuple[TestServer, asyncio.Event], None]:
+    release = asyncio.Event()
+
+    async def handler(_: web.Request) -> web.StreamResponse:
+        await release.wait()
+
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+
+    server = TestServer(app)
+    await server.start_server()
+
+    yield server, release
+
+    await server.close()
+
+
+def _session(server: TestServer, limit: int) -> ManagedSession:
+    return ManagedSession(
+        URL(str(server.make_url("/"))),
+        PoolSettings(limit=limit, limit_per_host=limit),
+        json_serialize=str,
+    )
+
+
+@pytest.mark.asyncio
+async def test_pool_limits_and_reuses_connections(
+    server: tuple[TestServer, asyncio.Event],
+) -> None:
+    test_server, release = server
+
+    async with _session(test_server, limit=1) as session:
+
+        async def get() -> None:
+            resp = await session.get("/works/OL1W.json")
+            await resp.read()
+
+        tasks = [asyncio.create_task(get()) for _ in range(3)]
+
+        await asyncio.sleep(0.1)
+
+        stats = session.stats
+        assert stats.in_use == 1
+        assert stats.waiters == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        stats = session.stats
+        assert stats.in_use == 0
+        assert stats.idle == 1
+        assert stats.waiters == 0
+
+
+@pytest.mark.asyncio
+async def test_session_is_closed_on_exit(
+    server: tuple[TestServer, asyncio.Event],
+) -> None:
+    test_server, _ = server
+
+    session = _session(test_server, limit=1)
+
+    with pytest.raises(RuntimeError):
+        session.session
+
+    async with session:
+        aiohttp_session = session.session
+
+    assert aiohttp_session.closed
+
+    with pytest.raises(RuntimeError):
+        session.session
@@ -0,0 +1,85 @@
+from pathlib import Path
+from typing import AsyncGenerator, Awaitable, Callable
+
+import orjson
+import pytest
+import pytest_asyncio
+from aiohttp import ClientSession
+from aiohttp.test_utils import TestServer
+
+from book_review.openlibrary.client import CoverSize, HTTPAPIClient, SearchBooksFilter
+from book_review.openlibrary.resilience import RetryPolicy, UpstreamError
+from book_review.openlibrary.standin import Knobs, create_app
+
+FIXTURES = Path(__file__).parent.parent / "benchmarks" / "fixtures" / "openlibrary"
+
+StandIn = Callable[[Knobs], Awaitable[HTTPAPIClient]]
+
+
+@pytest_asyncio.fixture
+async def standin() -> AsyncGenerator[StandIn, None]:
+    servers: list[TestServer] = []
+    sessions: list[ClientSession] = []
+
+    async def start(knobs: Knobs) -> HTTPAPIClient:
+        server = TestServer(create_app(FIXTURES, knobs))
+        await server.start_server()
+        servers.append(server)
+
+        session = ClientSession(str(server.make_url("/")))
+        sessions.append(session)
+
+        return HTTPAPIClient(
+            api_session=session,
+            covers_session=session,
+            retry=RetryPolicy(attempts=1),
+        )
+
+    yield start
+
+    for session in sessions:
+        await session.close()
+
+    for server in servers:
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_replays_fixtures(standin: StandIn) -> None:
+    client = await standin(Knobs())
+
+    default = orjson.loads((FIXTURES / "search" / "default.json").read_bytes())
+
+    books = await client.search_books(SearchBooksFilter(query="don quixote"))
+    assert len(books) == len(default["docs"])
+
+    book = await client.get_book(books[0].key)
+    assert book is not None
+    assert book.title == books[0].title
+
+    assert book.authors
+    author = await client.get_author(book.authors[0].author.key.split("/")[-1])
+    assert author is not None
+
+    assert await client.get_book("OL0W") is None
+    assert await client.get_cover(1, CoverSize.SMALL) is None
+
+
+@pytest.mark.asyncio
+async def test_shapes_payloads(standin: StandIn) -> None:
+    client = await standin(Knobs(search_docs=50, cover_size=1000))
+
+    books = await client.search_books(SearchBooksFilter(query="anything"))
+    assert len(books) == 50
+
+    chunks = await client.get_cover(1, CoverSize.LARGE)
+    assert chunks is not None
+    assert sum([len(chunk) async for chunk in chunks]) == 1000
+
+
+@pytest.mark.asyncio
+async def test_injects_errors(standin: StandIn) -> None:
+    client = await standin(Knobs(error_rate=1))
+
+    with pytest.raises(UpstreamError):
+        await client.search_books(SearchBooksFilter(query="anything"))
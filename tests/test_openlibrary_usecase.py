@@ -1,10 +1,27 @@
+import asyncio
+from pathlib import Path
+from typing import AsyncIterator
 from unittest.mock import AsyncMock
 
 import pytest
 
-from book_review.models.book import Book, BookID, BookPreview
-from book_review.openlibrary.client import Client, CoverSize
-from book_review.usecase.openlibrary import UseCase  # Import your UseCase class
+from book_review.dao.covers import FileSystemRepository
+from book_review.dao.suggestions import MemoryRepository as SuggestionsRepository
+from book_review.models.book import Book, BookID, BookPreview, SuggestionKind
+from book_review.openlibrary.client import (
+    Author,
+    BookAuthor,
+    Client,
+    CoverSize,
+    SearchBooksFilter,
+    Sort,
+)
+from book_review.openlibrary.client import Book as OpenlibraryBook
+from book_review.openlibrary.client import BookPreview as OpenlibraryBookPreview
+from book_review.usecase.openlibrary import (  # Import your UseCase class
+    Prefetcher,
+    UseCase,
+)
 
 
 @pytest.fixture
@@ -37,6 +54,26 @@ async def test_search_books_previews(use_case: UseCase, mock_client: AsyncMock)
     assert result[1].id == "234"
 
 
+@pytest.mark.asyncio
+async def test_search_books_previews_filter(
+    use_case: UseCase, mock_client: AsyncMock
+) -> None:
+    # Arrange
+    mock_client.search_books.return_value = []
+
+    # Act
+    await use_case.search_books_previews(
+        "Harry Potter", sort=Sort.NEW, language="eng", page=2, limit=10
+    )
+
+    # Assert
+    mock_client.search_books.assert_awaited_once_with(
+        SearchBooksFilter(
+            query="Harry Potter", sort=Sort.NEW, language="eng", page=2, limit=10
+        )
+    )
+
+
 @pytest.mark.asyncio
 async def test_get_book(use_case: UseCase, mock_client: AsyncMock) -> None:
     # Arrange
@@ -70,7 +107,10 @@ async def test_get_book_not_found(use_case: UseCase, mock_client: AsyncMock) ->
 @pytest.mark.asyncio
 async def test_get_cover(use_case: UseCase, mock_client: AsyncMock) -> None:
     # Arrange
-    mock_client.get_cover.return_value = b"fake_cover_data"
+    async def chunks() -> AsyncIterator[bytes]:
+        yield b"fake_cover_data"
+
+    mock_client.get_cover.return_value = chunks()
     book_id = 123
     expected_size = CoverSize.SMALL
 
@@ -78,7 +118,8 @@ async def test_get_cover(use_case: UseCase, mock_client: AsyncMock) -> None:
     result = await use_case.get_cover(book_id, expected_size)
 
     # Assert
-    assert result == b"fake_cover_data"
+    assert isinstance(result, AsyncIterator)
+    assert [chunk async for chunk in result] == [b"fake_cover_data"]
 
 
 @pytest.mark.asyncio
@@ -93,3 +134,211 @@ async def test_get_cover_not_found(use_case: UseCase, mock_client: AsyncMock) ->
 
     # Assert
     assert result is None
+
+
+@pytest.mark.asyncio
+async def test_get_cover_stored(mock_client: AsyncMock, tmp_path: Path) -> None:
+    # Arrange
+    async def chunks() -> AsyncIterator[bytes]:
+        yield b"fake_"
+        yield b"cover_data"
+
+    mock_client.get_cover.return_value = chunks()
+    use_case = UseCase(mock_client, covers=FileSystemRepository(tmp_path, 1024))
+
+    # Act
+    streamed = await use_case.get_cover(123, CoverSize.LARGE)
+
+    assert isinstance(streamed, AsyncIterator)
+
+    data = b"".join([chunk async for chunk in streamed])
+
+    stored = await use_case.get_cover(123, CoverSize.LARGE)
+
+    # Assert
+    assert data == b"fake_cover_data"
+    assert stored is not None and not isinstance(stored, AsyncIterator)
+
+    with stored:
+        assert stored.read() == b"fake_cover_data"
+
+    mock_client.get_cover.assert_awaited_once_with(123, CoverSize.LARGE)
+
+
+@pytest.mark.asyncio
+async def test_get_cover_stored_and_evicted(
+    mock_client: AsyncMock, tmp_path: Path
+) -> None:
+    # Arrange
+    async def chunks(data: bytes) -> AsyncIterator[bytes]:
+        yield data
+
+    covers = FileSystemRepository(tmp_path, 4)
+    use_case = UseCase(mock_client, covers=covers)
+
+    mock_client.get_cover.return_value = chunks(b"1234")
+    first = await use_case.get_cover(1, CoverSize.SMALL)
+    assert isinstance(first, AsyncIterator)
+    assert [chunk async for chunk in first] == [b"1234"]
+
+    # Act
+    stored = await use_case.get_cover(1, CoverSize.SMALL)
+
+    # the stored one is evicted by another cover while it is being served
+    mock_client.get_cover.return_value = chunks(b"5678")
+    second = await use_case.get_cover(2, CoverSize.SMALL)
+    assert isinstance(second, AsyncIterator)
+    assert [chunk async for chunk in second] == [b"5678"]
+
+    # Assert
+    assert stored is not None and not isinstance(stored, AsyncIterator)
+
+    with stored:
+        assert stored.read() == b"1234"
+
+    assert await covers.get_cover(1, "S") is None
+
+
+def _work(key: str, author_key: str) -> OpenlibraryBook:
+    return OpenlibraryBook(
+        key=key,
+        title=key,
+        authors=[BookAuthor(author=BookAuthor._Author(key=f"/authors/{author_key}"))],
+    )
+
+
+@pytest.mark.asyncio
+async def test_prefetch_top_results(mock_client: AsyncMock) -> None:
+    # Arrange
+    mock_client.search_books.return_value = [
+        OpenlibraryBookPreview(key=f"OL{i}W", title=f"Title{i}") for i in range(5)
+    ]
+    mock_client.get_book.side_effect = lambda key: _work(key, f"A{key}")
+    mock_client.get_author.side_effect = lambda key: Author(key=key, name=key)
+
+    prefetcher = Prefetcher(mock_client, top=2)
+    use_case = UseCase(mock_client, prefetcher=prefetcher)
+
+    # Act
+    await use_case.search_books_previews("Harry Potter")
+    await prefetcher.join()
+
+    await use_case.get_book(BookID("OL0W"))
+    await use_case.get_author("AOL0W")
+    await use_case.get_book(BookID("OL4W"))
+
+    await prefetcher.close()
+
+    # Assert
+    assert [c.args for c in mock_client.get_book.await_args_list[:2]] == [
+        ("OL0W",),
+        ("OL1W",),
+    ]
+    stats = prefetcher.stats
+    assert stats.scheduled == 2
+    assert stats.prefetched == 4
+    assert stats.hits == 2
+    assert stats.misses == 1
+    assert stats.hit_rate == pytest.approx(2 / 3)
+
+
+@pytest.mark.asyncio
+async def test_prefetch_waits_for_interactive_requests(
+    mock_client: AsyncMock,
+) -> None:
+    # Arrange
+    release = asyncio.Event()
+
+    async def get_author(key: str) -> Author:
+        await release.wait()
+
+        return Author(key=key, name=key)
+
+    mock_client.search_books.return_value = [
+        OpenlibraryBookPreview(key="OL1W", title="Title")
+    ]
+    mock_client.get_book.return_value = None
+    mock_client.get_author.side_effect = get_author
+
+    prefetcher = Prefetcher(mock_client, top=1)
+    use_case = UseCase(mock_client, prefetcher=prefetcher)
+
+    # Act
+    author = asyncio.create_task(use_case.get_author("OL1A"))
+    await asyncio.sleep(0)
+
+    await use_case.search_books_previews("Harry Potter")
+    await asyncio.sleep(0.01)
+
+    # Assert
+    mock_client.get_book.assert_not_awaited()
+
+    release.set()
+    await author
+    await prefetcher.join()
+    await prefetcher.close()
+
+    mock_client.get_book.assert_awaited_once_with("OL1W")
+    assert prefetcher.stats.failed == 0
+
+
+@pytest.mark.asyncio
+async def test_prefetch_close_cancels_workers(mock_client: AsyncMock) -> None:
+    # Arrange
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def get_book(key: str) -> None:
+        started.set()
+
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    mock_client.get_book.side_effect = get_book
+
+    prefetcher = Prefetcher(mock_client, top=2, concurrency=2)
+    prefetcher.schedule(
+        [OpenlibraryBookPreview(key=f"OL{i}W", title="Title") for i in range(2)]
+    )
+    await started.wait()
+
+    workers = list(prefetcher._workers)
+
+    # Act
+    await prefetcher.close()
+
+    # Assert
+    assert cancelled.is_set()
+    assert all(worker.done() for worker in workers)
+    assert prefetcher._workers == []
+    assert prefetcher.stats.failed == 0
+
+
+@pytest.mark.asyncio
+async def test_suggest_found_books(mock_client: AsyncMock) -> None:
+    # Arrange
+    mock_client.search_books.return_value = [
+        OpenlibraryBookPreview(
+            key="OL1W",
+            title="The Hobbit",
+            author_key=["OL1A"],
+            author_name=["J.R.R. Tolkien"],
+        )
+    ]
+    use_case = UseCase(mock_client, suggestions=SuggestionsRepository(2**20))
+
+    # Act
+    before = await use_case.suggest("hob")
+    await use_case.search_books_previews("hobbit")
+
+    # Assert
+    assert before == []
+    assert [(s.kind, s.id) for s in await use_case.suggest(" The  HOB")] == [
+        (SuggestionKind.BOOK, "OL1W")
+    ]
+    assert [(s.kind, s.text) for s in await use_case.suggest("j.r")] == [
+        (SuggestionKind.AUTHOR, "J.R.R. Tolkien")
+    ]
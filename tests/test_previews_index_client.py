@@ -0,0 +1,158 @@
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, Mapping, Optional, Sequence
+from unittest.mock import AsyncMock
+
+import pytest
+
+import book_review.dao.previews as dao
+from book_review.openlibrary.client import (
+    BookPreview,
+    Client,
+    SearchBooksFilter,
+    Sort,
+    UpstreamError,
+)
+from book_review.openlibrary.previews import PreviewsIndexClient
+
+
+class MockRepo(dao.Repository):
+    previews: dict[str, dao.Preview]
+
+    def __init__(self) -> None:
+        self.previews = {}
+
+    async def index_previews(
+        self, previews: Sequence[dao.Preview], indexed_at: datetime
+    ) -> None:
+        for preview in previews:
+            self.previews[preview.key] = preview
+
+    async def search_previews(
+        self, match: str, *, language: Optional[str] = None, limit: int
+    ) -> Sequence[dao.Hit]:
+        tokens = [token.strip('"') for token in match.split()]
+
+        hits: list[dao.Hit] = []
+
+        for preview in self.previews.values():
+            strong = " ".join([preview.title, *preview.authors]).lower()
+            text = " ".join([strong, *preview.subjects]).lower()
+
+            if all(token in text for token in tokens):
+                strong_hit = all(token in strong for token in tokens)
+                hits.append(dao.Hit(data=preview.data, strong=strong_hit))
+
+        return hits[:limit]
+
+    async def find_previews(self, keys: Sequence[str]) -> Mapping[str, str]:
+        return {key: self.previews[key].data for key in keys if key in self.previews}
+
+    async def stream_previews(self) -> AsyncIterator[str]:
+        for preview in self.previews.values():
+            yield preview.data
+
+
+def _book(key: str, title: str, subject: str = "") -> BookPreview:
+    return BookPreview(key=key, title=title, author_name=["Author"], subject=[subject])
+
+
+@pytest.fixture
+def mock_client() -> AsyncMock:
+    return AsyncMock(spec=Client)
+
+
+@pytest.fixture
+def repo() -> MockRepo:
+    return MockRepo()
+
+
+@pytest.fixture
+def client(mock_client: AsyncMock, repo: MockRepo) -> PreviewsIndexClient:
+    return PreviewsIndexClient(mock_client, repo, min_hits=2)
+
+
+async def _index(client: PreviewsIndexClient, mock_client: AsyncMock) -> None:
+    mock_client.search_books.return_value = [
+        _book("OL1W", "Lord of the Rings"),
+        _book("OL2W", "The Rings of Power"),
+        _book("OL3W", "Silmarillion", subject="rings"),
+    ]
+
+    await client.search_books(SearchBooksFilter(query="rings", sort=Sort.NEW))
+    await asyncio.sleep(0)
+
+    mock_client.search_books.reset_mock()
+
+
+@pytest.mark.asyncio
+async def test_found_previews_are_indexed(
+    client: PreviewsIndexClient, mock_client: AsyncMock, repo: MockRepo
+) -> None:
+    await _index(client, mock_client)
+
+    assert set(repo.previews) == {"OL1W", "OL2W", "OL3W"}
+    assert client.stats.indexed == 3
+
+
+@pytest.mark.asyncio
+async def test_search_answered_from_index(
+    client: PreviewsIndexClient, mock_client: AsyncMock
+) -> None:
+    await _index(client, mock_client)
+
+    books = await client.search_books(SearchBooksFilter(query="  RINGS "))
+
+    assert [book.key for book in books] == ["OL1W", "OL2W", "OL3W"]
+    mock_client.search_books.assert_not_awaited()
+
+    stats = client.stats
+    assert stats.local == 1
+    assert stats.upstream == 1
+    assert stats.hit_ratio == 0.5
+
+
+@pytest.mark.asyncio
+async def test_upstream_results_are_merged(
+    client: PreviewsIndexClient, mock_client: AsyncMock
+) -> None:
+    await _index(client, mock_client)
+
+    mock_client.search_books.return_value = [_book("OL4W", "Power")]
+
+    books = await client.search_books(SearchBooksFilter(query="power"))
+
+    assert [book.key for book in books] == ["OL4W", "OL2W"]
+    assert client.stats.merged == 1
+
+
+@pytest.mark.asyncio
+async def test_index_answers_when_upstream_fails(
+    client: PreviewsIndexClient, mock_client: AsyncMock
+) -> None:
+    await _index(client, mock_client)
+
+    mock_client.search_books.side_effect = UpstreamError("down")
+
+    books = await client.search_books(SearchBooksFilter(query="power"))
+
+    assert [book.key for book in books] == ["OL2W"]
+    assert client.stats.degraded == 1
+
+    with pytest.raises(UpstreamError):
+        await client.search_books(SearchBooksFilter(query="unknown"))
+
+
+@pytest.mark.asyncio
+async def test_sorted_and_paged_searches_go_upstream(
+    client: PreviewsIndexClient, mock_client: AsyncMock
+) -> None:
+    await _index(client, mock_client)
+
+    mock_client.search_books.return_value = []
+
+    await client.search_books(SearchBooksFilter(query="rings", sort=Sort.OLD))
+    await client.search_books(SearchBooksFilter(query="rings", page=2))
+
+    assert mock_client.search_books.await_count == 2
+    assert client.stats.local == 0
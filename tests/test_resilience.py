@@ -0,0 +1,119 @@
+import pytest
+
+from book_review.openlibrary.resilience import (
+    BreakerState,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+)
+
+
+class FakeClock:
+    now: float = 0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _state(breaker: CircuitBreaker) -> BreakerState:
+    return breaker.stats.state
+
+
+def test_breaker_opens_after_threshold() -> None:
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=FakeClock())
+
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+
+    assert _state(breaker) == BreakerState.CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert _state(breaker) == BreakerState.OPEN
+    assert breaker.stats.trips == 1
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    assert breaker.stats.rejected == 1
+
+
+def test_success_resets_failures() -> None:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=FakeClock())
+
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert _state(breaker) == BreakerState.CLOSED
+    assert breaker.stats.consecutive_failures == 1
+
+
+def test_half_open_probe() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    clock.now = 10
+
+    # only a single probe is allowed
+    breaker.before_call()
+
+    assert _state(breaker) == BreakerState.HALF_OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # failed probe opens the breaker again
+    breaker.record_failure()
+
+    assert _state(breaker) == BreakerState.OPEN
+    assert breaker.stats.trips == 2
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 20
+
+    breaker.before_call()
+    breaker.record_success()
+
+    assert _state(breaker) == BreakerState.CLOSED
+
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_abandoned_probe_allows_another() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    clock.now = 10
+
+    breaker.before_call()
+    breaker.record_abandoned()
+    breaker.before_call()
+
+    assert _state(breaker) == BreakerState.HALF_OPEN
+
+
+def test_retry_delay() -> None:
+    policy = RetryPolicy(attempts=5, base_delay=0.1, max_delay=0.5)
+
+    for attempt in range(10):
+        delay = policy.delay(attempt)
+
+        assert 0 <= delay <= min(0.5, 0.1 * 2**attempt)
+
+    assert policy.delay(0, retry_after=0.3) == 0.3
+    assert policy.delay(0, retry_after=60) == 0.5
@@ -0,0 +1,335 @@
+import asyncio
+import hashlib
+from datetime import date
+from typing import Iterator, Sequence
+from unittest.mock import AsyncMock
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+from fastapi_cache import FastAPICache
+
+import book_review.models.book as book_models
+from book_review.controller.http.app import App
+from book_review.controller.http.backends import LRUBackend
+from book_review.controller.http.cache import key_builder
+from book_review.controller.http.coder import ORJSONCoder
+from book_review.controller.http.decorator import ResponseCache
+from book_review.controller.http.models import BookPreview
+from book_review.models.book import BookID
+from book_review.models.reviews import RatingStats
+from book_review.usecase.openlibrary import UseCase as OpenlibraryUseCase
+from book_review.usecase.reviews import UseCase as ReviewsUseCase
+from book_review.usecase.users import UseCase as UsersUseCase
+
+_CONCURRENCY = 500
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> Iterator[Clock]:
+    clock = Clock()
+
+    FastAPICache.reset()
+    FastAPICache.init(
+        LRUBackend(1024 * 1024, clock=clock),
+        prefix="test",
+        coder=ORJSONCoder,
+        key_builder=key_builder,
+    )
+
+    yield clock
+
+    FastAPICache.reset()
+
+
+class Upstream:
+    def __init__(self, clock: Clock) -> None:
+        self.calls = 0
+        self._clock = clock
+
+    async def get_book(self, id: str) -> dict[str, str]:
+        self.calls += 1
+
+        # let all the concurrent requests reach the cache meanwhile
+        await asyncio.sleep(0.01)
+        self._clock.now += 0.5
+
+        return {"id": id, "version": str(self.calls)}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_for_expired_response(clock: Clock) -> None:
+    cache = ResponseCache(stale_for=60, beta=0, clock=clock)
+    upstream = Upstream(clock)
+
+    get_book = cache.cached(expire=60)(upstream.get_book)
+
+    assert await get_book(id="OL1W") == {"id": "OL1W", "version": "1"}
+
+    clock.now += 61
+
+    books = await asyncio.gather(*(get_book(id="OL1W") for _ in range(_CONCURRENCY)))
+
+    assert upstream.calls == 2
+
+    # the others were not delayed by the refresh and got the stale response
+    assert books.count({"id": "OL1W", "version": "2"}) == 1
+    assert books.count({"id": "OL1W", "version": "1"}) == _CONCURRENCY - 1
+
+    assert cache.stats.stale == _CONCURRENCY - 1
+    assert await get_book(id="OL1W") == {"id": "OL1W", "version": "2"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_for_missing_response(clock: Clock) -> None:
+    cache = ResponseCache(stale_for=60, beta=0, clock=clock)
+    upstream = Upstream(clock)
+
+    get_book = cache.cached(expire=60)(upstream.get_book)
+
+    books = await asyncio.gather(*(get_book(id="OL1W") for _ in range(_CONCURRENCY)))
+
+    assert upstream.calls == 1
+    assert books == [{"id": "OL1W", "version": "1"}] * _CONCURRENCY
+    assert cache.stats.coalesced == _CONCURRENCY - 1
+
+    # stale responses are dropped by the backend in the end
+    clock.now += 60 + 60 + 1
+
+    assert await get_book(id="OL1W") == {"id": "OL1W", "version": "2"}
+    assert cache.stats.recomputes == 2
+
+
+@pytest.mark.asyncio
+async def test_failure_is_shared_and_not_cached(clock: Clock) -> None:
+    cache = ResponseCache(clock=clock)
+    calls = 0
+
+    @cache.cached(expire=60)
+    async def get_book(id: str) -> None:
+        nonlocal calls
+        calls += 1
+
+        await asyncio.sleep(0.01)
+
+        raise LookupError(id)
+
+    results = await asyncio.gather(
+        *(get_book(id="OL1W") for _ in range(10)), return_exceptions=True
+    )
+
+    assert calls == 1
+    assert all(isinstance(result, LookupError) for result in results)
+
+    with pytest.raises(LookupError):
+        await get_book(id="OL1W")
+
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_hot_response_is_refreshed_early(clock: Clock) -> None:
+    upstream = Upstream(clock)
+
+    # a rare draw refreshes the response about 20 recompute times before it expires
+    cache = ResponseCache(beta=1, clock=clock, rand=lambda: 1 - 1e-9)
+    get_book = cache.cached(expire=60)(upstream.get_book)
+
+    await get_book(id="OL1W")
+
+    clock.now += 50
+
+    assert await get_book(id="OL1W") == {"id": "OL1W", "version": "2"}
+    assert cache.stats.early_refreshes == 1
+
+
+@pytest.mark.asyncio
+async def test_early_refresh_is_likely_only_near_expiration(clock: Clock) -> None:
+    upstream = Upstream(clock)
+
+    # median draw refreshes the response ln(2) recompute times before it expires
+    cache = ResponseCache(beta=1, clock=clock, rand=lambda: 0.5)
+    get_book = cache.cached(expire=60)(upstream.get_book)
+
+    await get_book(id="OL1W")
+
+    clock.now += 59
+
+    await get_book(id="OL1W")
+    assert cache.stats.early_refreshes == 0
+
+    clock.now += 0.8
+
+    await get_book(id="OL1W")
+    assert cache.stats.early_refreshes == 1
+
+
+@pytest.mark.asyncio
+async def test_early_refresh_disabled(clock: Clock) -> None:
+    upstream = Upstream(clock)
+
+    cache = ResponseCache(beta=0, clock=clock, rand=lambda: 1 - 1e-9)
+    get_book = cache.cached(expire=60)(upstream.get_book)
+
+    await get_book(id="OL1W")
+
+    clock.now += 59.9
+
+    await get_book(id="OL1W")
+
+    assert upstream.calls == 1
+    assert cache.stats.hits == 1
+
+
+def test_serialized_responses_are_returned_as_is(clock: Clock) -> None:
+    cache = ResponseCache(clock=clock)
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    previews = [
+        BookPreview(id="OL1W", title="Dune", first_publishment_date=date(1965, 8, 1))
+    ]
+
+    @app.get("/books")
+    async def search_books(query: str) -> Sequence[BookPreview]:
+        return previews
+
+    @app.get("/cached/books")
+    @cache.cached(expire=60, serialized=True)
+    async def search_cached_books(query: str) -> Sequence[BookPreview]:
+        return previews
+
+    with TestClient(app) as client:
+        expected = client.get("/books", params={"query": "dune"})
+
+        miss = client.get("/cached/books", params={"query": "dune"})
+        hit = client.get("/cached/books", params={"query": "dune"})
+
+        for response in (miss, hit):
+            assert response.content == expected.content
+            assert response.headers["content-type"] == "application/json"
+            assert response.headers["etag"] == miss.headers["etag"]
+
+        assert hit.headers["cache-control"] == "max-age=60"
+        assert cache.stats.hits == 1
+
+        not_modified = client.get(
+            "/cached/books",
+            params={"query": "dune"},
+            headers={"if-none-match": miss.headers["etag"]},
+        )
+
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+
+
+def test_ndjson_search_is_served_from_cached_previews() -> None:
+    openlibrary = AsyncMock(spec=OpenlibraryUseCase)
+    openlibrary.search_books_previews.return_value = [
+        book_models.BookPreview(id=BookID(f"OL{i}W"), title=f"Title{i}")
+        for i in range(30)
+    ]
+
+    reviews = AsyncMock(spec=ReviewsUseCase)
+    reviews.find_ratings.side_effect = lambda ids: {
+        id: RatingStats(book_id=id) for id in ids
+    }
+
+    app = App(
+        users=AsyncMock(spec=UsersUseCase),
+        reviews=reviews,
+        openlibrary=openlibrary,
+        cache=LRUBackend(1024 * 1024),
+    )
+    app._register_routes()
+
+    ndjson = {"accept": "application/x-ndjson"}
+
+    with TestClient(app._app) as client:
+        books = client.get("/books", params={"query": "dune"}).json()
+
+        streamed = client.get("/books", params={"query": " Dune"}, headers=ndjson)
+        rated = client.get(
+            "/books", params={"query": "dune", "rating": True}, headers=ndjson
+        )
+
+    FastAPICache.reset()
+
+    assert openlibrary.search_books_previews.await_count == 1
+
+    assert streamed.headers["content-type"] == "application/x-ndjson"
+    assert [orjson.loads(line) for line in streamed.iter_lines()] == books
+
+    lines = [orjson.loads(line) for line in rated.iter_lines()]
+
+    assert [line["id"] for line in lines] == [book["id"] for book in books]
+    assert all(line["rating"]["count"] == 0 for line in lines)
+
+    # rated a chunk at a time while streaming
+    assert reviews.find_ratings.await_count == 2
+
+
+def test_rated_search_bypassing_cache_is_rated() -> None:
+    openlibrary = AsyncMock(spec=OpenlibraryUseCase)
+    openlibrary.search_books_previews.return_value = [
+        book_models.BookPreview(id=BookID("OL1W"), title="Dune")
+    ]
+
+    reviews = AsyncMock(spec=ReviewsUseCase)
+    reviews.find_ratings.side_effect = lambda ids: {
+        id: RatingStats(book_id=id) for id in ids
+    }
+
+    app = App(
+        users=AsyncMock(spec=UsersUseCase),
+        reviews=reviews,
+        openlibrary=openlibrary,
+        cache=LRUBackend(1024 * 1024),
+    )
+    app._register_routes()
+
+    with TestClient(app._app) as client:
+        books = client.get(
+            "/books",
+            params={"query": "dune", "rating": True},
+            headers={"cache-control": "no-cache"},
+        ).json()
+
+    FastAPICache.reset()
+
+    assert [book["id"] for book in books] == ["OL1W"]
+    assert books[0]["rating"]["count"] == 0
+
+
+def test_decoded_responses_have_content_etags(clock: Clock) -> None:
+    cache = ResponseCache(clock=clock)
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    @app.get("/books/{id}")
+    @cache.cached(expire=60)
+    async def get_book(id: str) -> dict[str, str]:
+        return {"id": id}
+
+    with TestClient(app) as client:
+        miss = client.get("/books/OL1W")
+        hit = client.get("/books/OL1W")
+
+        not_modified = client.get(
+            "/books/OL1W", headers={"if-none-match": miss.headers["etag"]}
+        )
+
+    data = ORJSONCoder.encode({"id": "OL1W"}).encode()
+
+    # derived from the content only, so that every replica agrees on it
+    assert miss.headers["etag"] == f'W/"{hashlib.md5(data).hexdigest()}"'
+    assert hit.headers["etag"] == miss.headers["etag"]
+    assert not_modified.status_code == 304
@@ -1,11 +1,13 @@
 import random
 import sqlite3
-from typing import Optional, Sequence
+from typing import AsyncIterator, Mapping, Optional, Sequence
 
 import pytest
 
 import book_review.dao.reviews as dao
 import book_review.usecase.reviews as usecase
+import book_review.usecase.tags as tags
+from book_review.models.reviews import Review, ReviewCursor
 
 
 @pytest.mark.asyncio
@@ -33,8 +35,24 @@ async def test_create_review() -> None:
             assert commentary == expected_commentary
 
         async def find_reviews(
-            self, *, book_id: Optional[str] = None, user_id: Optional[int] = None
-        ) -> Sequence[dao.Review]:
+            self,
+            *,
+            book_id: Optional[str] = None,
+            user_id: Optional[int] = None,
+            limit: Optional[int] = None,
+            after: Optional[ReviewCursor] = None,
+        ) -> Sequence[Review]:
+            raise Exception()
+
+        async def import_reviews(self, reviews: Sequence[Review]) -> None:
+            raise Exception()
+
+        def stream_reviews(self, *, batch_size: int = 1000) -> AsyncIterator[Review]:
+            raise Exception()
+
+        async def find_rating_stats(
+            self, book_ids: Sequence[str]
+        ) -> Mapping[str, dao.RatingStats]:
             raise Exception()
 
         async def close(self) -> None:
@@ -52,14 +70,16 @@ async def test_find_reviews() -> None:
     expected_book_id = "d8feda9d-82f6-4f05-821c-70daa6b627af"
     expected_user_id = 42
 
-    expected_reviews: list[dao.Review] = []
+    expected_reviews: list[Review] = []
 
     for _ in range(10):
-        review = dao.Review(
+        review = Review(
             user_id=expected_user_id,
             book_id=expected_book_id,
             rating=random.randint(1, 10),
+            commentary=None,
             created_at=sqlite3.Timestamp(2024, 1, 1),
+            updated_at=None,
         )
 
         expected_reviews.append(review)
@@ -79,13 +99,29 @@ async def test_find_reviews() -> None:
             raise Exception()
 
         async def find_reviews(
-            self, *, book_id: Optional[str] = None, user_id: Optional[int] = None
-        ) -> Sequence[dao.Review]:
+            self,
+            *,
+            book_id: Optional[str] = None,
+            user_id: Optional[int] = None,
+            limit: Optional[int] = None,
+            after: Optional[ReviewCursor] = None,
+        ) -> Sequence[Review]:
             assert book_id == expected_book_id
             assert user_id == expected_user_id
 
             return expected_reviews
 
+        async def import_reviews(self, reviews: Sequence[Review]) -> None:
+            raise Exception()
+
+        def stream_reviews(self, *, batch_size: int = 1000) -> AsyncIterator[Review]:
+            raise Exception()
+
+        async def find_rating_stats(
+            self, book_ids: Sequence[str]
+        ) -> Mapping[str, dao.RatingStats]:
+            raise Exception()
+
     uc = usecase.UseCase(MockRepo())
 
     reviews = await uc.find_reviews(expected_book_id, expected_user_id)
@@ -97,3 +133,199 @@ async def test_find_reviews() -> None:
         assert actual.commentary == expected.commentary
         assert actual.created_at == expected.created_at
         assert actual.updated_at == expected.updated_at
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_cached_reviews() -> None:
+    writes: list[str] = []
+
+    class MockRepo(dao.Repository):
+        async def delete_review(self, *, user_id: int, book_id: str) -> None:
+            writes.append("delete")
+
+        async def create_or_update_review(
+            self,
+            *,
+            user_id: int,
+            book_id: str,
+            rating: int,
+            commentary: Optional[str] = None,
+        ) -> None:
+            writes.append("create")
+
+        async def find_reviews(
+            self,
+            *,
+            book_id: Optional[str] = None,
+            user_id: Optional[int] = None,
+            limit: Optional[int] = None,
+            after: Optional[ReviewCursor] = None,
+        ) -> Sequence[Review]:
+            raise Exception()
+
+        async def import_reviews(self, reviews: Sequence[Review]) -> None:
+            raise Exception()
+
+        def stream_reviews(self, *, batch_size: int = 1000) -> AsyncIterator[Review]:
+            raise Exception()
+
+        async def find_rating_stats(
+            self, book_ids: Sequence[str]
+        ) -> Mapping[str, dao.RatingStats]:
+            raise Exception()
+
+        async def close(self) -> None:
+            raise Exception()
+
+    class MockInvalidator(tags.Invalidator):
+        def __init__(self) -> None:
+            self.invalidated: list[tuple[str, Sequence[str]]] = []
+
+        async def invalidate(self, tags: Sequence[str]) -> None:
+            # invalidating before the write lets stale data be cached again
+            self.invalidated.append((writes[-1], tags))
+
+    invalidator = MockInvalidator()
+    uc = usecase.UseCase(MockRepo(), invalidator=invalidator)
+
+    await uc.create_or_update_review(42, "OL1W", 8)
+    await uc.delete_review(42, "OL1W")
+
+    expected_tags = ["book:OL1W", "user:42", "reviews"]
+
+    assert invalidator.invalidated == [
+        ("create", expected_tags),
+        ("delete", expected_tags),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_find_ratings() -> None:
+    class MockRepo(dao.Repository):
+        async def delete_review(self, *, user_id: int, book_id: str) -> None:
+            raise Exception()
+
+        async def create_or_update_review(
+            self,
+            *,
+            user_id: int,
+            book_id: str,
+            rating: int,
+            commentary: Optional[str] = None,
+        ) -> None:
+            raise Exception()
+
+        async def find_reviews(
+            self,
+            *,
+            book_id: Optional[str] = None,
+            user_id: Optional[int] = None,
+            limit: Optional[int] = None,
+            after: Optional[ReviewCursor] = None,
+        ) -> Sequence[Review]:
+            raise Exception()
+
+        async def import_reviews(self, reviews: Sequence[Review]) -> None:
+            raise Exception()
+
+        def stream_reviews(self, *, batch_size: int = 1000) -> AsyncIterator[Review]:
+            raise Exception()
+
+        async def find_rating_stats(
+            self, book_ids: Sequence[str]
+        ) -> Mapping[str, dao.RatingStats]:
+            assert sorted(book_ids) == ["OL1W", "OL2W"]
+
+            histogram = [0] * 10
+            histogram[7] = 2
+
+            return {
+                "OL1W": dao.RatingStats(
+                    book_id="OL1W", count=2, sum=16, histogram=histogram
+                )
+            }
+
+    uc = usecase.UseCase(MockRepo())
+
+    ratings = await uc.find_ratings(["OL1W", "OL2W", "OL1W"])
+
+    assert ratings["OL1W"].average == 8
+    assert ratings["OL1W"].histogram[7] == 2
+
+    assert ratings["OL2W"].count == 0
+    assert ratings["OL2W"].average is None
+
+
+@pytest.mark.asyncio
+async def test_import_reviews_in_batches() -> None:
+    batches: list[list[tuple[int, str]]] = []
+
+    class MockRepo(dao.Repository):
+        async def delete_review(self, *, user_id: int, book_id: str) -> None:
+            raise Exception()
+
+        async def create_or_update_review(
+            self,
+            *,
+            user_id: int,
+            book_id: str,
+            rating: int,
+            commentary: Optional[str] = None,
+        ) -> None:
+            raise Exception()
+
+        async def find_reviews(
+            self,
+            *,
+            book_id: Optional[str] = None,
+            user_id: Optional[int] = None,
+            limit: Optional[int] = None,
+            after: Optional[ReviewCursor] = None,
+        ) -> Sequence[Review]:
+            raise Exception()
+
+        async def import_reviews(self, reviews: Sequence[Review]) -> None:
+            batches.append([(r.user_id, r.book_id) for r in reviews])
+
+        def stream_reviews(self, *, batch_size: int = 1000) -> AsyncIterator[Review]:
+            raise Exception()
+
+        async def find_rating_stats(
+            self, book_ids: Sequence[str]
+        ) -> Mapping[str, dao.RatingStats]:
+            raise Exception()
+
+    class MockInvalidator(tags.Invalidator):
+        def __init__(self) -> None:
+            self.invalidated: list[set[str]] = []
+
+        async def invalidate(self, tags: Sequence[str]) -> None:
+            # invalidated after every batch is written
+            assert len(self.invalidated) == len(batches) - 1
+
+            self.invalidated.append(set(tags))
+
+    async def reviews() -> AsyncIterator[Review]:
+        for i in range(5):
+            yield Review(
+                user_id=i % 2,
+                book_id=f"OL{i}W",
+                rating=8,
+                commentary=None,
+                created_at=sqlite3.Timestamp(2024, 1, 1),
+                updated_at=None,
+            )
+
+    invalidator = MockInvalidator()
+    uc = usecase.UseCase(MockRepo(), invalidator=invalidator)
+
+    report = await uc.import_reviews(reviews(), batch_size=2)
+
+    assert report.rows == 5
+    assert batches == [
+        [(0, "OL0W"), (1, "OL1W")],
+        [(0, "OL2W"), (1, "OL3W")],
+        [(0, "OL4W")],
+    ]
+
+    assert invalidator.invalidated[-1] == {"book:OL4W", "user:0", "reviews"}
@@ -0,0 +1,76 @@
+import pytest
+
+from book_review.dao.suggestions import MemoryRepository
+from book_review.models.book import Suggestion, SuggestionKind
+
+
+def _book(id: str, text: str) -> tuple[str, Suggestion]:
+    return text.lower(), Suggestion(kind=SuggestionKind.BOOK, id=id, text=text)
+
+
+@pytest.mark.asyncio
+async def test_find_by_prefix() -> None:
+    repo = MemoryRepository(max_memory=2**20)
+
+    await repo.add_suggestions(
+        [
+            _book("OL1W", "The Hobbit"),
+            _book("OL2W", "The Lord of the Rings"),
+            _book("OL3W", "Hobbit Tales"),
+            (
+                "tolkien",
+                Suggestion(kind=SuggestionKind.AUTHOR, id="OL1A", text="Tolkien"),
+            ),
+        ]
+    )
+
+    assert [s.id for s in await repo.find_suggestions("the ", 10)] == [
+        "OL1W",
+        "OL2W",
+    ]
+    assert [s.id for s in await repo.find_suggestions("t", 2)] == ["OL1W", "OL2W"]
+    assert await repo.find_suggestions("to", 10) == [
+        Suggestion(kind=SuggestionKind.AUTHOR, id="OL1A", text="Tolkien")
+    ]
+    assert await repo.find_suggestions("x", 10) == []
+    assert await repo.find_suggestions("", 10) == []
+
+
+@pytest.mark.asyncio
+async def test_buffered_and_merged_suggestions_are_found() -> None:
+    repo = MemoryRepository(max_memory=2**30)
+
+    # enough to merge the buffer into the sorted suggestions a few times
+    for batch in range(5):
+        await repo.add_suggestions(
+            [_book(f"OL{batch}-{i}W", f"title {i:05}") for i in range(500)]
+        )
+
+    found = await repo.find_suggestions("title 00001", 10)
+
+    assert len(found) == 5
+    assert repo.stats.entries == 2500
+
+
+@pytest.mark.asyncio
+async def test_duplicates_are_ignored() -> None:
+    repo = MemoryRepository(max_memory=2**20)
+
+    assert await repo.add_suggestions([_book("OL1W", "Title")]) == 1
+    assert await repo.add_suggestions([_book("OL1W", "Title")] * 2) == 0
+
+    assert repo.stats.entries == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_cap() -> None:
+    repo = MemoryRepository(max_memory=1000)
+
+    added = await repo.add_suggestions(
+        [_book(f"OL{i}W", f"Title {i}") for i in range(100)]
+    )
+
+    stats = repo.stats
+    assert 0 < added < 100
+    assert stats.memory <= 1000
+    assert stats.rejected == 100 - added
@@ -4,7 +4,9 @@ from typing import Optional, Sequence
 import pytest
 
 import book_review.dao.users as dao
+import book_review.usecase.tags as tags
 import book_review.usecase.users as usecase
+from book_review.models.user import User
 
 
 @pytest.mark.asyncio
@@ -12,7 +14,7 @@ async def test_verify_password() -> None:
     class MockRepo(dao.Repository):
         async def find_users(
             self, *, login_like: Optional[str] = None
-        ) -> Sequence[dao.User]:
+        ) -> Sequence[User]:
             raise Exception()
 
         async def find_user_by_id(self, id: dao.UserID) -> Optional[dao.User]:
@@ -46,7 +48,7 @@ async def test_create_user() -> None:
     class MockRepo(dao.Repository):
         async def find_users(
             self, *, login_like: Optional[str] = None
-        ) -> Sequence[dao.User]:
+        ) -> Sequence[User]:
             raise Exception()
 
         async def find_user_by_id(self, id: int) -> Optional[dao.User]:
@@ -80,7 +82,7 @@ async def test_find_user_by_id() -> None:
     class MockRepo(dao.Repository):
         async def find_users(
             self, *, login_like: Optional[str] = None
-        ) -> Sequence[dao.User]:
+        ) -> Sequence[User]:
             raise Exception()
 
         async def find_user_by_id(self, id: int) -> Optional[dao.User]:
@@ -115,7 +117,7 @@ async def test_find_user_by_login() -> None:
     class MockRepo(dao.Repository):
         async def find_users(
             self, *, login_like: Optional[str] = None
-        ) -> Sequence[dao.User]:
+        ) -> Sequence[User]:
             raise Exception()
 
         async def find_user_by_id(self, id: int) -> Optional[dao.User]:
@@ -135,3 +137,34 @@ async def test_find_user_by_login() -> None:
 
     assert uc is not None
     assert user == expected_user.map()
+
+
+@pytest.mark.asyncio
+async def test_create_user_invalidates_cached_users() -> None:
+    class MockRepo(dao.Repository):
+        async def find_users(
+            self, *, login_like: Optional[str] = None
+        ) -> Sequence[User]:
+            raise Exception()
+
+        async def find_user_by_id(self, id: dao.UserID) -> Optional[dao.User]:
+            raise Exception()
+
+        async def find_user_by_login(self, login: str) -> Optional[dao.User]:
+            raise Exception()
+
+        async def create_user(self, login: str, password_hash: str) -> int:
+            return 42
+
+    class MockInvalidator(tags.Invalidator):
+        def __init__(self) -> None:
+            self.invalidated: list[Sequence[str]] = []
+
+        async def invalidate(self, tags: Sequence[str]) -> None:
+            self.invalidated.append(tags)
+
+    invalidator = MockInvalidator()
+    uc = usecase.UseCase(MockRepo(), invalidator=invalidator)
+
+    assert await uc.create_user("login", "password") == 42
+    assert invalidator.invalidated == [["users"]]
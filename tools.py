@@ -1,4 +1,5 @@
 import os
+import sys
 from subprocess import run as _run
 
 CWD = os.path.dirname(os.path.abspath(__file__))
@@ -19,6 +20,33 @@ def serve() -> None:
     run("python", "book_review/main.py")
 
 
+def import_dump() -> None:
+    run("python", "-m", "book_review.openlibrary.dump", *sys.argv[1:])
+
+
+def reviews() -> None:
+    run("python", "-m", "book_review.controller.cli", *sys.argv[1:])
+
+
+def standin() -> None:
+    run("python", "-m", "book_review.openlibrary.standin", *sys.argv[1:])
+
+
+def benchmark() -> None:
+    """
+    Run the given benchmarks by their names or all of them.
+    """
+
+    names = sys.argv[1:] or sorted(
+        name.removesuffix(".py")
+        for name in os.listdir(os.path.join(CWD, "benchmarks"))
+        if name.endswith(".py")
+    )
+
+    for name in names:
+        run("python", os.path.join("benchmarks", f"{name}.py"))
+
+
 def test() -> None:
     run("pytest")
 